@@ -0,0 +1,30 @@
+from fastapi import Depends
+from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from ..core.registry import database_registry
+from ..services.auth_service import AuthService
+from ..services.env_service import EnvironmentService
+
+security = HTTPBearer()
+
+
+def get_db():
+    """Dependency to get the shared database instance"""
+    return database_registry.get()
+
+
+def get_auth_service() -> AuthService:
+    """Dependency to get the shared AuthService"""
+    return database_registry.service(AuthService)
+
+
+def get_env_service() -> EnvironmentService:
+    """Dependency to get the shared EnvironmentService"""
+    return database_registry.service(EnvironmentService)
+
+
+async def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    auth_service: AuthService = Depends(get_auth_service),
+):
+    """Dependency to get current user from a JWT or an API key"""
+    return await auth_service.get_current_user_from_token(credentials)
@@ -0,0 +1,11 @@
+from fastapi import APIRouter, Response
+from ..core.metrics import render_metrics
+
+router = APIRouter()
+
+
+@router.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus metrics for this process, or for every worker under the launcher"""
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
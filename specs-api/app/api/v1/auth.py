@@ -1,52 +1,81 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from fastapi.security import HTTPAuthorizationCredentials
 from ...services.auth_service import AuthService
-from ...models.auth import UserCreate, UserResponse, Token, UserLogin
+from ...models.auth import UserCreate, UserResponse, Token, UserLogin, RefreshRequest, TokenExchangeRequest, ApiKeyCreate, ApiKeyResponse, LogoutRequest, RevokeTokenRequest, UserScopesSummary
 from ...core.security import require_scopes, check_scope_access
+from ...core.server_timing import TimedRoute
+from ...core.loop_monitor import loop_monitor
+from ...core.profiling import profile_store
+from ..deps import get_auth_service, get_current_user, security
 
-router = APIRouter()
-security = HTTPBearer()
-auth_service = AuthService()
+# TimedRoute lets Server-Timing tell encoding apart from the endpoint's own work
+router = APIRouter(route_class=TimedRoute)
 
 
 @router.get("/")
-async def root():
+async def root(auth_service: AuthService = Depends(get_auth_service)):
     """Health check endpoint"""
     return auth_service.get_health_status()
 
 
 @router.get("/scopes")
-async def get_available_scopes():
+async def get_available_scopes(auth_service: AuthService = Depends(get_auth_service)):
     """Get all available scopes in the system"""
     return auth_service.get_available_scopes()
 
 
 @router.post("/register", response_model=UserResponse)
-async def register_user(user: UserCreate):
+async def register_user(user: UserCreate, auth_service: AuthService = Depends(get_auth_service)):
     """Register a new user"""
-    return auth_service.register_user(user)
+    return await auth_service.register_user(user)
 
 
 @router.post("/login", response_model=Token)
-async def login_user(user_credentials: UserLogin):
+async def login_user(user_credentials: UserLogin, auth_service: AuthService = Depends(get_auth_service)):
     """Login user and return JWT token with requested scopes"""
-    return auth_service.login_user(user_credentials)
+    return await auth_service.login_user(user_credentials)
 
 
-async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
-    """Dependency to get current user from JWT token"""
-    return auth_service.get_current_user_from_token(credentials)
+@router.post("/refresh", response_model=Token)
+async def refresh_token(request: RefreshRequest, auth_service: AuthService = Depends(get_auth_service)):
+    """Exchange a refresh token for a new access token; the refresh token is rotated"""
+    return await auth_service.refresh_access_token(request.refresh_token)
+
+
+@router.post("/logout")
+async def logout(
+    request: Optional[LogoutRequest] = None,
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    auth_service: AuthService = Depends(get_auth_service)
+):
+    """Revoke the current access token, and the refresh token's session if one is given"""
+    await auth_service.logout(credentials, request.refresh_token if request else None)
+    return {"message": "Logged out"}
+
+
+@router.post("/token/exchange", response_model=Token)
+async def exchange_token(
+    request: TokenExchangeRequest,
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    auth_service: AuthService = Depends(get_auth_service)
+):
+    """Exchange a valid token for one restricted to other scopes, without a password"""
+    return await auth_service.exchange_token(credentials, request.scopes, request.from_available_scopes)
 
 
 @router.get("/profile", response_model=UserResponse)
-async def get_user_profile(current_user: dict = Depends(get_current_user)):
+async def get_user_profile(
+    current_user: dict = Depends(get_current_user),
+    auth_service: AuthService = Depends(get_auth_service)
+):
     """Get current user profile (requires read_profile scope)"""
     if not check_scope_access(current_user, "read_profile"):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Insufficient permissions. Required scope: read_profile"
         )
-    return auth_service.get_user_profile(current_user)
+    return await auth_service.get_user_profile(current_user)
 
 
 @router.put("/profile")
@@ -82,14 +111,91 @@ async def admin_endpoint(current_user: dict = Depends(get_current_user)):
     return {"message": "Welcome to admin area!", "admin": current_user['username']}
 
 
+@router.get("/admin/stats")
+async def admin_stats(
+    current_user: dict = Depends(get_current_user),
+    auth_service: AuthService = Depends(get_auth_service)
+):
+    """Cache hit/miss counters and connection pool statistics (admin only)"""
+    if not check_scope_access(current_user, "admin"):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Insufficient permissions. Required scope: admin"
+        )
+    return auth_service.get_runtime_stats()
+
+
+@router.get("/admin/event-loop")
+async def admin_event_loop(current_user: dict = Depends(get_current_user)):
+    """Event loop lag and the code that blocked the loop longest, with stacks (admin only)"""
+    if not check_scope_access(current_user, "admin"):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Insufficient permissions. Required scope: admin"
+        )
+    return loop_monitor.report()
+
+
+@router.get("/admin/profiles")
+async def admin_profiles(current_user: dict = Depends(get_current_user)):
+    """Requests profiled via the X-Profile header, newest first (admin only)"""
+    if not check_scope_access(current_user, "admin"):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Insufficient permissions. Required scope: admin"
+        )
+    return profile_store.list()
+
+
+@router.get("/admin/profiles/{profile_id}")
+async def admin_profile(
+    profile_id: str,
+    format: str = "text",
+    sort: str = "cumulative",
+    limit: int = 50,
+    current_user: dict = Depends(get_current_user)
+):
+    """A request profile as a pstats report, or with format=pstats as a .prof download (admin only)"""
+    if not check_scope_access(current_user, "admin"):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Insufficient permissions. Required scope: admin"
+        )
+    if format not in ("text", "pstats"):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="format must be 'text' or 'pstats'")
+    try:
+        body = profile_store.dump(profile_id) if format == "pstats" else profile_store.report(profile_id, limit, sort)
+    except KeyError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Unknown sort key: {sort}")
+    if body is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Profile {profile_id} not found; only the most recent profiles are kept"
+        )
+    if format == "pstats":
+        return Response(
+            content=body,
+            media_type="application/octet-stream",
+            headers={"Content-Disposition": f'attachment; filename="profile-{profile_id}.prof"'},
+        )
+    return Response(content=body, media_type="text/plain")
+
+
 @router.get("/me/scopes")
-async def get_my_scopes(current_user: dict = Depends(get_current_user)):
+async def get_my_scopes(
+    current_user: dict = Depends(get_current_user),
+    auth_service: AuthService = Depends(get_auth_service)
+):
     """Get current user's scope information"""
-    return auth_service.get_user_scopes(current_user)
+    return await auth_service.get_user_scopes(current_user)
 
 
 @router.get("/users/{user_id}/scopes")
-async def get_user_scopes_by_id(user_id: int, current_user: dict = Depends(get_current_user)):
+async def get_user_scopes_by_id(
+    user_id: int,
+    current_user: dict = Depends(get_current_user),
+    auth_service: AuthService = Depends(get_auth_service)
+):
     """Get a user's available scopes (admin only)"""
     if not check_scope_access(current_user, "admin"):
         raise HTTPException(
@@ -97,7 +203,7 @@ async def get_user_scopes_by_id(user_id: int, current_user: dict = Depends(get_c
             detail="Insufficient permissions. Required scope: admin"
         )
     
-    user = auth_service.get_user_by_id(user_id)
+    user = await auth_service.get_user_by_id(user_id)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -115,7 +221,8 @@ async def get_user_scopes_by_id(user_id: int, current_user: dict = Depends(get_c
 async def grant_scope_to_user(
     user_id: int, 
     scope: str, 
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user),
+    auth_service: AuthService = Depends(get_auth_service)
 ):
     """Grant a scope to a user (admin only)"""
     if not check_scope_access(current_user, "admin"):
@@ -124,7 +231,7 @@ async def grant_scope_to_user(
             detail="Insufficient permissions. Required scope: admin"
         )
     
-    if auth_service.grant_scope_to_user(user_id, scope, current_user["username"]):
+    if await auth_service.grant_scope_to_user(user_id, scope, current_user["username"]):
         return {"message": f"Scope '{scope}' granted to user {user_id}"}
     else:
         raise HTTPException(
@@ -137,7 +244,8 @@ async def grant_scope_to_user(
 async def revoke_scope_from_user(
     user_id: int, 
     scope: str, 
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user),
+    auth_service: AuthService = Depends(get_auth_service)
 ):
     """Revoke a scope from a user (admin only)"""
     if not check_scope_access(current_user, "admin"):
@@ -146,7 +254,7 @@ async def revoke_scope_from_user(
             detail="Insufficient permissions. Required scope: admin"
         )
     
-    if auth_service.revoke_scope_from_user(user_id, scope):
+    if await auth_service.revoke_scope_from_user(user_id, scope):
         return {"message": f"Scope '{scope}' revoked from user {user_id}"}
     else:
         raise HTTPException(
@@ -155,8 +263,98 @@ async def revoke_scope_from_user(
         )
 
 
-@router.get("/users/scopes")
-async def list_all_users_with_scopes(current_user: dict = Depends(get_current_user)):
+@router.put("/users/{user_id}/active")
+async def set_user_active(
+    user_id: int,
+    is_active: bool,
+    current_user: dict = Depends(get_current_user),
+    auth_service: AuthService = Depends(get_auth_service)
+):
+    """Activate or deactivate a user (admin only); deactivation ends all of their sessions"""
+    if not check_scope_access(current_user, "admin"):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Insufficient permissions. Required scope: admin"
+        )
+    
+    if await auth_service.set_user_active(user_id, is_active):
+        return {"message": f"User {user_id} {'activated' if is_active else 'deactivated'}"}
+    raise HTTPException(
+        status_code=status.HTTP_404_NOT_FOUND,
+        detail="User not found"
+    )
+
+
+@router.post("/users/{user_id}/api-keys", response_model=ApiKeyResponse)
+async def create_api_key(
+    user_id: int,
+    request: ApiKeyCreate,
+    current_user: dict = Depends(get_current_user),
+    auth_service: AuthService = Depends(get_auth_service)
+):
+    """Mint a scoped API key for a user (admin only); the key is shown only once"""
+    if not check_scope_access(current_user, "admin"):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Insufficient permissions. Required scope: admin"
+        )
+    
+    api_key = await auth_service.create_api_key(user_id, request.name, request.scopes, current_user["username"])
+    if api_key is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found"
+        )
+    return api_key
+
+
+@router.post("/tokens/revoke")
+async def revoke_token(
+    request: RevokeTokenRequest,
+    current_user: dict = Depends(get_current_user),
+    auth_service: AuthService = Depends(get_auth_service)
+):
+    """Revoke an access token before it expires (admin only)"""
+    if not check_scope_access(current_user, "admin"):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Insufficient permissions. Required scope: admin"
+        )
+    
+    if await auth_service.revoke_token(request.token):
+        return {"message": "Token revoked"}
+    raise HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail="Invalid, expired or non-revocable token"
+    )
+
+
+@router.delete("/api-keys/{key_id}")
+async def revoke_api_key(
+    key_id: int,
+    current_user: dict = Depends(get_current_user),
+    auth_service: AuthService = Depends(get_auth_service)
+):
+    """Revoke an API key (admin only)"""
+    if not check_scope_access(current_user, "admin"):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Insufficient permissions. Required scope: admin"
+        )
+    
+    if await auth_service.revoke_api_key(key_id):
+        return {"message": f"API key {key_id} revoked"}
+    raise HTTPException(
+        status_code=status.HTTP_404_NOT_FOUND,
+        detail="API key not found or already revoked"
+    )
+
+
+@router.get("/users/scopes", response_model=List[UserScopesSummary])
+async def list_all_users_with_scopes(
+    current_user: dict = Depends(get_current_user),
+    auth_service: AuthService = Depends(get_auth_service)
+):
     """List all users with their scopes (admin only)"""
     if not check_scope_access(current_user, "admin"):
         raise HTTPException(
@@ -164,10 +362,13 @@ async def list_all_users_with_scopes(current_user: dict = Depends(get_current_us
             detail="Insufficient permissions. Required scope: admin"
         )
     
-    return auth_service.list_all_users_with_scopes()
+    return await auth_service.list_all_users_with_scopes()
 
 
 @router.get("/protected")
-async def protected_route(current_user: dict = Depends(get_current_user)):
+async def protected_route(
+    current_user: dict = Depends(get_current_user),
+    auth_service: AuthService = Depends(get_auth_service)
+):
     """Example protected route (no specific scope required)"""
     return auth_service.get_protected_message(current_user)
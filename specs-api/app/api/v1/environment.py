@@ -1,47 +1,52 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from ...services.env_service import EnvironmentService
-from ...services.auth_service import AuthService
-from ...models.environment import EnvVarCreate
+from ...models.environment import (
+    EnvVarCreate, EnvVarResponse, EnvVarListResponse, EnvVarSetResponse, EnvVarDeleteResponse
+)
+from ...core.server_timing import TimedRoute
+from ..deps import get_current_user, get_env_service
 
-router = APIRouter()
-security = HTTPBearer()
-env_service = EnvironmentService()
-auth_service = AuthService()
-
-
-async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
-    """Dependency to get current user from JWT token"""
-    return auth_service.get_current_user_from_token(credentials)
+# TimedRoute lets Server-Timing tell encoding apart from the endpoint's own work
+router = APIRouter(route_class=TimedRoute)
 
 
 # Environment Variables endpoints
-@router.get("/")
-async def get_user_env_vars(current_user: dict = Depends(get_current_user)):
+# Response models let FastAPI validate and write the JSON in one Pydantic pass instead of jsonable_encoder
+@router.get("/", response_model=EnvVarListResponse)
+async def get_user_env_vars(
+    current_user: dict = Depends(get_current_user),
+    env_service: EnvironmentService = Depends(get_env_service)
+):
     """Get all environment variables for the current user"""
-    return env_service.get_user_env_vars(current_user)
+    return await env_service.get_user_env_vars(current_user)
 
 
-@router.get("/{name}")
-async def get_user_env_var(name: str, current_user: dict = Depends(get_current_user)):
+@router.get("/{name}", response_model=EnvVarResponse)
+async def get_user_env_var(
+    name: str,
+    current_user: dict = Depends(get_current_user),
+    env_service: EnvironmentService = Depends(get_env_service)
+):
     """Get a specific environment variable for the current user"""
-    return env_service.get_user_env_var(name, current_user)
+    return await env_service.get_user_env_var(name, current_user)
 
 
-@router.post("/")
+@router.post("/", response_model=EnvVarSetResponse)
 async def create_or_update_env_var(
     env_var: EnvVarCreate, 
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user),
+    env_service: EnvironmentService = Depends(get_env_service)
 ):
     """Create or update an environment variable for the current user"""
-    return env_service.set_user_env_var(env_var.name, env_var.value, current_user)
+    return await env_service.set_user_env_var(env_var.name, env_var.value, current_user)
 
 
-@router.put("/{name}")
+@router.put("/{name}", response_model=EnvVarSetResponse)
 async def update_env_var(
     name: str,
     env_var: EnvVarCreate,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user),
+    env_service: EnvironmentService = Depends(get_env_service)
 ):
     """Update an environment variable for the current user"""
     # Ensure the name in the URL matches the name in the body
@@ -50,10 +55,14 @@ async def update_env_var(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Environment variable name in URL must match name in request body"
         )
-    return env_service.set_user_env_var(env_var.name, env_var.value, current_user)
+    return await env_service.set_user_env_var(env_var.name, env_var.value, current_user)
 
 
-@router.delete("/{name}")
-async def delete_env_var(name: str, current_user: dict = Depends(get_current_user)):
+@router.delete("/{name}", response_model=EnvVarDeleteResponse)
+async def delete_env_var(
+    name: str,
+    current_user: dict = Depends(get_current_user),
+    env_service: EnvironmentService = Depends(get_env_service)
+):
     """Delete an environment variable for the current user"""
-    return env_service.delete_user_env_var(name, current_user)
+    return await env_service.delete_user_env_var(name, current_user)
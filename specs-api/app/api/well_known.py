@@ -0,0 +1,17 @@
+from fastapi import APIRouter, Response
+from ..core.tokens import token_signer
+
+router = APIRouter()
+
+# Keys only change on restart, so downstream verifiers can cache the set
+JWKS_MAX_AGE = 3600
+
+
+@router.get("/jwks.json")
+async def jwks():
+    """Public keys for verifying access tokens locally"""
+    return Response(
+        content=token_signer.jwks_json,
+        media_type="application/json",
+        headers={"Cache-Control": f"public, max-age={JWKS_MAX_AGE}"},
+    )
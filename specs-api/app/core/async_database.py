@@ -0,0 +1,96 @@
+from typing import TYPE_CHECKING, Any, Optional
+
+if TYPE_CHECKING:
+    # offload imports metrics, which imports this module
+    from .offload import BoundedExecutor
+
+
+# Backend methods that perform I/O and are awaited by the services
+ASYNC_METHODS = frozenset({
+    "create_user",
+    "insert_user",
+    "update_password_hash",
+    "get_user",
+    "authenticate_user",
+    "get_user_available_scopes",
+    "grant_scope_to_user",
+    "revoke_scope_from_user",
+    "list_all_users_with_scopes",
+    "get_user_by_id",
+    "get_user_env_vars",
+    "get_user_env_var",
+    "set_user_env_var",
+    "delete_user_env_var",
+    "create_refresh_token",
+    "get_refresh_token",
+    "rotate_refresh_token",
+    "revoke_refresh_token_family",
+    "create_api_key",
+    "get_api_key",
+    "revoke_api_key",
+    "get_auth_epoch",
+    "set_user_active",
+    "revoke_token",
+    "get_revoked_tokens",
+})
+
+# The subset of ASYNC_METHODS that write, and so run on the write executor
+WRITE_METHODS = frozenset({
+    "create_user",
+    "insert_user",
+    "update_password_hash",
+    "grant_scope_to_user",
+    "revoke_scope_from_user",
+    "set_user_env_var",
+    "delete_user_env_var",
+    "create_refresh_token",
+    "rotate_refresh_token",
+    "revoke_refresh_token_family",
+    "create_api_key",
+    "revoke_api_key",
+    "set_user_active",
+    "revoke_token",
+})
+
+
+class AsyncDatabaseAdapter:
+    """Expose a synchronous backend through the async interface the services use.
+
+    Methods listed in ``ASYNC_METHODS`` become coroutines; everything else
+    (token helpers, scope validation, admin hooks) is passed through unchanged.
+    With executors, those in ``WRITE_METHODS`` run on ``writes`` and the rest
+    on ``reads``, off the event loop; without, they run inline.
+    """
+
+    def __init__(self, db: Any, reads: Optional["BoundedExecutor"] = None, writes: Optional["BoundedExecutor"] = None):
+        self.db = db
+        self.reads = reads
+        self.writes = writes if writes is not None else reads
+
+    def __getattr__(self, name: str):
+        attr = getattr(self.db, name)
+        if name not in ASYNC_METHODS:
+            return attr
+
+        executor = self.writes if name in WRITE_METHODS else self.reads
+        if executor is None:
+            async def call(*args, **kwargs):
+                return attr(*args, **kwargs)
+        else:
+            async def call(*args, **kwargs):
+                return await executor.run(attr, *args, **kwargs)
+
+        call.__name__ = name
+        setattr(self, name, call)
+        return call
+
+    def executor_stats(self) -> dict:
+        """Get load statistics of the read and write executors"""
+        executors = {"db_read": self.reads, "db_write": self.writes}
+        return {name: executor.stats() for name, executor in executors.items() if executor is not None}
+
+    def close(self):
+        """Stop the executors, then close the backend"""
+        for executor in {self.reads, self.writes} - {None}:
+            executor.shutdown()
+        self.db.close()
@@ -0,0 +1,570 @@
+import asyncio
+import asyncpg
+import psycopg2
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Optional
+from jose import JWTError
+from psycopg2.extensions import parse_dsn
+from .migrations import MigrationRunner
+from .notifications import CHANNEL, InvalidationListener, event_payload
+from .passwords import pwd_context
+from .tokens import ACCESS_TOKEN_EXPIRE_MINUTES, token_signer
+
+# Tokens carrying an older epoch stop being accepted in stateless mode
+BUMP_AUTH_EPOCH = "UPDATE users SET auth_epoch = auth_epoch + 1 WHERE id = $1"
+
+
+def connect_kwargs(connection_string: str) -> dict:
+    """Translate a libpq connection string or URI into asyncpg connect arguments"""
+    params = parse_dsn(connection_string)
+    kwargs = {
+        "host": params.get("host"),
+        "port": int(params["port"]) if "port" in params else None,
+        "user": params.get("user"),
+        "password": params.get("password"),
+        "database": params.get("dbname"),
+    }
+    if "sslmode" in params:
+        kwargs["ssl"] = params["sslmode"]
+    return {key: value for key, value in kwargs.items() if value is not None}
+
+
+class AsyncPostgreSQLDatabase:
+    """PostgreSQL backend built on asyncpg; every method that touches the database is a coroutine"""
+
+    def __init__(
+        self,
+        connection_string: str = None,
+        pool_min_size: int = 1,
+        pool_max_size: int = 10,
+        pool_timeout: float = 30.0,
+        pool_max_lifetime: Optional[float] = 3600.0,
+        auto_migrate: bool = True,
+    ):
+        if connection_string is None:
+            # Default connection for local development
+            connection_string = (
+                "host=localhost "
+                "port=5432 "
+                "dbname=specs_auth "
+                "user=specs_user "
+                "password=specs_password"
+            )
+        self.connection_string = connection_string
+        self.pool_min_size = pool_min_size
+        self.pool_max_size = pool_max_size
+        self.pool_timeout = pool_timeout
+        self.pool_max_lifetime = pool_max_lifetime
+        self.auto_migrate = auto_migrate
+        self.pool = None
+        # When each open connection was made, by server pid; asyncpg itself only retires idle connections
+        self._connected_at = {}
+        self._pool_lock = asyncio.Lock()
+
+    async def connect(self):
+        """Apply pending migrations (unless disabled) and create the connection pool"""
+        async with self._pool_lock:
+            if self.pool is None:
+                if self.auto_migrate:
+                    await asyncio.to_thread(self.migrate)
+                self.pool = await asyncpg.create_pool(
+                    min_size=self.pool_min_size,
+                    max_size=self.pool_max_size,
+                    init=self._track_connection,
+                    **connect_kwargs(self.connection_string),
+                )
+        return self.pool
+
+    async def _track_connection(self, conn):
+        pid = conn.get_server_pid()
+        self._connected_at[pid] = time.monotonic()
+        conn.add_termination_listener(lambda _: self._connected_at.pop(pid, None))
+
+    def _expired(self, conn) -> bool:
+        """Whether a connection has outlived ``pool_max_lifetime`` and should not be reused"""
+        if self.pool_max_lifetime is None:
+            return False
+        connected_at = self._connected_at.get(conn.get_server_pid())
+        return connected_at is not None and time.monotonic() - connected_at >= self.pool_max_lifetime
+
+    def connection(self):
+        """Acquire a pooled connection for the duration of an ``async with`` block"""
+        return _PoolAcquire(self)
+
+    def invalidation_listener(self, handler) -> "AsyncpgInvalidationListener":
+        """Create (but not start) a listener for invalidation events published by any worker"""
+        return AsyncpgInvalidationListener(self.connection_string, handler)
+
+    async def _notify(self, conn, kind: str, **fields):
+        # Delivered to listeners when the surrounding transaction commits
+        await conn.execute("SELECT pg_notify($1, $2)", CHANNEL, event_payload(kind, **fields))
+
+    async def close(self):
+        """Close all pooled connections"""
+        if self.pool is not None:
+            await self.pool.close()
+            self.pool = None
+
+    def pool_stats(self) -> dict:
+        """Get connection pool statistics"""
+        if self.pool is None:
+            return {"size": 0, "min_size": self.pool_min_size, "max_size": self.pool_max_size, "in_use": 0, "idle": 0}
+        size = self.pool.get_size()
+        idle = self.pool.get_idle_size()
+        return {
+            "size": size,
+            "min_size": self.pool.get_min_size(),
+            "max_size": self.pool.get_max_size(),
+            "in_use": size - idle,
+            "idle": idle,
+        }
+
+    def migration_runner(self) -> MigrationRunner:
+        """Get a schema migration runner bound to this database"""
+        return MigrationRunner("postgresql", self._migration_connection)
+
+    def migrate(self, target: Optional[int] = None) -> list:
+        """Apply pending schema migrations and return the versions applied"""
+        return self.migration_runner().upgrade(target)
+
+    @contextmanager
+    def _migration_connection(self):
+        # Migrations share the psycopg2 runner; a short-lived sync connection is enough
+        conn = psycopg2.connect(self.connection_string)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    async def create_user(self, username: str, email: str, password: str) -> bool:
+        """Create a new user with default scopes"""
+        return await self.insert_user(username, email, pwd_context.hash(password))
+
+    async def insert_user(self, username: str, email: str, hashed_password: str) -> bool:
+        """Create a new user whose password has already been hashed"""
+        try:
+            async with self.connection() as conn:
+                await conn.execute("""
+                    INSERT INTO users (username, email, hashed_password)
+                    VALUES ($1, $2, $3)
+                """, username, email, hashed_password)
+            return True
+        except asyncpg.PostgresError:
+            return False
+
+    async def update_password_hash(self, user_id: int, hashed_password: str) -> bool:
+        """Replace a user's password hash (e.g. after a cost change)"""
+        try:
+            async with self.connection() as conn:
+                status = await conn.execute(
+                    "UPDATE users SET hashed_password = $1 WHERE id = $2", hashed_password, user_id
+                )
+            return int(status.split()[-1]) > 0
+        except asyncpg.PostgresError:
+            return False
+
+    async def get_user(self, username: str) -> Optional[dict]:
+        """Get user by username with their available scopes"""
+        async with self.connection() as conn:
+            row = await conn.fetchrow("""
+                SELECT u.id, u.username, u.email, u.hashed_password, u.is_active, u.role, u.created_at, u.auth_epoch,
+                       COALESCE(array_agg(us.scope) FILTER (WHERE us.scope IS NOT NULL), ARRAY[]::text[]) as available_scopes
+                FROM users u
+                LEFT JOIN user_scopes us ON u.id = us.user_id
+                WHERE u.username = $1
+                GROUP BY u.id, u.username, u.email, u.hashed_password, u.is_active, u.role, u.created_at, u.auth_epoch
+            """, username)
+
+        if row:
+            user_dict = dict(row)
+            user_dict["created_at"] = row["created_at"].strftime('%Y-%m-%d %H:%M:%S')
+            return user_dict
+        return None
+
+    def verify_password(self, plain_password: str, hashed_password: str) -> bool:
+        """Verify a password against its hash"""
+        return pwd_context.verify(plain_password, hashed_password)
+
+    async def authenticate_user(self, username: str, password: str) -> Optional[dict]:
+        """Authenticate user with username and password"""
+        user = await self.get_user(username)
+        if not user:
+            return None
+        if not self.verify_password(password, user["hashed_password"]):
+            return None
+        return user
+
+    def create_access_token(self, data: dict, expires_delta: Optional[timedelta] = None):
+        """Create JWT access token"""
+        to_encode = data.copy()
+        if expires_delta:
+            expire = datetime.utcnow() + expires_delta
+        else:
+            expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+        to_encode.update({"exp": expire})
+        return token_signer.encode(to_encode)
+
+    def verify_token(self, token: str):
+        """Verify JWT token"""
+        try:
+            payload = token_signer.decode(token)
+            username: str = payload.get("sub")
+            scopes: list = payload.get("scopes", [])
+            if username is None:
+                return None
+            return {
+                "username": username,
+                "scopes": scopes,
+                "exp": payload.get("exp"),
+                "jti": payload.get("jti"),
+                # Present only on stateless tokens
+                "uid": payload.get("uid"),
+                "role": payload.get("role"),
+                "epoch": payload.get("epoch"),
+            }
+        except JWTError:
+            return None
+
+    def get_available_scopes(self) -> dict:
+        """Get all available scopes in the system"""
+        return {
+            "read_profile": "Read user profile information",
+            "write_profile": "Modify user profile information",
+            "read_users": "Read other users' information",
+            "write_users": "Modify other users' information",
+            "admin": "Administrative access"
+        }
+
+    def validate_scopes(self, requested_scopes: list, user: dict) -> list:
+        """Validate and filter scopes based on user's available scopes"""
+        user_available_scopes = user.get("available_scopes", [])
+        return [scope for scope in requested_scopes if scope in user_available_scopes]
+
+    async def get_user_available_scopes(self, user_id: int) -> list:
+        """Get all scopes available to a user"""
+        async with self.connection() as conn:
+            rows = await conn.fetch("SELECT scope FROM user_scopes WHERE user_id = $1", user_id)
+        return [row["scope"] for row in rows]
+
+    async def grant_scope_to_user(self, user_id: int, scope: str, granted_by: str = "admin") -> bool:
+        """Grant a scope to a user"""
+        try:
+            async with self.connection() as conn, conn.transaction():
+                await conn.execute("""
+                    INSERT INTO user_scopes (user_id, scope, granted_by)
+                    VALUES ($1, $2, $3)
+                    ON CONFLICT (user_id, scope) DO UPDATE SET
+                    granted_by = EXCLUDED.granted_by,
+                    granted_at = CURRENT_TIMESTAMP
+                """, user_id, scope, granted_by)
+                await conn.execute(BUMP_AUTH_EPOCH, user_id)
+                await self._notify(conn, "user", user_id=user_id)
+            return True
+        except asyncpg.PostgresError:
+            return False
+
+    async def revoke_scope_from_user(self, user_id: int, scope: str) -> bool:
+        """Revoke a scope from a user"""
+        try:
+            async with self.connection() as conn, conn.transaction():
+                await conn.execute(
+                    "DELETE FROM user_scopes WHERE user_id = $1 AND scope = $2", user_id, scope
+                )
+                await conn.execute(BUMP_AUTH_EPOCH, user_id)
+                await self._notify(conn, "user", user_id=user_id)
+            return True
+        except asyncpg.PostgresError:
+            return False
+
+    async def list_all_users_with_scopes(self) -> list:
+        """List all users with their scopes (admin only)"""
+        async with self.connection() as conn:
+            rows = await conn.fetch("""
+                SELECT u.id, u.username, u.email, u.role, u.is_active,
+                       COALESCE(array_agg(us.scope) FILTER (WHERE us.scope IS NOT NULL), ARRAY[]::text[]) as available_scopes
+                FROM users u
+                LEFT JOIN user_scopes us ON u.id = us.user_id
+                GROUP BY u.id, u.username, u.email, u.role, u.is_active
+                ORDER BY u.id
+            """)
+        return [dict(row) for row in rows]
+
+    async def get_user_by_id(self, user_id: int) -> Optional[dict]:
+        """Get user by ID"""
+        async with self.connection() as conn:
+            row = await conn.fetchrow("""
+                SELECT u.id, u.username, u.email, u.hashed_password, u.is_active, u.role, u.created_at, u.auth_epoch,
+                       COALESCE(array_agg(us.scope) FILTER (WHERE us.scope IS NOT NULL), ARRAY[]::text[]) as available_scopes
+                FROM users u
+                LEFT JOIN user_scopes us ON u.id = us.user_id
+                WHERE u.id = $1
+                GROUP BY u.id, u.username, u.email, u.hashed_password, u.is_active, u.role, u.created_at, u.auth_epoch
+            """, user_id)
+
+        if row:
+            user_dict = dict(row)
+            user_dict["created_at"] = row["created_at"].strftime('%Y-%m-%d %H:%M:%S')
+            return user_dict
+        return None
+
+    # Environment Variables methods
+    async def get_user_env_vars(self, user_id: int) -> list:
+        """Get all environment variables for a user"""
+        async with self.connection() as conn:
+            rows = await conn.fetch("""
+                SELECT name, value, created_at, updated_at
+                FROM user_environment_variables
+                WHERE user_id = $1
+                ORDER BY name
+            """, user_id)
+
+        env_vars = []
+        for row in rows:
+            env_var = dict(row)
+            env_var["created_at"] = row["created_at"].strftime('%Y-%m-%d %H:%M:%S')
+            env_var["updated_at"] = row["updated_at"].strftime('%Y-%m-%d %H:%M:%S')
+            env_vars.append(env_var)
+        return env_vars
+
+    async def get_user_env_var(self, user_id: int, name: str) -> Optional[dict]:
+        """Get a specific environment variable for a user"""
+        async with self.connection() as conn:
+            row = await conn.fetchrow("""
+                SELECT name, value, created_at, updated_at
+                FROM user_environment_variables
+                WHERE user_id = $1 AND name = $2
+            """, user_id, name)
+
+        if row:
+            env_var = dict(row)
+            env_var["created_at"] = row["created_at"].strftime('%Y-%m-%d %H:%M:%S')
+            env_var["updated_at"] = row["updated_at"].strftime('%Y-%m-%d %H:%M:%S')
+            return env_var
+        return None
+
+    async def set_user_env_var(self, user_id: int, name: str, value: str) -> bool:
+        """Set an environment variable for a user"""
+        try:
+            async with self.connection() as conn, conn.transaction():
+                await conn.execute("""
+                    INSERT INTO user_environment_variables (user_id, name, value)
+                    VALUES ($1, $2, $3)
+                    ON CONFLICT (user_id, name) DO UPDATE SET
+                    value = EXCLUDED.value,
+                    updated_at = CURRENT_TIMESTAMP
+                """, user_id, name, value)
+                await self._notify(conn, "env", user_id=user_id, name=name)
+            return True
+        except asyncpg.PostgresError:
+            return False
+
+    async def delete_user_env_var(self, user_id: int, name: str) -> bool:
+        """Delete an environment variable for a user"""
+        try:
+            async with self.connection() as conn, conn.transaction():
+                status = await conn.execute("""
+                    DELETE FROM user_environment_variables
+                    WHERE user_id = $1 AND name = $2
+                """, user_id, name)
+                # asyncpg returns the command tag, e.g. "DELETE 1"
+                deleted = int(status.split()[-1]) > 0
+                if deleted:
+                    await self._notify(conn, "env", user_id=user_id, name=name)
+            return deleted
+        except asyncpg.PostgresError:
+            return False
+
+
+    # Refresh token methods
+    async def create_refresh_token(self, user_id: int, token_hash: str, family_id: str, scopes: list, expires_at: int) -> bool:
+        """Store a refresh token by its digest"""
+        try:
+            async with self.connection() as conn:
+                await conn.execute("""
+                    INSERT INTO refresh_tokens (user_id, token_hash, family_id, scopes, expires_at)
+                    VALUES ($1, $2, $3, $4, $5)
+                """, user_id, token_hash, family_id, " ".join(scopes), expires_at)
+            return True
+        except asyncpg.PostgresError:
+            return False
+
+    async def get_refresh_token(self, token_hash: str) -> Optional[dict]:
+        """Get a refresh token by its digest, with the owner's username"""
+        async with self.connection() as conn:
+            row = await conn.fetchrow("""
+                SELECT rt.user_id, u.username, rt.family_id, rt.scopes, rt.expires_at, rt.revoked
+                FROM refresh_tokens rt
+                JOIN users u ON u.id = rt.user_id
+                WHERE rt.token_hash = $1
+            """, token_hash)
+
+        if row:
+            token = dict(row)
+            token["scopes"] = row["scopes"].split()
+            return token
+        return None
+
+    async def rotate_refresh_token(self, token_hash: str, new_token_hash: str, expires_at: int) -> bool:
+        """Retire a refresh token and store its successor in the same family, atomically"""
+        try:
+            async with self.connection() as conn:
+                async with conn.transaction():
+                    status = await conn.execute("""
+                        UPDATE refresh_tokens SET revoked = TRUE
+                        WHERE token_hash = $1 AND revoked = FALSE
+                    """, token_hash)
+                    if int(status.split()[-1]) != 1:
+                        # Already rotated (possibly by a concurrent request)
+                        return False
+                    await conn.execute("""
+                        INSERT INTO refresh_tokens (user_id, token_hash, family_id, scopes, expires_at)
+                        SELECT user_id, $1, family_id, scopes, $2
+                        FROM refresh_tokens WHERE token_hash = $3
+                    """, new_token_hash, expires_at, token_hash)
+            return True
+        except asyncpg.PostgresError:
+            return False
+
+    async def revoke_refresh_token_family(self, family_id: str) -> int:
+        """Revoke every refresh token descended from one login"""
+        try:
+            async with self.connection() as conn:
+                status = await conn.execute("""
+                    UPDATE refresh_tokens SET revoked = TRUE
+                    WHERE family_id = $1 AND revoked = FALSE
+                """, family_id)
+            return int(status.split()[-1])
+        except asyncpg.PostgresError:
+            return 0
+
+    # API key methods
+    async def create_api_key(self, user_id: int, key_hash: str, prefix: str, name: str, scopes: list, created_by: str) -> Optional[int]:
+        """Store an API key by its digest and return its id"""
+        try:
+            async with self.connection() as conn:
+                return await conn.fetchval("""
+                    INSERT INTO api_keys (user_id, key_hash, prefix, name, scopes, created_by)
+                    VALUES ($1, $2, $3, $4, $5, $6)
+                    RETURNING id
+                """, user_id, key_hash, prefix, name, " ".join(scopes), created_by)
+        except asyncpg.PostgresError:
+            return None
+
+    async def get_api_key(self, key_hash: str) -> Optional[dict]:
+        """Get an active API key by its digest, with the owner's username"""
+        async with self.connection() as conn:
+            row = await conn.fetchrow("""
+                SELECT k.id, k.user_id, u.username, k.name, k.scopes
+                FROM api_keys k
+                JOIN users u ON u.id = k.user_id
+                WHERE k.key_hash = $1 AND k.revoked = FALSE
+            """, key_hash)
+
+        if row:
+            api_key = dict(row)
+            api_key["scopes"] = row["scopes"].split()
+            return api_key
+        return None
+
+    async def revoke_api_key(self, key_id: int) -> bool:
+        """Revoke an API key"""
+        try:
+            async with self.connection() as conn, conn.transaction():
+                status = await conn.execute("""
+                    UPDATE api_keys SET revoked = TRUE
+                    WHERE id = $1 AND revoked = FALSE
+                """, key_id)
+                revoked = int(status.split()[-1]) > 0
+                if revoked:
+                    await self._notify(conn, "api_key", key_id=key_id)
+            return revoked
+        except asyncpg.PostgresError:
+            return False
+
+    # Auth epoch methods
+    async def get_auth_epoch(self, user_id: int) -> Optional[int]:
+        """Get a user's auth epoch, or None if the user is missing or inactive"""
+        async with self.connection() as conn:
+            return await conn.fetchval(
+                "SELECT auth_epoch FROM users WHERE id = $1 AND is_active = TRUE", user_id
+            )
+
+    async def set_user_active(self, user_id: int, is_active: bool) -> bool:
+        """Activate or deactivate a user, invalidating their outstanding tokens"""
+        try:
+            async with self.connection() as conn, conn.transaction():
+                status = await conn.execute("""
+                    UPDATE users SET is_active = $1, auth_epoch = auth_epoch + 1 WHERE id = $2
+                """, is_active, user_id)
+                updated = int(status.split()[-1]) > 0
+                if updated:
+                    await self._notify(conn, "user", user_id=user_id)
+            return updated
+        except asyncpg.PostgresError:
+            return False
+
+    # Token denylist methods
+    async def revoke_token(self, jti: str, user_id: Optional[int], expires_at: int, revoked_at: float) -> bool:
+        """Deny an access token id until it expires, purging entries that already have"""
+        try:
+            async with self.connection() as conn, conn.transaction():
+                await conn.execute("""
+                    INSERT INTO revoked_tokens (jti, user_id, expires_at, revoked_at)
+                    VALUES ($1, $2, $3, $4)
+                    ON CONFLICT (jti) DO NOTHING
+                """, jti, user_id, expires_at, revoked_at)
+                await self._notify(conn, "token", jti=jti, exp=expires_at)
+                await conn.execute("DELETE FROM revoked_tokens WHERE expires_at <= $1", int(revoked_at))
+            return True
+        except asyncpg.PostgresError:
+            return False
+
+    async def get_revoked_tokens(self, since: float) -> list:
+        """Get unexpired denied token ids revoked at or after ``since`` as (jti, expires_at, revoked_at)"""
+        async with self.connection() as conn:
+            rows = await conn.fetch("""
+                SELECT jti, expires_at, revoked_at FROM revoked_tokens
+                WHERE revoked_at >= $1 AND expires_at > $2
+            """, since, int(time.time()))
+        return [tuple(row) for row in rows]
+
+class AsyncpgInvalidationListener(InvalidationListener):
+    """Listener on a dedicated asyncpg connection"""
+
+    def __init__(self, connection_string: str, handler, reconnect_delay: float = 1.0):
+        super().__init__(handler, reconnect_delay)
+        self.connection_string = connection_string
+
+    async def _listen(self):
+        conn = await asyncpg.connect(**connect_kwargs(self.connection_string))
+        closed = asyncio.Event()
+        try:
+            conn.add_termination_listener(lambda _: closed.set())
+            await conn.add_listener(CHANNEL, lambda _conn, _pid, _channel, payload: self.dispatch(payload))
+            self._on_listening()
+            await closed.wait()
+            raise ConnectionError("listening connection closed")
+        finally:
+            await conn.close()
+
+
+class _PoolAcquire:
+    """``async with`` helper that creates the pool on first use before acquiring"""
+
+    def __init__(self, db: AsyncPostgreSQLDatabase):
+        self.db = db
+        self.conn = None
+
+    async def __aenter__(self):
+        pool = self.db.pool or await self.db.connect()
+        self.conn = await pool.acquire(timeout=self.db.pool_timeout)
+        return self.conn
+
+    async def __aexit__(self, exc_type, exc, tb):
+        if self.db._expired(self.conn):
+            # Closing a pooled connection frees its slot; the pool opens a fresh one on a later acquire
+            await self.conn.close(timeout=self.db.pool_timeout)
+        else:
+            await self.db.pool.release(self.conn)
@@ -0,0 +1,235 @@
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Optional
+
+
+class PoolTimeout(Exception):
+    """Raised when a connection cannot be checked out within the pool timeout"""
+
+
+class PoolClosed(Exception):
+    """Raised when checking out from a pool that has been closed"""
+
+
+class _PooledConnection:
+    """Bookkeeping for a single physical connection owned by the pool"""
+
+    __slots__ = ("conn", "created_at", "last_used")
+
+    def __init__(self, conn: Any):
+        self.conn = conn
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+
+
+class ConnectionPool:
+    """Thread-safe, bounded pool of DB-API connections.
+
+    The pool is driver agnostic: ``connect`` opens a new physical connection,
+    ``check`` returns True if an idle connection is still usable and ``reset``
+    returns a connection to a clean state before it goes back to the pool.
+    ``check`` runs on checkout for connections idle for at least
+    ``health_check_after`` seconds; connections older than ``max_lifetime``
+    are closed and replaced instead of being handed out.
+    """
+
+    def __init__(
+        self,
+        connect: Callable[[], Any],
+        min_size: int = 1,
+        max_size: int = 10,
+        timeout: float = 30.0,
+        max_lifetime: Optional[float] = 3600.0,
+        health_check_after: float = 0.0,
+        check: Optional[Callable[[Any], bool]] = None,
+        reset: Optional[Callable[[Any], None]] = None,
+    ):
+        if min_size < 0 or max_size < 1 or min_size > max_size:
+            raise ValueError("Pool sizes must satisfy 0 <= min_size <= max_size and max_size >= 1")
+
+        self._connect = connect
+        self._check = check
+        self._reset = reset
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.health_check_after = health_check_after
+
+        self._lock = threading.Lock()
+        self._available = threading.Condition(self._lock)
+        self._idle = deque()
+        self._in_use = {}
+        self._pending = 0
+        self._closed = False
+
+        # Statistics
+        self._checkouts = 0
+        self._checkout_failures = 0
+        self._connections_opened = 0
+        self._connections_closed = 0
+        self._health_check_failures = 0
+        self._wait_time_total = 0.0
+        self._wait_time_max = 0.0
+
+        for _ in range(min_size):
+            self._idle.append(self._open())
+            self._connections_opened += 1
+
+    def _open(self) -> _PooledConnection:
+        return _PooledConnection(self._connect())
+
+    @staticmethod
+    def _close_quietly(entry: _PooledConnection):
+        try:
+            entry.conn.close()
+        except Exception:
+            pass
+
+    def _expired(self, entry: _PooledConnection, now: float) -> bool:
+        return self.max_lifetime is not None and now - entry.created_at >= self.max_lifetime
+
+    def _healthy(self, entry: _PooledConnection, now: float) -> bool:
+        # Connections that were returned very recently are assumed healthy
+        if self._check is None or now - entry.last_used < self.health_check_after:
+            return True
+        try:
+            return bool(self._check(entry.conn))
+        except Exception:
+            return False
+
+    @property
+    def size(self) -> int:
+        return len(self._idle) + len(self._in_use) + self._pending
+
+    def _checked_out(self, entry: _PooledConnection, start: float):
+        # Caller holds the lock
+        waited = time.monotonic() - start
+        self._pending -= 1
+        self._in_use[id(entry.conn)] = entry
+        self._checkouts += 1
+        self._wait_time_total += waited
+        if waited > self._wait_time_max:
+            self._wait_time_max = waited
+        return entry.conn
+
+    def getconn(self):
+        """Check out a connection, waiting up to ``timeout`` seconds for one to free up"""
+        start = time.monotonic()
+        deadline = start + self.timeout
+
+        while True:
+            with self._available:
+                while True:
+                    if self._closed:
+                        self._checkout_failures += 1
+                        raise PoolClosed("Connection pool is closed")
+                    if self._idle:
+                        entry = self._idle.pop()
+                        break
+                    if self.size < self.max_size:
+                        entry = None
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._checkout_failures += 1
+                        raise PoolTimeout(
+                            f"Timed out after {self.timeout}s waiting for a database connection "
+                            f"(max_size={self.max_size})"
+                        )
+                    self._available.wait(remaining)
+                # Reserve the slot while connecting or health-checking outside the lock
+                self._pending += 1
+
+            if entry is None:
+                try:
+                    entry = self._open()
+                except Exception:
+                    with self._available:
+                        self._pending -= 1
+                        self._checkout_failures += 1
+                        self._available.notify()
+                    raise
+                with self._lock:
+                    self._connections_opened += 1
+                    return self._checked_out(entry, start)
+
+            now = time.monotonic()
+            expired = self._expired(entry, now)
+            if not expired and self._healthy(entry, now):
+                with self._lock:
+                    return self._checked_out(entry, start)
+
+            self._close_quietly(entry)
+            with self._available:
+                self._pending -= 1
+                self._connections_closed += 1
+                if not expired:
+                    self._health_check_failures += 1
+                self._available.notify()
+
+    def putconn(self, conn, discard: bool = False):
+        """Return a connection to the pool, closing it if broken, expired or ``discard`` is set"""
+        with self._lock:
+            entry = self._in_use.pop(id(conn), None)
+        if entry is None:
+            raise ValueError("Connection does not belong to this pool")
+
+        if not discard and self._reset is not None:
+            try:
+                self._reset(conn)
+            except Exception:
+                discard = True
+
+        now = time.monotonic()
+        with self._available:
+            if discard or self._closed or self._expired(entry, now):
+                self._close_quietly(entry)
+                self._connections_closed += 1
+            else:
+                entry.last_used = now
+                self._idle.append(entry)
+            self._available.notify()
+
+    @contextmanager
+    def connection(self):
+        """Context manager that checks out a connection and always returns it"""
+        conn = self.getconn()
+        try:
+            yield conn
+        except BaseException:
+            self.putconn(conn, discard=getattr(conn, "closed", False))
+            raise
+        else:
+            self.putconn(conn)
+
+    def close(self):
+        """Close idle connections and refuse further checkouts; in-use connections close on return"""
+        with self._available:
+            self._closed = True
+            while self._idle:
+                self._close_quietly(self._idle.pop())
+                self._connections_closed += 1
+            self._available.notify_all()
+
+    def stats(self) -> dict:
+        """Snapshot of pool usage counters"""
+        with self._lock:
+            checkouts = self._checkouts
+            return {
+                "size": self.size,
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+                "in_use": len(self._in_use),
+                "idle": len(self._idle),
+                "checkouts": checkouts,
+                "checkout_failures": self._checkout_failures,
+                "health_check_failures": self._health_check_failures,
+                "connections_opened": self._connections_opened,
+                "connections_closed": self._connections_closed,
+                "wait_time_total": round(self._wait_time_total, 6),
+                "wait_time_avg": round(self._wait_time_total / checkouts, 6) if checkouts else 0.0,
+                "wait_time_max": round(self._wait_time_max, 6),
+            }
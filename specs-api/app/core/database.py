@@ -1,89 +1,67 @@
 import sqlite3
+import time
 from datetime import datetime, timedelta
 from typing import Optional
-from passlib.context import CryptContext
-from jose import JWTError, jwt
+from jose import JWTError
+from .migrations import MigrationRunner
+from .passwords import pwd_context
+from .sqlite_connection import SQLiteConnectionManager
+from .tokens import token_signer
 
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Tokens carrying an older epoch stop being accepted in stateless mode
+BUMP_AUTH_EPOCH = "UPDATE users SET auth_epoch = auth_epoch + 1 WHERE id = ?"
 
-# JWT settings
-SECRET_KEY = "your-secret-key-change-this-in-production"
-ALGORITHM = "HS256"
-ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
 class Database:
-    def __init__(self, db_path: str = "auth.db"):
+    def __init__(
+        self,
+        db_path: str = "auth.db",
+        journal_mode: str = "WAL",
+        synchronous: str = "NORMAL",
+        mmap_size: int = 268435456,
+        cache_size: int = -64000,
+        busy_timeout: int = 5000,
+        auto_migrate: bool = True,
+    ):
         self.db_path = db_path
-        self.init_database()
+        self.connections = SQLiteConnectionManager(
+            db_path,
+            journal_mode=journal_mode,
+            synchronous=synchronous,
+            mmap_size=mmap_size,
+            cache_size=cache_size,
+            busy_timeout=busy_timeout,
+        )
+        if auto_migrate:
+            self.migrate()
     
     def get_connection(self):
-        conn = sqlite3.connect(self.db_path, timeout=10.0)
-        conn.row_factory = sqlite3.Row
-        return conn
-    
-    def init_database(self):
-        """Initialize the database with users and user_scopes tables"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS users (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                username TEXT UNIQUE NOT NULL,
-                email TEXT UNIQUE NOT NULL,
-                hashed_password TEXT NOT NULL,
-                is_active BOOLEAN DEFAULT TRUE,
-                role TEXT DEFAULT 'user',
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-        
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS user_scopes (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER NOT NULL,
-                scope TEXT NOT NULL,
-                granted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                granted_by TEXT DEFAULT 'system',
-                FOREIGN KEY (user_id) REFERENCES users (id),
-                UNIQUE(user_id, scope)
-            )
-        """)
-        
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS user_environment_variables (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER NOT NULL,
-                name TEXT NOT NULL,
-                value TEXT NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (user_id) REFERENCES users (id),
-                UNIQUE(user_id, name)
-            )
-        """)
-        
-        # Create default admin user if it doesn't exist
-        cursor.execute("SELECT COUNT(*) FROM users WHERE username = 'admin'")
-        if cursor.fetchone()[0] == 0:
-            admin_password = self.hash_password("admin123")
-            cursor.execute("""
-                INSERT INTO users (username, email, hashed_password, role)
-                VALUES ('admin', 'admin@example.com', ?, 'admin')
-            """, (admin_password,))
-            
-            admin_id = cursor.lastrowid
-            # Grant all scopes to admin
-            admin_scopes = ['read_profile', 'write_profile', 'read_users', 'admin']
-            for scope in admin_scopes:
-                cursor.execute("""
-                    INSERT INTO user_scopes (user_id, scope, granted_by)
-                    VALUES (?, ?, 'system')
-                """, (admin_id, scope))
-        
-        conn.commit()
-        conn.close()
+        """Open a new, unmanaged connection (used by admin scripts)"""
+        return self.connections.open_connection()
+    
+    def read_connection(self):
+        """Use this thread's long-lived read-only connection in a ``with`` block"""
+        return self.connections.read_connection()
+    
+    def write_connection(self):
+        """Use the shared writer connection in a ``with`` block"""
+        return self.connections.write_connection()
+    
+    def pool_stats(self) -> dict:
+        """Get connection statistics"""
+        return self.connections.stats()
+    
+    def close(self):
+        """Close all managed connections"""
+        self.connections.close()
+    
+    def migration_runner(self) -> MigrationRunner:
+        """Get a schema migration runner bound to this database"""
+        return MigrationRunner("sqlite", self.write_connection)
+    
+    def migrate(self, target: Optional[int] = None) -> list:
+        """Apply pending schema migrations and return the versions applied"""
+        return self.migration_runner().upgrade(target)
     
     def hash_password(self, password: str) -> str:
         """Hash a password"""
@@ -91,57 +69,69 @@ class Database:
     
     def create_user(self, username: str, email: str, password: str) -> bool:
         """Create a new user with default scopes"""
+        return self.insert_user(username, email, pwd_context.hash(password))
+    
+    def insert_user(self, username: str, email: str, hashed_password: str) -> bool:
+        """Create a new user whose password has already been hashed"""
         try:
-            hashed_password = pwd_context.hash(password)
-            conn = self.get_connection()
-            cursor = conn.cursor()
-            
-            cursor.execute("""
-                INSERT INTO users (username, email, hashed_password)
-                VALUES (?, ?, ?)
-            """, (username, email, hashed_password))
-            
-            conn.commit()
-            conn.close()
+            with self.write_connection() as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute("""
+                    INSERT INTO users (username, email, hashed_password)
+                    VALUES (?, ?, ?)
+                """, (username, email, hashed_password))
+                
+                conn.commit()
             return True
         except sqlite3.Error as e:
             return False
     
+    def update_password_hash(self, user_id: int, hashed_password: str) -> bool:
+        """Replace a user's password hash (e.g. after a cost change)"""
+        try:
+            with self.write_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("UPDATE users SET hashed_password = ? WHERE id = ?", (hashed_password, user_id))
+                conn.commit()
+                return cursor.rowcount > 0
+        except sqlite3.Error as e:
+            return False
+    
     def get_user(self, username: str) -> Optional[dict]:
         """Get user by username with their available scopes"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        # Get user info
-        cursor.execute("""
-            SELECT id, username, email, hashed_password, is_active, role, created_at
-            FROM users WHERE username = ?
-        """, (username,))
-        
-        row = cursor.fetchone()
-        if not row:
-            conn.close()
-            return None
-        
-        user = {
-            "id": row[0],
-            "username": row[1],
-            "email": row[2],
-            "hashed_password": row[3],
-            "is_active": bool(row[4]),
-            "role": row[5],
-            "created_at": row[6]
-        }
-        
-        # Get user's available scopes
-        cursor.execute("""
-            SELECT scope FROM user_scopes WHERE user_id = ?
-        """, (user["id"],))
-        
-        scopes = [row[0] for row in cursor.fetchall()]
-        user["available_scopes"] = scopes
+        with self.read_connection() as conn:
+            cursor = conn.cursor()
+            
+            # Get user info
+            cursor.execute("""
+                SELECT id, username, email, hashed_password, is_active, role, created_at, auth_epoch
+                FROM users WHERE username = ?
+            """, (username,))
+            
+            row = cursor.fetchone()
+            if not row:
+                return None
+            
+            user = {
+                "id": row[0],
+                "username": row[1],
+                "email": row[2],
+                "hashed_password": row[3],
+                "is_active": bool(row[4]),
+                "role": row[5],
+                "created_at": row[6],
+                "auth_epoch": row[7]
+            }
+            
+            # Get user's available scopes
+            cursor.execute("""
+                SELECT scope FROM user_scopes WHERE user_id = ?
+            """, (user["id"],))
+            
+            scopes = [row[0] for row in cursor.fetchall()]
+            user["available_scopes"] = scopes
         
-        conn.close()
         return user
     
     def verify_password(self, plain_password: str, hashed_password: str) -> bool:
@@ -165,18 +155,27 @@ class Database:
         else:
             expire = datetime.utcnow() + timedelta(minutes=15)
         to_encode.update({"exp": expire})
-        encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+        encoded_jwt = token_signer.encode(to_encode)
         return encoded_jwt
     
     def verify_token(self, token: str) -> Optional[dict]:
         """Verify JWT token and return user data with scopes"""
         try:
-            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+            payload = token_signer.decode(token)
             username: str = payload.get("sub")
             scopes: list = payload.get("scopes", [])
             if username is None:
                 return None
-            return {"username": username, "scopes": scopes}
+            return {
+                "username": username,
+                "scopes": scopes,
+                "exp": payload.get("exp"),
+                "jti": payload.get("jti"),
+                # Present only on stateless tokens
+                "uid": payload.get("uid"),
+                "role": payload.get("role"),
+                "epoch": payload.get("epoch"),
+            }
         except JWTError:
             return None
     
@@ -203,30 +202,29 @@ class Database:
     
     def get_user_available_scopes(self, user_id: int) -> list:
         """Get all scopes available to a user"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            SELECT scope FROM user_scopes WHERE user_id = ?
-        """, (user_id,))
-        
-        scopes = [row[0] for row in cursor.fetchall()]
-        conn.close()
+        with self.read_connection() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute("""
+                SELECT scope FROM user_scopes WHERE user_id = ?
+            """, (user_id,))
+            
+            scopes = [row[0] for row in cursor.fetchall()]
         return scopes
     
     def grant_scope_to_user(self, user_id: int, scope: str, granted_by: str = "admin") -> bool:
         """Grant a scope to a user"""
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
-            
-            cursor.execute("""
-                INSERT OR REPLACE INTO user_scopes (user_id, scope, granted_by)
-                VALUES (?, ?, ?)
-            """, (user_id, scope, granted_by))
-            
-            conn.commit()
-            conn.close()
+            with self.write_connection() as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute("""
+                    INSERT OR REPLACE INTO user_scopes (user_id, scope, granted_by)
+                    VALUES (?, ?, ?)
+                """, (user_id, scope, granted_by))
+                cursor.execute(BUMP_AUTH_EPOCH, (user_id,))
+                
+                conn.commit()
             return True
         except sqlite3.Error as e:
             return False
@@ -234,35 +232,34 @@ class Database:
     def revoke_scope_from_user(self, user_id: int, scope: str) -> bool:
         """Revoke a scope from a user"""
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
-            
-            cursor.execute("""
-                DELETE FROM user_scopes WHERE user_id = ? AND scope = ?
-            """, (user_id, scope))
-            
-            conn.commit()
-            conn.close()
+            with self.write_connection() as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute("""
+                    DELETE FROM user_scopes WHERE user_id = ? AND scope = ?
+                """, (user_id, scope))
+                cursor.execute(BUMP_AUTH_EPOCH, (user_id,))
+                
+                conn.commit()
             return True
         except sqlite3.Error as e:
             return False
     
     def list_all_users_with_scopes(self) -> list:
         """List all users with their scopes (SQLite version using GROUP_CONCAT)"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            SELECT u.id, u.username, u.email, u.role, u.is_active,
-                   GROUP_CONCAT(us.scope) as scopes
-            FROM users u
-            LEFT JOIN user_scopes us ON u.id = us.user_id
-            GROUP BY u.id, u.username, u.email, u.role, u.is_active
-            ORDER BY u.id
-        """)
-        
-        users = cursor.fetchall()
-        conn.close()
+        with self.read_connection() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute("""
+                SELECT u.id, u.username, u.email, u.role, u.is_active,
+                       GROUP_CONCAT(us.scope) as scopes
+                FROM users u
+                LEFT JOIN user_scopes us ON u.id = us.user_id
+                GROUP BY u.id, u.username, u.email, u.role, u.is_active
+                ORDER BY u.id
+            """)
+            
+            users = cursor.fetchall()
         
         # Convert to the expected format
         result = []
@@ -281,16 +278,15 @@ class Database:
     
     def get_user_by_id(self, user_id: int) -> Optional[dict]:
         """Get user by ID"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            SELECT id, username, email, is_active, role, created_at
-            FROM users WHERE id = ?
-        """, (user_id,))
-        
-        user = cursor.fetchone()
-        conn.close()
+        with self.read_connection() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute("""
+                SELECT id, username, email, is_active, role, created_at
+                FROM users WHERE id = ?
+            """, (user_id,))
+            
+            user = cursor.fetchone()
         
         if user:
             return {
@@ -306,41 +302,39 @@ class Database:
     # Environment Variables methods
     def get_user_env_vars(self, user_id: int) -> list:
         """Get all environment variables for a user"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            SELECT name, value, created_at, updated_at 
-            FROM user_environment_variables 
-            WHERE user_id = ?
-            ORDER BY name
-        """, (user_id,))
-        
-        env_vars = []
-        for row in cursor.fetchall():
-            env_vars.append({
-                "name": row[0],
-                "value": row[1],
-                "created_at": row[2],
-                "updated_at": row[3]
-            })
+        with self.read_connection() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute("""
+                SELECT name, value, created_at, updated_at 
+                FROM user_environment_variables 
+                WHERE user_id = ?
+                ORDER BY name
+            """, (user_id,))
+            
+            env_vars = []
+            for row in cursor.fetchall():
+                env_vars.append({
+                    "name": row[0],
+                    "value": row[1],
+                    "created_at": row[2],
+                    "updated_at": row[3]
+                })
         
-        conn.close()
         return env_vars
     
     def get_user_env_var(self, user_id: int, name: str) -> dict:
         """Get a specific environment variable for a user"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            SELECT name, value, created_at, updated_at 
-            FROM user_environment_variables 
-            WHERE user_id = ? AND name = ?
-        """, (user_id, name))
-        
-        row = cursor.fetchone()
-        conn.close()
+        with self.read_connection() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute("""
+                SELECT name, value, created_at, updated_at 
+                FROM user_environment_variables 
+                WHERE user_id = ? AND name = ?
+            """, (user_id, name))
+            
+            row = cursor.fetchone()
         
         if row:
             return {
@@ -354,35 +348,234 @@ class Database:
     def set_user_env_var(self, user_id: int, name: str, value: str) -> bool:
         """Set/update an environment variable for a user"""
         try:
-            conn = self.get_connection()
+            with self.write_connection() as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute("""
+                    INSERT OR REPLACE INTO user_environment_variables 
+                    (user_id, name, value, updated_at)
+                    VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+                """, (user_id, name, value))
+                
+                conn.commit()
+            return True
+        except sqlite3.Error:
+            return False
+    
+    def delete_user_env_var(self, user_id: int, name: str) -> bool:
+        """Delete an environment variable for a user"""
+        try:
+            with self.write_connection() as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute("""
+                    DELETE FROM user_environment_variables 
+                    WHERE user_id = ? AND name = ?
+                """, (user_id, name))
+                
+                rows_affected = cursor.rowcount
+                conn.commit()
+            return rows_affected > 0
+        except sqlite3.Error:
+            return False
+    
+    # Refresh token methods
+    def create_refresh_token(self, user_id: int, token_hash: str, family_id: str, scopes: list, expires_at: int) -> bool:
+        """Store a refresh token by its digest"""
+        try:
+            with self.write_connection() as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute("""
+                    INSERT INTO refresh_tokens (user_id, token_hash, family_id, scopes, expires_at)
+                    VALUES (?, ?, ?, ?, ?)
+                """, (user_id, token_hash, family_id, " ".join(scopes), expires_at))
+                
+                conn.commit()
+            return True
+        except sqlite3.Error:
+            return False
+    
+    def get_refresh_token(self, token_hash: str) -> Optional[dict]:
+        """Get a refresh token by its digest, with the owner's username"""
+        with self.read_connection() as conn:
             cursor = conn.cursor()
             
             cursor.execute("""
-                INSERT OR REPLACE INTO user_environment_variables 
-                (user_id, name, value, updated_at)
-                VALUES (?, ?, ?, CURRENT_TIMESTAMP)
-            """, (user_id, name, value))
+                SELECT rt.user_id, u.username, rt.family_id, rt.scopes, rt.expires_at, rt.revoked
+                FROM refresh_tokens rt
+                JOIN users u ON u.id = rt.user_id
+                WHERE rt.token_hash = ?
+            """, (token_hash,))
             
-            conn.commit()
-            conn.close()
+            row = cursor.fetchone()
+            if row:
+                return {
+                    "user_id": row[0],
+                    "username": row[1],
+                    "family_id": row[2],
+                    "scopes": row[3].split(),
+                    "expires_at": row[4],
+                    "revoked": bool(row[5])
+                }
+        return None
+    
+    def rotate_refresh_token(self, token_hash: str, new_token_hash: str, expires_at: int) -> bool:
+        """Retire a refresh token and store its successor in the same family, atomically"""
+        try:
+            with self.write_connection() as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute("""
+                    UPDATE refresh_tokens SET revoked = TRUE
+                    WHERE token_hash = ? AND revoked = FALSE
+                """, (token_hash,))
+                if cursor.rowcount != 1:
+                    # Already rotated (possibly by a concurrent request)
+                    conn.rollback()
+                    return False
+                
+                cursor.execute("""
+                    INSERT INTO refresh_tokens (user_id, token_hash, family_id, scopes, expires_at)
+                    SELECT user_id, ?, family_id, scopes, ?
+                    FROM refresh_tokens WHERE token_hash = ?
+                """, (new_token_hash, expires_at, token_hash))
+                
+                conn.commit()
             return True
         except sqlite3.Error:
             return False
     
-    def delete_user_env_var(self, user_id: int, name: str) -> bool:
-        """Delete an environment variable for a user"""
+    def revoke_refresh_token_family(self, family_id: str) -> int:
+        """Revoke every refresh token descended from one login"""
+        try:
+            with self.write_connection() as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute("""
+                    UPDATE refresh_tokens SET revoked = TRUE
+                    WHERE family_id = ? AND revoked = FALSE
+                """, (family_id,))
+                
+                rows_affected = cursor.rowcount
+                conn.commit()
+            return rows_affected
+        except sqlite3.Error:
+            return 0
+    
+    # API key methods
+    def create_api_key(self, user_id: int, key_hash: str, prefix: str, name: str, scopes: list, created_by: str) -> Optional[int]:
+        """Store an API key by its digest and return its id"""
         try:
-            conn = self.get_connection()
+            with self.write_connection() as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute("""
+                    INSERT INTO api_keys (user_id, key_hash, prefix, name, scopes, created_by)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                """, (user_id, key_hash, prefix, name, " ".join(scopes), created_by))
+                
+                key_id = cursor.lastrowid
+                conn.commit()
+            return key_id
+        except sqlite3.Error:
+            return None
+    
+    def get_api_key(self, key_hash: str) -> Optional[dict]:
+        """Get an active API key by its digest, with the owner's username"""
+        with self.read_connection() as conn:
             cursor = conn.cursor()
             
             cursor.execute("""
-                DELETE FROM user_environment_variables 
-                WHERE user_id = ? AND name = ?
-            """, (user_id, name))
+                SELECT k.id, k.user_id, u.username, k.name, k.scopes
+                FROM api_keys k
+                JOIN users u ON u.id = k.user_id
+                WHERE k.key_hash = ? AND k.revoked = FALSE
+            """, (key_hash,))
             
-            rows_affected = cursor.rowcount
-            conn.commit()
-            conn.close()
+            row = cursor.fetchone()
+            if row:
+                return {
+                    "id": row[0],
+                    "user_id": row[1],
+                    "username": row[2],
+                    "name": row[3],
+                    "scopes": row[4].split()
+                }
+        return None
+    
+    def revoke_api_key(self, key_id: int) -> bool:
+        """Revoke an API key"""
+        try:
+            with self.write_connection() as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute("""
+                    UPDATE api_keys SET revoked = TRUE
+                    WHERE id = ? AND revoked = FALSE
+                """, (key_id,))
+                
+                rows_affected = cursor.rowcount
+                conn.commit()
             return rows_affected > 0
         except sqlite3.Error:
             return False
+    
+    # Auth epoch methods
+    def get_auth_epoch(self, user_id: int) -> Optional[int]:
+        """Get a user's auth epoch, or None if the user is missing or inactive"""
+        with self.read_connection() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute("""
+                SELECT auth_epoch FROM users WHERE id = ? AND is_active = TRUE
+            """, (user_id,))
+            
+            row = cursor.fetchone()
+        return row[0] if row else None
+    
+    def set_user_active(self, user_id: int, is_active: bool) -> bool:
+        """Activate or deactivate a user, invalidating their outstanding tokens"""
+        try:
+            with self.write_connection() as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute("""
+                    UPDATE users SET is_active = ?, auth_epoch = auth_epoch + 1 WHERE id = ?
+                """, (is_active, user_id))
+                
+                rows_affected = cursor.rowcount
+                conn.commit()
+            return rows_affected > 0
+        except sqlite3.Error:
+            return False
+    
+    # Token denylist methods
+    def revoke_token(self, jti: str, user_id: Optional[int], expires_at: int, revoked_at: float) -> bool:
+        """Deny an access token id until it expires, purging entries that already have"""
+        try:
+            with self.write_connection() as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute("""
+                    INSERT OR IGNORE INTO revoked_tokens (jti, user_id, expires_at, revoked_at)
+                    VALUES (?, ?, ?, ?)
+                """, (jti, user_id, expires_at, revoked_at))
+                cursor.execute("DELETE FROM revoked_tokens WHERE expires_at <= ?", (int(revoked_at),))
+                
+                conn.commit()
+            return True
+        except sqlite3.Error:
+            return False
+    
+    def get_revoked_tokens(self, since: float) -> list:
+        """Get unexpired denied token ids revoked at or after ``since`` as (jti, expires_at, revoked_at)"""
+        with self.read_connection() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute("""
+                SELECT jti, expires_at, revoked_at FROM revoked_tokens
+                WHERE revoked_at >= ? AND expires_at > ?
+            """, (since, int(time.time())))
+            
+            return [tuple(row) for row in cursor.fetchall()]
\ No newline at end of file
@@ -1,19 +1,90 @@
 import os
-from typing import Union
+from typing import Optional
+from .async_database import AsyncDatabaseAdapter
 from .database import Database
+from .metrics import InstrumentedDatabase
+from .offload import BoundedExecutor
 from .postgres_database import PostgreSQLDatabase
 
-def get_database() -> Union[Database, PostgreSQLDatabase]:
-    """Factory function to get the appropriate database instance"""
+def _pool_settings() -> dict:
+    max_lifetime = float(os.getenv("DATABASE_POOL_MAX_LIFETIME", "3600"))
+    return {
+        "pool_min_size": int(os.getenv("DATABASE_POOL_MIN_SIZE", "1")),
+        "pool_max_size": int(os.getenv("DATABASE_POOL_MAX_SIZE", "10")),
+        "pool_timeout": float(os.getenv("DATABASE_POOL_TIMEOUT", "30")),
+        "pool_max_lifetime": max_lifetime if max_lifetime > 0 else None,
+    }
+
+def _db_executors(connections: int, writers: int) -> tuple:
+    """Read and write executors for a synchronous backend, sized to its connections.
+
+    DB_READ_WORKERS / DB_WRITE_WORKERS override the sizes (0 keeps the default).
+    """
+    reads = int(os.getenv("DB_READ_WORKERS", "0")) or connections
+    writes = int(os.getenv("DB_WRITE_WORKERS", "0")) or writers
+    return BoundedExecutor("db_read", reads), BoundedExecutor("db_write", writes)
+
+def database_identity() -> str:
+    """The configured database, as backend and location, e.g. to scope caches of its data"""
+    db_type = os.getenv("DATABASE_TYPE", "postgresql").lower()
+    if db_type in ("postgresql", "postgres", "asyncpg"):
+        return f"postgresql:{os.getenv('DATABASE_URL', '')}"
+    return f"sqlite:{os.path.abspath(os.getenv('DATABASE_PATH', 'auth.db'))}"
+
+def get_database(auto_migrate: Optional[bool] = None):
+    """Factory function to get the appropriate database instance.
+
+    ``auto_migrate`` defaults to the DATABASE_AUTO_MIGRATE environment variable.
+    """
     db_type = os.getenv("DATABASE_TYPE", "postgresql").lower()
+    if auto_migrate is None:
+        auto_migrate = os.getenv("DATABASE_AUTO_MIGRATE", "true").lower() in ("1", "true", "yes")
     
-    if db_type == "postgresql" or db_type == "postgres":
+    if db_type in ("postgresql", "postgres", "asyncpg"):
         connection_string = os.getenv(
             "DATABASE_URL",
             "host=localhost port=5432 dbname=specs_auth user=specs_user password=specs_password"
         )
-        return PostgreSQLDatabase(connection_string)
+        if db_type == "asyncpg":
+            # Imported lazily so asyncpg is only required when this backend is selected
+            from .async_postgres_database import AsyncPostgreSQLDatabase
+            return AsyncPostgreSQLDatabase(connection_string, auto_migrate=auto_migrate, **_pool_settings())
+        return PostgreSQLDatabase(
+            connection_string,
+            pool_health_check_after=float(os.getenv("DATABASE_POOL_HEALTH_CHECK_AFTER", "5")),
+            auto_migrate=auto_migrate,
+            **_pool_settings(),
+        )
     else:
         # Default to SQLite
         db_path = os.getenv("DATABASE_PATH", "auth.db")
-        return Database(db_path)
+        return Database(
+            db_path,
+            journal_mode=os.getenv("SQLITE_JOURNAL_MODE", "WAL"),
+            synchronous=os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"),
+            mmap_size=int(os.getenv("SQLITE_MMAP_SIZE", "268435456")),
+            cache_size=int(os.getenv("SQLITE_CACHE_SIZE", "-64000")),
+            busy_timeout=int(os.getenv("SQLITE_BUSY_TIMEOUT", "5000")),
+            auto_migrate=auto_migrate,
+        )
+
+def get_async_database():
+    """Get the configured database behind an awaitable interface.
+
+    The asyncpg backend is natively async; the synchronous backends are
+    wrapped in an AsyncDatabaseAdapter that runs their methods on dedicated
+    read and write thread pools. Either way, backend methods are timed for
+    the db_query_duration_seconds metric.
+    """
+    db = get_database()
+    if isinstance(db, Database):
+        # One reader connection per read thread; writes share a single connection
+        reads, writes = _db_executors(int(os.getenv("DATABASE_READ_THREADS", "10")), 1)
+        return InstrumentedDatabase(AsyncDatabaseAdapter(db, reads, writes), "sqlite")
+    if isinstance(db, PostgreSQLDatabase):
+        # Reads and writes together never wait on the pool for a connection
+        connections = db.pool.max_size
+        writers = max(1, connections // 4)
+        reads, writes = _db_executors(max(1, connections - writers), writers)
+        return InstrumentedDatabase(AsyncDatabaseAdapter(db, reads, writes), "postgresql")
+    return InstrumentedDatabase(db, "asyncpg")
@@ -0,0 +1,147 @@
+import hashlib
+import math
+import threading
+import time
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings; no false negatives, ``error_rate`` false positives at capacity"""
+
+    def __init__(self, capacity: int = 100_000, error_rate: float = 0.001):
+        self.capacity = max(1, capacity)
+        self.error_rate = error_rate
+        self.size = max(8, int(-self.capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / self.capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item: str):
+        # Double hashing: k positions from one 128-bit digest
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, item: str):
+        for position in self._positions(item):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+class TokenDenylist:
+    """In-process view of the revoked token table.
+
+    A Bloom filter answers "not revoked" for almost every token without
+    touching the exact set; only its rare positives are confirmed there.
+    Entries are dropped once their token has expired, since an expired
+    token is rejected anyway. The filter cannot delete, so it is rebuilt
+    from the exact set when entries expire or it outgrows its capacity.
+    ``cursor`` is the newest ``revoked_at`` merged, for incremental refreshes.
+    """
+
+    # Rows are read back from slightly before the cursor, in case a revocation
+    # stamped earlier by another worker committed after our last read
+    REFRESH_OVERLAP = 2.0
+
+    def __init__(
+        self,
+        capacity: int = 100_000,
+        error_rate: float = 0.001,
+        refresh_interval: float = 5.0,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.refresh_interval = refresh_interval
+        self._clock = clock
+        self._entries: Dict[str, float] = {}
+        self._bloom = BloomFilter(capacity, error_rate)
+        self._next_expiry = math.inf
+        self._lock = threading.Lock()
+        self.cursor = 0.0
+        self.last_refresh = -math.inf
+        self.checks = 0
+        self.bloom_positives = 0
+        self.false_positives = 0
+        self.rebuilds = 0
+
+    def claim_refresh(self) -> Optional[float]:
+        """If a refresh is due, mark it started and return the ``revoked_at`` to read from"""
+        with self._lock:
+            now = self._clock()
+            if now - self.last_refresh < self.refresh_interval:
+                return None
+            self.last_refresh = now
+            return max(0.0, self.cursor - self.REFRESH_OVERLAP)
+
+    def add(self, jti: str, expires_at: float):
+        """Deny a token id until ``expires_at``"""
+        with self._lock:
+            self._add(jti, expires_at)
+
+    def _add(self, jti: str, expires_at: float):
+        if expires_at <= self._clock() or jti in self._entries:
+            return
+        self._entries[jti] = expires_at
+        self._next_expiry = min(self._next_expiry, expires_at)
+        if self._bloom.count >= self._bloom.capacity:
+            self._rebuild()
+        else:
+            self._bloom.add(jti)
+
+    def merge(self, rows: Iterable[Tuple[str, float, float]]):
+        """Add ``(jti, expires_at, revoked_at)`` rows from the database and advance the cursor"""
+        with self._lock:
+            now = self._clock()
+            if now >= self._next_expiry:
+                self._expire(now)
+            for jti, expires_at, revoked_at in rows:
+                self._add(jti, expires_at)
+                self.cursor = max(self.cursor, revoked_at)
+
+    def __contains__(self, jti: str) -> bool:
+        with self._lock:
+            self.checks += 1
+            if jti not in self._bloom:
+                return False
+            self.bloom_positives += 1
+            now = self._clock()
+            if now >= self._next_expiry:
+                self._expire(now)
+            if jti in self._entries:
+                return True
+            self.false_positives += 1
+            return False
+
+    def _expire(self, now: float):
+        self._entries = {jti: exp for jti, exp in self._entries.items() if exp > now}
+        self._next_expiry = min(self._entries.values(), default=math.inf)
+        self._rebuild()
+
+    def _rebuild(self):
+        # Size for the live entries with headroom, never below the configured capacity
+        self._bloom = BloomFilter(max(self.capacity, 2 * len(self._entries)), self.error_rate)
+        for jti in self._entries:
+            self._bloom.add(jti)
+        self.rebuilds += 1
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> dict:
+        """Get size and lookup counters"""
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "bloom_capacity": self._bloom.capacity,
+                "bloom_bits": self._bloom.size,
+                "checks": self.checks,
+                "bloom_positives": self.bloom_positives,
+                "false_positives": self.false_positives,
+                "rebuilds": self.rebuilds,
+                "cursor": self.cursor,
+            }
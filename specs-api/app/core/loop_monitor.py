@@ -0,0 +1,149 @@
+import asyncio
+import bisect
+import collections
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Stack frames under this directory are the application's own code
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+LAG_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+def _blocking_site(stack: traceback.StackSummary) -> str:
+    """Innermost application frame of a stack, e.g. ``app/core/database.py:get_user``"""
+    for frame in reversed(stack):
+        if frame.filename.startswith(APP_DIR + os.sep):
+            return f"{os.path.relpath(frame.filename, os.path.dirname(APP_DIR))}:{frame.name}"
+    return "<external>"
+
+
+class LoopMonitor:
+    """Measures event loop lag and catches callbacks that block the loop.
+
+    A watchdog thread schedules a no-op on the loop every ``interval``
+    seconds; how long it takes to run is the loop's lag. If it hasn't run
+    after ``block_threshold`` seconds, the loop is stuck in a callback: the
+    watchdog snapshots the loop thread's stack and, once the loop is back,
+    records the stall under the innermost application frame of that stack.
+    Lag and stalls are reported on /metrics and at /api/v1/admin/event-loop.
+    """
+
+    def __init__(self, enabled: bool = True, interval: float = 0.05, block_threshold: float = 0.1, max_events: int = 50):
+        self.enabled = enabled
+        self.interval = interval
+        self.block_threshold = block_threshold
+        self.lag_buckets = [0] * (len(LAG_BUCKETS) + 1)
+        self.lag_sum = 0.0
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+        self.sites = {}
+        self.events = collections.deque(maxlen=max_events)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @classmethod
+    def from_env(cls) -> "LoopMonitor":
+        return cls(
+            enabled=os.getenv("LOOP_MONITOR", "true").lower() in ("1", "true", "yes"),
+            interval=float(os.getenv("LOOP_MONITOR_INTERVAL_MS", "50")) / 1000,
+            block_threshold=float(os.getenv("LOOP_BLOCK_THRESHOLD_MS", "100")) / 1000,
+        )
+
+    def start(self, loop: Optional[asyncio.AbstractEventLoop] = None):
+        """Start watching ``loop`` (the running loop by default) from a daemon thread"""
+        if not self.enabled or self._thread is not None:
+            return
+        loop = loop or asyncio.get_running_loop()
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._watch, args=(loop, threading.get_ident()), name="loop-monitor", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        """Stop the watchdog thread"""
+        thread, self._thread = self._thread, None
+        if thread is not None:
+            self._stop.set()
+            thread.join()
+
+    def _watch(self, loop: asyncio.AbstractEventLoop, loop_thread: int):
+        while not self._stop.is_set():
+            ran = threading.Event()
+            sent_at = time.perf_counter()
+            try:
+                loop.call_soon_threadsafe(ran.set)
+            except RuntimeError:
+                return  # the loop has been closed
+            stack = None
+            if not ran.wait(self.block_threshold):
+                frame = sys._current_frames().get(loop_thread)
+                stack = traceback.extract_stack(frame) if frame is not None else traceback.StackSummary()
+                del frame
+                while not ran.wait(0.5):
+                    if self._stop.is_set() or loop.is_closed():
+                        return
+            lag = time.perf_counter() - sent_at
+            self._record_lag(lag)
+            if stack is not None:
+                self._record_block(lag, stack)
+            self._stop.wait(self.interval)
+
+    def _record_lag(self, lag: float):
+        with self._lock:
+            self.lag_buckets[bisect.bisect_left(LAG_BUCKETS, lag)] += 1
+            self.lag_sum += lag
+            self.last_lag = lag
+            self.max_lag = max(self.max_lag, lag)
+
+    def _record_block(self, duration: float, stack: traceback.StackSummary):
+        site = _blocking_site(stack)
+        lines = [line.rstrip() for line in stack.format()[-20:]]
+        logger.warning("Event loop blocked for %.0f ms in %s:\n%s", duration * 1000, site, "".join(stack.format()[-5:]).rstrip())
+        with self._lock:
+            stats = self.sites.get(site)
+            if stats is None:
+                stats = self.sites[site] = {"count": 0, "total_seconds": 0.0, "max_seconds": 0.0}
+            stats["count"] += 1
+            stats["total_seconds"] += duration
+            stats["max_seconds"] = max(stats["max_seconds"], duration)
+            stats["stack"] = lines
+            self.events.append({"site": site, "duration_ms": round(duration * 1000, 1), "at": time.time(), "stack": lines})
+
+    def lag_histogram(self) -> tuple:
+        """Cumulative (upper bound, count) buckets and the sum of all lag samples"""
+        with self._lock:
+            counts, total = list(self.lag_buckets), self.lag_sum
+        cumulative, buckets = 0, []
+        for bound, count in zip([*LAG_BUCKETS, float("inf")], counts):
+            cumulative += count
+            buckets.append((bound, cumulative))
+        return buckets, total
+
+    def report(self) -> dict:
+        """Lag figures plus blocking sites, worst first, with their latest stack"""
+        with self._lock:
+            sites = sorted(
+                ({"site": site, **stats} for site, stats in self.sites.items()),
+                key=lambda entry: entry["total_seconds"], reverse=True,
+            )
+            return {
+                "running": self._thread is not None,
+                "interval_ms": self.interval * 1000,
+                "block_threshold_ms": self.block_threshold * 1000,
+                "lag_ms": {"last": round(self.last_lag * 1000, 2), "max": round(self.max_lag * 1000, 2)},
+                "blocking_sites": [{**entry, "stack": list(entry["stack"])} for entry in sites],
+                "recent_blocks": list(self.events),
+            }
+
+
+loop_monitor = LoopMonitor.from_env()
@@ -0,0 +1,269 @@
+import asyncio
+import os
+import time
+from typing import Callable, Iterable, Optional
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily, HistogramMetricFamily
+from prometheus_client.multiprocess import MultiProcessCollector
+from .async_database import ASYNC_METHODS
+from .loop_monitor import loop_monitor
+from .server_timing import timing_phase
+
+# Every metric is labelled, so processes that only import this module (e.g. the
+# password hash pool) never create series or, in multi-process mode, files
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Time from receiving a request to sending the end of its response",
+    ["method", "route"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+REQUESTS = Counter("http_requests_total", "Responses sent", ["method", "route", "status"])
+IN_PROGRESS = Gauge(
+    "http_requests_in_progress", "Requests being handled", ["method"], multiprocess_mode="livesum"
+)
+PASSWORD_HASH_LATENCY = Histogram(
+    "password_hash_duration_seconds",
+    "bcrypt run time on the password hash executor",
+    ["operation"],
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0, 2.0, 5.0),
+)
+PASSWORD_HASH_QUEUE_WAIT = Histogram(
+    "password_hash_queue_wait_seconds",
+    "Time password hash calls waited for a free executor worker",
+    ["operation"],
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+DB_QUERY_LATENCY = Histogram(
+    "db_query_duration_seconds",
+    "Time spent in each database backend method, including waiting for a connection",
+    ["backend", "method"],
+    buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0),
+)
+DB_QUERY_ERRORS = Counter("db_query_errors_total", "Database backend methods that raised", ["backend", "method"])
+DB_STATEMENT_LATENCY = Histogram(
+    "db_statement_duration_seconds",
+    "Execution time of each SQL statement, by the backend method that ran it",
+    ["backend", "method"],
+    buckets=(0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0),
+)
+DB_STATEMENT_ROWS = Counter("db_statement_rows_total", "Rows returned or changed by SQL statements", ["backend", "method"])
+DB_SLOW_STATEMENTS = Counter(
+    "db_slow_statements_total", "SQL statements slower than SLOW_QUERY_THRESHOLD_MS", ["backend", "method"]
+)
+OFFLOAD_QUEUE_WAIT = Histogram(
+    "offload_queue_wait_seconds",
+    "Time blocking calls waited for a thread of their executor (db_read, db_write)",
+    ["executor"],
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+OFFLOAD_CANCELLED = Counter(
+    "offload_cancelled_total", "Queued blocking calls dropped because their request was cancelled", ["executor"]
+)
+
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+def route_template(scope) -> str:
+    """Path template of the route that handled a request, e.g. ``/api/v1/users/{user_id}/scopes``"""
+    route = scope.get("route")
+    path_format = getattr(route, "path_format", None)
+    if path_format is None:
+        return UNMATCHED_ROUTE
+    convertors = getattr(route, "param_convertors", {})
+    params = {
+        name: convertors[name].to_string(value) if name in convertors else value
+        for name, value in scope.get("path_params", {}).items()
+    }
+    try:
+        rendered = path_format.format(**params)
+    except (KeyError, IndexError, ValueError):
+        return path_format
+    # Routes of an included router may report their template without the router's prefix
+    path = scope.get("path", "")
+    if path != rendered and path.endswith(rendered):
+        return path[:len(path) - len(rendered)] + path_format
+    return path_format
+
+
+def multiprocess_mode() -> bool:
+    """Whether workers share metrics through PROMETHEUS_MULTIPROC_DIR (set by the launcher)"""
+    return bool(os.getenv("PROMETHEUS_MULTIPROC_DIR"))
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency, status and in-flight count per route template.
+
+    The route label is the matched path template (``/users/{user_id}/scopes``),
+    so label cardinality is bounded by the number of routes; requests that
+    match no route share ``UNMATCHED_ROUTE``.
+    """
+
+    def __init__(self, app, clock: Callable[[], float] = time.perf_counter):
+        self.app = app
+        self.clock = clock
+        # labels() validates and locks on every call; the children never change, so keep them
+        self._in_progress = {}
+        self._recorders = {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = 500
+        started_at = self.clock()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        in_progress = self._in_progress.get(method)
+        if in_progress is None:
+            in_progress = self._in_progress[method] = IN_PROGRESS.labels(method)
+        in_progress.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except asyncio.CancelledError:
+            # Client closed the connection before the response (nginx's convention)
+            if status == 500:
+                status = 499
+            raise
+        finally:
+            in_progress.dec()
+            key = (method, route_template(scope), status)
+            recorder = self._recorders.get(key)
+            if recorder is None:
+                recorder = self._recorders[key] = (REQUEST_LATENCY.labels(*key[:2]), REQUESTS.labels(*key[:2], str(status)))
+            recorder[0].observe(self.clock() - started_at)
+            recorder[1].inc()
+
+
+class InstrumentedDatabase:
+    """Async database wrapper that times every backend method listed in ``ASYNC_METHODS``.
+
+    Other attributes (pool stats, token helpers, connect/close) pass through.
+    Timed wrappers are built once per method and kept on the instance.
+    """
+
+    def __init__(self, db, backend: str):
+        self.db = db
+        self.backend = backend
+
+    def __getattr__(self, name: str):
+        attr = getattr(self.db, name)
+        if name not in ASYNC_METHODS:
+            return attr
+
+        latency = DB_QUERY_LATENCY.labels(self.backend, name)
+        errors = DB_QUERY_ERRORS.labels(self.backend, name)
+
+        async def call(*args, **kwargs):
+            started_at = time.perf_counter()
+            try:
+                with timing_phase("db"):
+                    return await attr(*args, **kwargs)
+            except Exception:
+                errors.inc()
+                raise
+            finally:
+                latency.observe(time.perf_counter() - started_at)
+
+        call.__name__ = name
+        setattr(self, name, call)
+        return call
+
+
+class RuntimeCollector:
+    """Scrape-time collector for connection pools, caches, the password hash executor and the event loop.
+
+    Reads the ``stats()`` the components already keep, so it adds nothing to
+    the request path. These are per process: in multi-process mode they
+    describe the worker that answered the scrape, labelled with its pid.
+    """
+
+    def __init__(self, registry):
+        self.registry = registry
+
+    def collect(self) -> Iterable:
+        pid = [str(os.getpid())] if multiprocess_mode() else []
+        label_names = ["pid"] if pid else []
+
+        connections = GaugeMetricFamily("db_connections", "Database connections held by this process", labels=label_names + ["state"])
+        checkouts = CounterMetricFamily("db_pool_checkouts", "Connections checked out of the pool", labels=label_names)
+        offloaded = GaugeMetricFamily("offload_pending", "Blocking calls running or queued on an executor", labels=label_names + ["executor"])
+        db = self.registry.database
+        if db is not None:
+            stats = db.pool_stats()
+            if "in_use" in stats:
+                connections.add_metric(pid + ["in_use"], stats["in_use"])
+                connections.add_metric(pid + ["idle"], stats["idle"])
+            else:
+                # SQLite: one reader per thread plus the shared writer
+                connections.add_metric(pid + ["reader"], stats.get("readers", 0))
+                connections.add_metric(pid + ["writer"], int(stats.get("writer_open", False)))
+            if "checkouts" in stats:
+                checkouts.add_metric(pid, stats["checkouts"])
+            executor_stats = getattr(db, "executor_stats", None)
+            for name, stats in (executor_stats() if executor_stats is not None else {}).items():
+                offloaded.add_metric(pid + [name], stats["pending"])
+        yield connections
+        yield checkouts
+        yield offloaded
+
+        hits = CounterMetricFamily("cache_hits", "Cache lookups that found a live entry", labels=label_names + ["cache"])
+        misses = CounterMetricFamily("cache_misses", "Cache lookups that found nothing", labels=label_names + ["cache"])
+        ratio = GaugeMetricFamily("cache_hit_ratio", "Hits over lookups since start", labels=label_names + ["cache"])
+        entries = GaugeMetricFamily("cache_entries", "Live entries", labels=label_names + ["cache"])
+        hasher = GaugeMetricFamily("password_hash_pending", "Password hash calls running or queued", labels=label_names)
+        rejected = CounterMetricFamily("password_hash_rejected", "Password hash calls refused as busy", labels=label_names)
+        for service in self.registry.services():
+            cache_stats = getattr(service, "cache_stats", None)
+            for name, stats in (cache_stats() if cache_stats is not None else {}).items():
+                hits.add_metric(pid + [name], stats["hits"])
+                misses.add_metric(pid + [name], stats["misses"])
+                ratio.add_metric(pid + [name], stats["hit_ratio"])
+                entries.add_metric(pid + [name], stats["size"])
+            password_hasher = getattr(service, "password_hasher", None)
+            if password_hasher is not None:
+                stats = password_hasher.stats()
+                hasher.add_metric(pid, stats["pending"])
+                rejected.add_metric(pid, stats["rejected"])
+        yield from (hits, misses, ratio, entries, hasher, rejected)
+
+        lag = HistogramMetricFamily("event_loop_lag_seconds", "Delay before the event loop ran a scheduled callback", labels=label_names)
+        buckets, total = loop_monitor.lag_histogram()
+        lag.add_metric(pid, [(str(bound) if bound != float("inf") else "+Inf", count) for bound, count in buckets], total)
+        blocked = CounterMetricFamily("event_loop_blocked", "Stalls longer than LOOP_BLOCK_THRESHOLD_MS, by blocking code", labels=label_names + ["site"])
+        blocked_time = CounterMetricFamily("event_loop_blocked_seconds", "Time the event loop spent stalled, by blocking code", labels=label_names + ["site"])
+        for entry in loop_monitor.report()["blocking_sites"]:
+            blocked.add_metric(pid + [entry["site"]], entry["count"])
+            blocked_time.add_metric(pid + [entry["site"]], entry["total_seconds"])
+        yield from (lag, blocked, blocked_time)
+
+
+_runtime_collector: Optional[RuntimeCollector] = None
+
+
+def register_runtime_collector(registry):
+    """Report pool, cache and executor stats of ``registry`` (a DatabaseRegistry) on /metrics"""
+    global _runtime_collector
+    if _runtime_collector is None:
+        _runtime_collector = RuntimeCollector(registry)
+        if not multiprocess_mode():
+            REGISTRY.register(_runtime_collector)
+
+
+def render_metrics() -> tuple:
+    """Current metrics in the Prometheus text format, as (body, content type)"""
+    if not multiprocess_mode():
+        return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
+    # Merge every worker's files, plus this worker's scrape-time stats
+    registry = CollectorRegistry()
+    MultiProcessCollector(registry)
+    if _runtime_collector is not None:
+        registry.register(_runtime_collector)
+    return generate_latest(registry), CONTENT_TYPE_LATEST
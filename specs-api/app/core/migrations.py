@@ -0,0 +1,332 @@
+from typing import Callable, ContextManager, List, Optional
+
+DIALECTS = ("sqlite", "postgresql")
+
+# Arbitrary constant identifying the migration lock among PostgreSQL advisory locks
+MIGRATION_LOCK_ID = 72_410_501
+
+# Default admin account, password "admin123"; change it after the first login
+DEFAULT_ADMIN_PASSWORD_HASH = "$2b$12$SvIkmEk6W1UogNNP5ir3kudZBt4objGguyj9V2q0QA0ZQwyrdOKCe"
+
+
+class Migration:
+    """One schema change, with the statements to run for each dialect"""
+
+    __slots__ = ("version", "description", "statements")
+
+    def __init__(self, version: int, description: str, sqlite: List[str], postgresql: List[str]):
+        self.version = version
+        self.description = description
+        self.statements = {"sqlite": sqlite, "postgresql": postgresql}
+
+
+# Ordered schema history. Never edit an applied migration; append a new one.
+MIGRATIONS = [
+    Migration(
+        1,
+        "create users, user_scopes and user_environment_variables",
+        sqlite=[
+            """
+            CREATE TABLE IF NOT EXISTS users (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                username TEXT UNIQUE NOT NULL,
+                email TEXT UNIQUE NOT NULL,
+                hashed_password TEXT NOT NULL,
+                is_active BOOLEAN DEFAULT TRUE,
+                role TEXT DEFAULT 'user',
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS user_scopes (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id INTEGER NOT NULL,
+                scope TEXT NOT NULL,
+                granted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                granted_by TEXT DEFAULT 'system',
+                FOREIGN KEY (user_id) REFERENCES users (id),
+                UNIQUE(user_id, scope)
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS user_environment_variables (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id INTEGER NOT NULL,
+                name TEXT NOT NULL,
+                value TEXT NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (user_id) REFERENCES users (id),
+                UNIQUE(user_id, name)
+            )
+            """,
+        ],
+        postgresql=[
+            """
+            CREATE TABLE IF NOT EXISTS users (
+                id SERIAL PRIMARY KEY,
+                username VARCHAR(255) UNIQUE NOT NULL,
+                email VARCHAR(255) UNIQUE NOT NULL,
+                hashed_password TEXT NOT NULL,
+                is_active BOOLEAN DEFAULT TRUE,
+                role VARCHAR(50) DEFAULT 'user',
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS user_scopes (
+                id SERIAL PRIMARY KEY,
+                user_id INTEGER NOT NULL,
+                scope VARCHAR(255) NOT NULL,
+                granted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                granted_by VARCHAR(255) DEFAULT 'system',
+                FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE,
+                UNIQUE(user_id, scope)
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS user_environment_variables (
+                id SERIAL PRIMARY KEY,
+                user_id INTEGER NOT NULL,
+                name VARCHAR(255) NOT NULL,
+                value TEXT NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE,
+                UNIQUE(user_id, name)
+            )
+            """,
+        ],
+    ),
+    Migration(
+        2,
+        "seed default admin user",
+        sqlite=[
+            f"""
+            INSERT OR IGNORE INTO users (username, email, hashed_password, role)
+            VALUES ('admin', 'admin@example.com', '{DEFAULT_ADMIN_PASSWORD_HASH}', 'admin')
+            """,
+            """
+            INSERT OR IGNORE INTO user_scopes (user_id, scope, granted_by)
+            SELECT u.id, s.scope, 'system'
+            FROM users u, (
+                SELECT 'read_profile' AS scope UNION ALL SELECT 'write_profile'
+                UNION ALL SELECT 'read_users' UNION ALL SELECT 'admin'
+            ) s
+            WHERE u.username = 'admin'
+            """,
+        ],
+        postgresql=[
+            f"""
+            INSERT INTO users (username, email, hashed_password, role)
+            VALUES ('admin', 'admin@example.com', '{DEFAULT_ADMIN_PASSWORD_HASH}', 'admin')
+            ON CONFLICT (username) DO NOTHING
+            """,
+            """
+            INSERT INTO user_scopes (user_id, scope, granted_by)
+            SELECT u.id, s.scope, 'system'
+            FROM users u, (VALUES ('read_profile'), ('write_profile'), ('read_users'), ('admin')) AS s(scope)
+            WHERE u.username = 'admin'
+            ON CONFLICT (user_id, scope) DO NOTHING
+            """,
+        ],
+    ),
+    Migration(
+        3,
+        "create refresh_tokens",
+        sqlite=[
+            """
+            CREATE TABLE IF NOT EXISTS refresh_tokens (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id INTEGER NOT NULL,
+                token_hash TEXT UNIQUE NOT NULL,
+                family_id TEXT NOT NULL,
+                scopes TEXT NOT NULL DEFAULT '',
+                expires_at INTEGER NOT NULL,
+                revoked BOOLEAN NOT NULL DEFAULT FALSE,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE
+            )
+            """,
+            "CREATE INDEX IF NOT EXISTS idx_refresh_tokens_family ON refresh_tokens (family_id)",
+        ],
+        postgresql=[
+            """
+            CREATE TABLE IF NOT EXISTS refresh_tokens (
+                id SERIAL PRIMARY KEY,
+                user_id INTEGER NOT NULL,
+                token_hash CHAR(64) UNIQUE NOT NULL,
+                family_id VARCHAR(64) NOT NULL,
+                scopes TEXT NOT NULL DEFAULT '',
+                expires_at BIGINT NOT NULL,
+                revoked BOOLEAN NOT NULL DEFAULT FALSE,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE
+            )
+            """,
+            "CREATE INDEX IF NOT EXISTS idx_refresh_tokens_family ON refresh_tokens (family_id)",
+        ],
+    ),
+    Migration(
+        4,
+        "create api_keys",
+        sqlite=[
+            """
+            CREATE TABLE IF NOT EXISTS api_keys (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id INTEGER NOT NULL,
+                key_hash TEXT UNIQUE NOT NULL,
+                prefix TEXT NOT NULL,
+                name TEXT NOT NULL,
+                scopes TEXT NOT NULL DEFAULT '',
+                created_by TEXT NOT NULL,
+                revoked BOOLEAN NOT NULL DEFAULT FALSE,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE
+            )
+            """,
+        ],
+        postgresql=[
+            """
+            CREATE TABLE IF NOT EXISTS api_keys (
+                id SERIAL PRIMARY KEY,
+                user_id INTEGER NOT NULL,
+                key_hash CHAR(64) UNIQUE NOT NULL,
+                prefix VARCHAR(32) NOT NULL,
+                name VARCHAR(255) NOT NULL,
+                scopes TEXT NOT NULL DEFAULT '',
+                created_by VARCHAR(255) NOT NULL,
+                revoked BOOLEAN NOT NULL DEFAULT FALSE,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE
+            )
+            """,
+        ],
+    ),
+    Migration(
+        5,
+        "add users.auth_epoch",
+        sqlite=["ALTER TABLE users ADD COLUMN auth_epoch INTEGER NOT NULL DEFAULT 0"],
+        postgresql=["ALTER TABLE users ADD COLUMN IF NOT EXISTS auth_epoch INTEGER NOT NULL DEFAULT 0"],
+    ),
+    Migration(
+        6,
+        "create revoked_tokens",
+        sqlite=[
+            """
+            CREATE TABLE IF NOT EXISTS revoked_tokens (
+                jti TEXT PRIMARY KEY,
+                user_id INTEGER,
+                expires_at INTEGER NOT NULL,
+                revoked_at REAL NOT NULL
+            )
+            """,
+            "CREATE INDEX IF NOT EXISTS idx_revoked_tokens_revoked_at ON revoked_tokens (revoked_at)",
+            "CREATE INDEX IF NOT EXISTS idx_revoked_tokens_expires_at ON revoked_tokens (expires_at)",
+        ],
+        postgresql=[
+            """
+            CREATE TABLE IF NOT EXISTS revoked_tokens (
+                jti VARCHAR(64) PRIMARY KEY,
+                user_id INTEGER,
+                expires_at BIGINT NOT NULL,
+                revoked_at DOUBLE PRECISION NOT NULL
+            )
+            """,
+            "CREATE INDEX IF NOT EXISTS idx_revoked_tokens_revoked_at ON revoked_tokens (revoked_at)",
+            "CREATE INDEX IF NOT EXISTS idx_revoked_tokens_expires_at ON revoked_tokens (expires_at)",
+        ],
+    ),
+]
+
+SCHEMA_VERSION_TABLE = """
+    CREATE TABLE IF NOT EXISTS schema_version (
+        version INTEGER PRIMARY KEY,
+        description TEXT NOT NULL,
+        applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+
+_TABLE_EXISTS = {
+    "sqlite": "SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' AND name = 'schema_version'",
+    "postgresql": "SELECT COUNT(*) FROM pg_tables WHERE schemaname = current_schema() AND tablename = 'schema_version'",
+}
+
+# Serializes concurrent runners (several workers booting at once); released at commit/rollback
+_LOCK = {
+    "sqlite": "BEGIN IMMEDIATE",
+    "postgresql": f"SELECT pg_advisory_xact_lock({MIGRATION_LOCK_ID})",
+}
+
+_RECORD = {
+    "sqlite": "INSERT INTO schema_version (version, description) VALUES (?, ?)",
+    "postgresql": "INSERT INTO schema_version (version, description) VALUES (%s, %s)",
+}
+
+
+class MigrationRunner:
+    """Apply pending migrations in order, one transaction per migration.
+
+    ``connection`` is a callable returning a context manager that yields a
+    DB-API connection, e.g. ``Database.write_connection`` or
+    ``PostgreSQLDatabase.connection``.
+    """
+
+    def __init__(
+        self,
+        dialect: str,
+        connection: Callable[[], ContextManager],
+        migrations: Optional[List[Migration]] = None,
+    ):
+        if dialect not in DIALECTS:
+            raise ValueError(f"Unsupported migration dialect: {dialect}")
+        self.dialect = dialect
+        self.connection = connection
+        self.migrations = sorted(MIGRATIONS if migrations is None else migrations, key=lambda m: m.version)
+
+    def _current_version(self, cursor) -> int:
+        cursor.execute(_TABLE_EXISTS[self.dialect])
+        if cursor.fetchone()[0] == 0:
+            return 0
+        cursor.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version")
+        return cursor.fetchone()[0]
+
+    def current_version(self) -> int:
+        """Get the highest applied migration version (0 for an empty database)"""
+        with self.connection() as conn:
+            try:
+                return self._current_version(conn.cursor())
+            finally:
+                conn.rollback()
+
+    def pending(self, target: Optional[int] = None) -> List[Migration]:
+        """List migrations newer than the database, up to ``target`` if given"""
+        current = self.current_version()
+        return [
+            m for m in self.migrations
+            if m.version > current and (target is None or m.version <= target)
+        ]
+
+    def upgrade(self, target: Optional[int] = None) -> List[int]:
+        """Apply pending migrations and return the versions applied"""
+        applied = []
+        # An up-to-date database costs one read and no locks or DDL
+        for migration in self.pending(target):
+            with self.connection() as conn:
+                cursor = conn.cursor()
+                try:
+                    cursor.execute(_LOCK[self.dialect])
+                    # Another process may have applied it while we waited for the lock
+                    if self._current_version(cursor) >= migration.version:
+                        conn.rollback()
+                        continue
+                    cursor.execute(SCHEMA_VERSION_TABLE)
+                    for statement in migration.statements[self.dialect]:
+                        cursor.execute(statement)
+                    cursor.execute(_RECORD[self.dialect], (migration.version, migration.description))
+                    conn.commit()
+                except Exception:
+                    conn.rollback()
+                    raise
+            applied.append(migration.version)
+        return applied
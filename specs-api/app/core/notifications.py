@@ -0,0 +1,127 @@
+import asyncio
+import json
+import logging
+import os
+from typing import Callable, Optional
+import psycopg2
+import psycopg2.extensions
+
+logger = logging.getLogger(__name__)
+
+# PostgreSQL NOTIFY channel carrying cache invalidation events between workers
+CHANNEL = "specs_cache_invalidation"
+
+# Sent to the handler after (re)connecting, since events may have been missed meanwhile
+RESYNC = {"kind": "resync"}
+
+
+def listens_for_invalidations(db) -> bool:
+    """Whether ``db`` publishes invalidation events and CACHE_INVALIDATION_LISTEN lets workers receive them"""
+    return (
+        getattr(db, "invalidation_listener", None) is not None
+        and os.getenv("CACHE_INVALIDATION_LISTEN", "true").lower() in ("1", "true", "yes")
+    )
+
+
+def event_payload(kind: str, **fields) -> str:
+    """Serialize an invalidation event, e.g. ``event_payload("user", user_id=3)``"""
+    return json.dumps({"kind": kind, **fields}, separators=(",", ":"))
+
+
+class InvalidationListener:
+    """Background task that LISTENs for invalidation events and passes them to ``handler``.
+
+    The listening connection is dedicated and outside any pool. If it drops,
+    the task reconnects with a delay and sends ``RESYNC`` so the handler can
+    clear whatever it may have missed. Subclasses implement ``_listen``.
+    """
+
+    def __init__(self, handler: Callable[[dict], None], reconnect_delay: float = 1.0):
+        self.handler = handler
+        self.reconnect_delay = reconnect_delay
+        self.received = 0
+        self.reconnects = 0
+        self.listening = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        """Start listening; returns once the first LISTEN is in place or has failed"""
+        self._task = asyncio.create_task(self._run())
+        listening = asyncio.create_task(self.listening.wait())
+        await asyncio.wait([self._task, listening], timeout=10, return_when=asyncio.FIRST_COMPLETED)
+        listening.cancel()
+
+    async def stop(self):
+        """Cancel the task and close the listening connection"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def dispatch(self, payload: str):
+        self.received += 1
+        try:
+            event = json.loads(payload)
+        except ValueError:
+            logger.warning("Ignoring malformed invalidation event: %r", payload)
+            return
+        self.handler(event)
+
+    async def _run(self):
+        while True:
+            try:
+                await self._listen()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Invalidation listener disconnected: %s", e)
+            self.listening.clear()
+            self.reconnects += 1
+            await asyncio.sleep(self.reconnect_delay)
+
+    def _on_listening(self):
+        if self.reconnects:
+            self.handler(dict(RESYNC))
+        self.listening.set()
+
+    async def _listen(self):
+        raise NotImplementedError
+
+    def stats(self) -> dict:
+        """Get event and reconnect counters"""
+        return {"listening": self.listening.is_set(), "received": self.received, "reconnects": self.reconnects}
+
+
+class PsycopgInvalidationListener(InvalidationListener):
+    """Listener on an autocommit psycopg2 connection, polled when its socket is readable"""
+
+    def __init__(self, connection_string: str, handler: Callable[[dict], None], reconnect_delay: float = 1.0):
+        super().__init__(handler, reconnect_delay)
+        self.connection_string = connection_string
+
+    async def _listen(self):
+        loop = asyncio.get_running_loop()
+        conn = await asyncio.to_thread(psycopg2.connect, self.connection_string)
+        readable = asyncio.Event()
+        fd = None
+        try:
+            conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+            conn.cursor().execute(f"LISTEN {CHANNEL}")
+            # Kept, since fileno() fails once the connection is closed
+            fd = conn.fileno()
+            loop.add_reader(fd, readable.set)
+            self._on_listening()
+            while True:
+                await readable.wait()
+                readable.clear()
+                # Raises once the server closes the connection
+                conn.poll()
+                while conn.notifies:
+                    self.dispatch(conn.notifies.pop(0).payload)
+        finally:
+            if fd is not None:
+                loop.remove_reader(fd)
+            conn.close()
@@ -0,0 +1,148 @@
+import asyncio
+import contextvars
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+from .metrics import OFFLOAD_CANCELLED, OFFLOAD_QUEUE_WAIT
+
+
+class BoundedExecutor:
+    """Dedicated, fixed-size thread pool for one kind of blocking work.
+
+    Kept apart from Starlette's shared threadpool so a burst of one kind of
+    work (say, slow reads) can't starve another (writes, sync endpoints).
+    Size it to the resource behind it: a pool larger than the connections it
+    can use only moves the queue from here into the connection pool. Calls
+    still waiting for a thread when their caller is cancelled, e.g. because
+    the client went away, never run.
+    """
+
+    def __init__(self, name: str, max_workers: int):
+        self.name = name
+        self.max_workers = max(1, max_workers)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self.submitted = 0
+        self.completed = 0
+        self.cancelled = 0
+        self.queue_wait_total = 0.0
+        self.queue_wait_max = 0.0
+        self._queue_wait = OFFLOAD_QUEUE_WAIT.labels(name)
+        self._cancelled = OFFLOAD_CANCELLED.labels(name)
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=self.name)
+        return self._executor
+
+    async def run(self, fn, *args, **kwargs):
+        """Run ``fn(*args, **kwargs)`` on the pool, in a copy of the caller's context"""
+        context = contextvars.copy_context()
+        submitted_at = time.perf_counter()
+
+        def call():
+            queue_wait = time.perf_counter() - submitted_at
+            self._queue_wait.observe(queue_wait)
+            with self._lock:
+                self.queue_wait_total += queue_wait
+                self.queue_wait_max = max(self.queue_wait_max, queue_wait)
+            return context.run(fn, *args, **kwargs)
+
+        future = self._get_executor().submit(call)
+        with self._lock:
+            self._pending += 1
+            self.submitted += 1
+        try:
+            # Cancelling the wrapper cancels the call too, if it hasn't started
+            return await asyncio.wrap_future(future)
+        except asyncio.CancelledError:
+            if future.cancelled():
+                self._cancelled.inc()
+                with self._lock:
+                    self.cancelled += 1
+            raise
+        finally:
+            with self._lock:
+                self._pending -= 1
+                self.completed += not future.cancelled()
+
+    def shutdown(self, wait: bool = True):
+        """Stop the pool; it is recreated on next use"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=True)
+
+    def stats(self) -> dict:
+        """Get pool load and queue wait statistics"""
+        with self._lock:
+            started = self.submitted - self.cancelled
+            return {
+                "max_workers": self.max_workers,
+                "pending": self._pending,
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "cancelled": self.cancelled,
+                "queue_wait_avg": self.queue_wait_total / started if started else 0.0,
+                "queue_wait_max": self.queue_wait_max,
+            }
+
+
+class CancelOnDisconnectMiddleware:
+    """ASGI middleware that cancels a request's handler when its client disconnects.
+
+    The request body is read by a separate task, which keeps listening once
+    the body is complete; an ``http.disconnect`` before the response is done
+    cancels the handler, so its queued offloaded calls are dropped instead of
+    holding database threads for a response nobody will read. Once the last
+    body chunk is sent, disconnects are ignored: background tasks run after
+    that and must finish whether or not the client is still there.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        handler = asyncio.current_task()
+        messages: asyncio.Queue = asyncio.Queue()
+        done = disconnected = False
+
+        async def pump():
+            nonlocal disconnected
+            while True:
+                message = await receive()
+                messages.put_nowait(message)
+                if message["type"] == "http.disconnect":
+                    if not done:
+                        disconnected = True
+                        handler.cancel()
+                    return
+
+        async def send_wrapper(message):
+            nonlocal done
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                done = True
+
+        pump_task = asyncio.create_task(pump())
+        try:
+            await self.app(scope, messages.get, send_wrapper)
+        except asyncio.CancelledError:
+            # Swallow only our own cancellation, not a server shutdown's
+            if not disconnected or handler.uncancel() > 0:
+                raise
+        else:
+            if disconnected:
+                # The handler finished before the cancellation reached it
+                handler.uncancel()
+        finally:
+            done = True
+            pump_task.cancel()
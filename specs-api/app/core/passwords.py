@@ -0,0 +1,165 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Optional, Tuple
+from passlib.context import CryptContext
+from .metrics import PASSWORD_HASH_LATENCY, PASSWORD_HASH_QUEUE_WAIT
+
+# bcrypt cost factor: each step doubles the work. Tune per environment
+# (see calibrate_password_hash.py); existing hashes are rehashed on login.
+PASSWORD_HASH_ROUNDS = int(os.getenv("PASSWORD_HASH_ROUNDS", "12"))
+
+
+def make_context(rounds: int = PASSWORD_HASH_ROUNDS) -> CryptContext:
+    """Build a bcrypt context whose hashes at any other cost report needs_update"""
+    return CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=rounds)
+
+
+# Password hashing, shared by every backend and by the hashing workers
+pwd_context = make_context()
+
+EXECUTOR_KINDS = ("process", "thread")
+
+
+class PasswordHasherBusy(Exception):
+    """Raised when too many hash/verify calls are already queued"""
+
+
+def hash_password(password: str) -> str:
+    return pwd_context.hash(password)
+
+
+def verify_password(plain_password: str, hashed_password: str) -> bool:
+    return pwd_context.verify(plain_password, hashed_password)
+
+
+def verify_and_update(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+
+def _timed(fn, *args):
+    # Runs in the worker; wall-clock stamps let the caller split queue wait from run time
+    started_at = time.time()
+    result = fn(*args)
+    return result, started_at, time.time()
+
+
+class PasswordHasher:
+    """Run bcrypt off the event loop on a dedicated, bounded executor.
+
+    bcrypt is deliberately slow, so hashing inline in an ``async def`` stalls
+    every other request on the worker. Calls are sent to a process pool
+    (or a thread pool, since bcrypt releases the GIL) of ``max_workers``; at
+    most ``max_pending`` calls may be running or queued, beyond which
+    ``PasswordHasherBusy`` is raised so a login burst sheds load instead of
+    growing an unbounded backlog.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, max_pending: int = 64, executor: str = "process"):
+        if executor not in EXECUTOR_KINDS:
+            raise ValueError(f"Unsupported password hash executor: {executor}")
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_pending = max_pending
+        self.executor_kind = executor
+        self._executor: Optional[Executor] = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.queue_wait_total = 0.0
+        self.queue_wait_max = 0.0
+        self.run_time_total = 0.0
+        self.run_time_max = 0.0
+
+    def _get_executor(self) -> Executor:
+        # Created on first use so importing the app never spawns processes
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    if self.executor_kind == "process":
+                        self._executor = ProcessPoolExecutor(
+                            max_workers=self.max_workers,
+                            mp_context=multiprocessing.get_context("spawn"),
+                        )
+                    else:
+                        self._executor = ThreadPoolExecutor(
+                            max_workers=self.max_workers, thread_name_prefix="password-hasher"
+                        )
+        return self._executor
+
+    async def _run(self, fn, *args):
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self.rejected += 1
+                raise PasswordHasherBusy(f"{self._pending} password hash operations already pending")
+            self._pending += 1
+            self.submitted += 1
+
+        submitted_at = time.time()
+        try:
+            loop = asyncio.get_running_loop()
+            result, started_at, finished_at = await loop.run_in_executor(
+                self._get_executor(), _timed, fn, *args
+            )
+        except Exception:
+            with self._lock:
+                self.failed += 1
+            raise
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+        queue_wait = max(0.0, started_at - submitted_at)
+        run_time = finished_at - started_at
+        PASSWORD_HASH_QUEUE_WAIT.labels(fn.__name__).observe(queue_wait)
+        PASSWORD_HASH_LATENCY.labels(fn.__name__).observe(run_time)
+        with self._lock:
+            self.completed += 1
+            self.queue_wait_total += queue_wait
+            self.queue_wait_max = max(self.queue_wait_max, queue_wait)
+            self.run_time_total += run_time
+            self.run_time_max = max(self.run_time_max, run_time)
+        return result
+
+    async def hash(self, password: str) -> str:
+        """Hash a password on the executor"""
+        return await self._run(hash_password, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        """Verify a password against its hash on the executor"""
+        return await self._run(verify_password, plain_password, hashed_password)
+
+    async def verify_and_update(self, plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        """Verify a password and, if its hash uses an outdated cost, return a fresh hash"""
+        return await self._run(verify_and_update, plain_password, hashed_password)
+
+    def shutdown(self, wait: bool = True):
+        """Stop the worker pool; it is recreated on next use"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=True)
+
+    def stats(self) -> dict:
+        """Get executor load and timing statistics"""
+        with self._lock:
+            return {
+                "executor": self.executor_kind,
+                "rounds": PASSWORD_HASH_ROUNDS,
+                "max_workers": self.max_workers,
+                "max_pending": self.max_pending,
+                "pending": self._pending,
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "failed": self.failed,
+                "rejected": self.rejected,
+                "queue_wait_avg": self.queue_wait_total / self.completed if self.completed else 0.0,
+                "queue_wait_max": self.queue_wait_max,
+                "run_time_avg": self.run_time_total / self.completed if self.completed else 0.0,
+                "run_time_max": self.run_time_max,
+            }
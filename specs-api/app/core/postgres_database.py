@@ -1,21 +1,33 @@
 import psycopg2
+import psycopg2.extensions
 import psycopg2.extras
+import time
 from datetime import datetime, timedelta
 from typing import Optional
-from passlib.context import CryptContext
-from jose import JWTError, jwt
+from jose import JWTError
 import os
+from .connection_pool import ConnectionPool
+from .migrations import MigrationRunner
+from .notifications import CHANNEL, PsycopgInvalidationListener, event_payload
+from .passwords import pwd_context
+from .query_log import TimedPsycopgConnection
+from .tokens import ACCESS_TOKEN_EXPIRE_MINUTES, token_signer
 
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Tokens carrying an older epoch stop being accepted in stateless mode
+BUMP_AUTH_EPOCH = "UPDATE users SET auth_epoch = auth_epoch + 1 WHERE id = %s"
 
-# JWT settings
-SECRET_KEY = "your-secret-key-change-this-in-production"
-ALGORITHM = "HS256"
-ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
 class PostgreSQLDatabase:
-    def __init__(self, connection_string: str = None):
+    def __init__(
+        self,
+        connection_string: str = None,
+        pool_min_size: int = 1,
+        pool_max_size: int = 10,
+        pool_timeout: float = 30.0,
+        pool_max_lifetime: Optional[float] = 3600.0,
+        pool_health_check_after: float = 5.0,
+        auto_migrate: bool = True,
+    ):
         if connection_string is None:
             # Default connection for local development
             self.connection_string = (
@@ -28,86 +40,116 @@ class PostgreSQLDatabase:
         else:
             self.connection_string = connection_string
         
-        # Initialize database with default admin user
-        self.initialize_database()
+        self.pool = ConnectionPool(
+            self.get_connection,
+            min_size=pool_min_size,
+            max_size=pool_max_size,
+            timeout=pool_timeout,
+            max_lifetime=pool_max_lifetime,
+            health_check_after=pool_health_check_after,
+            check=self._check_connection,
+            reset=self._reset_connection,
+        )
+        
+        if auto_migrate:
+            self.migrate()
     
     def get_connection(self):
-        conn = psycopg2.connect(self.connection_string)
+        """Open a new, unpooled connection (used by the pool and admin scripts)"""
+        # Cursors time their statements for metrics and the slow-query log
+        conn = psycopg2.connect(self.connection_string, connection_factory=TimedPsycopgConnection)
         conn.autocommit = False
         return conn
     
-    def initialize_database(self):
-        """Initialize the database with default admin user if it doesn't exist"""
+    def invalidation_listener(self, handler) -> PsycopgInvalidationListener:
+        """Create (but not start) a listener for invalidation events published by any worker"""
+        return PsycopgInvalidationListener(self.connection_string, handler)
+    
+    def _notify(self, cursor, kind: str, **fields):
+        # Delivered to listeners when the surrounding transaction commits
+        cursor.execute("SELECT pg_notify(%s, %s)", (CHANNEL, event_payload(kind, **fields)))
+    
+    def connection(self):
+        """Check out a pooled connection for the duration of a ``with`` block"""
+        return self.pool.connection()
+    
+    @staticmethod
+    def _check_connection(conn) -> bool:
+        if conn.closed:
+            return False
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT 1")
+        conn.rollback()
+        return True
+    
+    @staticmethod
+    def _reset_connection(conn):
+        # End any transaction left open by read-only queries or failed writes
+        if conn.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+            conn.rollback()
+    
+    def pool_stats(self) -> dict:
+        """Get connection pool statistics"""
+        return self.pool.stats()
+    
+    def close(self):
+        """Close all pooled connections"""
+        self.pool.close()
+    
+    def migration_runner(self) -> MigrationRunner:
+        """Get a schema migration runner bound to this database"""
+        return MigrationRunner("postgresql", self.connection)
+    
+    def migrate(self, target: Optional[int] = None) -> list:
+        """Apply pending schema migrations and return the versions applied"""
+        return self.migration_runner().upgrade(target)
+    
+    def create_user(self, username: str, email: str, password: str) -> bool:
+        """Create a new user with default scopes"""
+        return self.insert_user(username, email, pwd_context.hash(password))
+    
+    def insert_user(self, username: str, email: str, hashed_password: str) -> bool:
+        """Create a new user whose password has already been hashed"""
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
-            
-            # Create default admin user if it doesn't exist
-            cursor.execute("SELECT COUNT(*) FROM users WHERE username = %s", ('admin',))
-            if cursor.fetchone()[0] == 0:
-                admin_password = pwd_context.hash("admin123")
-                cursor.execute("""
-                    INSERT INTO users (username, email, hashed_password, role)
-                    VALUES (%s, %s, %s, %s)
-                    RETURNING id
-                """, ('admin', 'admin@example.com', admin_password, 'admin'))
+            with self.connection() as conn:
+                cursor = conn.cursor()
                 
-                admin_id = cursor.fetchone()[0]
+                cursor.execute("""
+                    INSERT INTO users (username, email, hashed_password)
+                    VALUES (%s, %s, %s)
+                """, (username, email, hashed_password))
                 
-                # Grant all scopes to admin
-                admin_scopes = ['read_profile', 'write_profile', 'read_users', 'admin']
-                for scope in admin_scopes:
-                    cursor.execute("""
-                        INSERT INTO user_scopes (user_id, scope, granted_by)
-                        VALUES (%s, %s, %s)
-                    """, (admin_id, scope, 'system'))
-            
-            conn.commit()
-            conn.close()
+                conn.commit()
+            return True
         except psycopg2.Error as e:
-            # Silently handle initialization errors (e.g., tables don't exist yet)
-            if conn:
-                conn.rollback()
-                conn.close()
-            pass
+            return False
     
-    def create_user(self, username: str, email: str, password: str) -> bool:
-        """Create a new user with default scopes"""
+    def update_password_hash(self, user_id: int, hashed_password: str) -> bool:
+        """Replace a user's password hash (e.g. after a cost change)"""
         try:
-            hashed_password = pwd_context.hash(password)
-            conn = self.get_connection()
-            cursor = conn.cursor()
-            
-            cursor.execute("""
-                INSERT INTO users (username, email, hashed_password)
-                VALUES (%s, %s, %s)
-            """, (username, email, hashed_password))
-            
-            conn.commit()
-            conn.close()
-            return True
+            with self.connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("UPDATE users SET hashed_password = %s WHERE id = %s", (hashed_password, user_id))
+                conn.commit()
+                return cursor.rowcount > 0
         except psycopg2.Error as e:
-            if conn:
-                conn.rollback()
-                conn.close()
             return False
     
     def get_user(self, username: str) -> Optional[dict]:
         """Get user by username with their available scopes"""
-        conn = self.get_connection()
-        cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
-        
-        cursor.execute("""
-            SELECT u.id, u.username, u.email, u.hashed_password, u.is_active, u.role, u.created_at,
-                   COALESCE(array_agg(us.scope) FILTER (WHERE us.scope IS NOT NULL), ARRAY[]::text[]) as available_scopes
-            FROM users u
-            LEFT JOIN user_scopes us ON u.id = us.user_id
-            WHERE u.username = %s
-            GROUP BY u.id, u.username, u.email, u.hashed_password, u.is_active, u.role, u.created_at
-        """, (username,))
-        
-        row = cursor.fetchone()
-        conn.close()
+        with self.connection() as conn:
+            cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+            
+            cursor.execute("""
+                SELECT u.id, u.username, u.email, u.hashed_password, u.is_active, u.role, u.created_at, u.auth_epoch,
+                       COALESCE(array_agg(us.scope) FILTER (WHERE us.scope IS NOT NULL), ARRAY[]::text[]) as available_scopes
+                FROM users u
+                LEFT JOIN user_scopes us ON u.id = us.user_id
+                WHERE u.username = %s
+                GROUP BY u.id, u.username, u.email, u.hashed_password, u.is_active, u.role, u.created_at, u.auth_epoch
+            """, (username,))
+            
+            row = cursor.fetchone()
         
         if row:
             user_dict = dict(row)
@@ -136,18 +178,27 @@ class PostgreSQLDatabase:
         else:
             expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
         to_encode.update({"exp": expire})
-        encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+        encoded_jwt = token_signer.encode(to_encode)
         return encoded_jwt
     
     def verify_token(self, token: str):
         """Verify JWT token"""
         try:
-            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+            payload = token_signer.decode(token)
             username: str = payload.get("sub")
             scopes: list = payload.get("scopes", [])
             if username is None:
                 return None
-            return {"username": username, "scopes": scopes}
+            return {
+                "username": username,
+                "scopes": scopes,
+                "exp": payload.get("exp"),
+                "jti": payload.get("jti"),
+                # Present only on stateless tokens
+                "uid": payload.get("uid"),
+                "role": payload.get("role"),
+                "epoch": payload.get("epoch"),
+            }
         except JWTError:
             return None
     
@@ -174,75 +225,69 @@ class PostgreSQLDatabase:
     
     def get_user_available_scopes(self, user_id: int) -> list:
         """Get all scopes available to a user"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            SELECT scope FROM user_scopes WHERE user_id = %s
-        """, (user_id,))
-        
-        scopes = [row[0] for row in cursor.fetchall()]
-        conn.close()
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute("""
+                SELECT scope FROM user_scopes WHERE user_id = %s
+            """, (user_id,))
+            
+            scopes = [row[0] for row in cursor.fetchall()]
         return scopes
     
     def grant_scope_to_user(self, user_id: int, scope: str, granted_by: str = "admin") -> bool:
         """Grant a scope to a user"""
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
-            
-            cursor.execute("""
-                INSERT INTO user_scopes (user_id, scope, granted_by)
-                VALUES (%s, %s, %s)
-                ON CONFLICT (user_id, scope) DO UPDATE SET
-                granted_by = EXCLUDED.granted_by,
-                granted_at = CURRENT_TIMESTAMP
-            """, (user_id, scope, granted_by))
-            
-            conn.commit()
-            conn.close()
+            with self.connection() as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute("""
+                    INSERT INTO user_scopes (user_id, scope, granted_by)
+                    VALUES (%s, %s, %s)
+                    ON CONFLICT (user_id, scope) DO UPDATE SET
+                    granted_by = EXCLUDED.granted_by,
+                    granted_at = CURRENT_TIMESTAMP
+                """, (user_id, scope, granted_by))
+                cursor.execute(BUMP_AUTH_EPOCH, (user_id,))
+                self._notify(cursor, "user", user_id=user_id)
+                
+                conn.commit()
             return True
         except psycopg2.Error as e:
-            if conn:
-                conn.rollback()
-                conn.close()
             return False
     
     def revoke_scope_from_user(self, user_id: int, scope: str) -> bool:
         """Revoke a scope from a user"""
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
-            
-            cursor.execute("""
-                DELETE FROM user_scopes WHERE user_id = %s AND scope = %s
-            """, (user_id, scope))
-            
-            conn.commit()
-            conn.close()
+            with self.connection() as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute("""
+                    DELETE FROM user_scopes WHERE user_id = %s AND scope = %s
+                """, (user_id, scope))
+                cursor.execute(BUMP_AUTH_EPOCH, (user_id,))
+                self._notify(cursor, "user", user_id=user_id)
+                
+                conn.commit()
             return True
         except psycopg2.Error as e:
-            if conn:
-                conn.rollback()
-                conn.close()
             return False
     
     def list_all_users_with_scopes(self) -> list:
         """List all users with their scopes (PostgreSQL version using STRING_AGG)"""
-        conn = self.get_connection()
-        cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
-        
-        cursor.execute("""
-            SELECT u.id, u.username, u.email, u.role, u.is_active,
-                   STRING_AGG(us.scope, ',') as scopes
-            FROM users u
-            LEFT JOIN user_scopes us ON u.id = us.user_id
-            GROUP BY u.id, u.username, u.email, u.role, u.is_active
-            ORDER BY u.id
-        """)
-        
-        users = cursor.fetchall()
-        conn.close()
+        with self.connection() as conn:
+            cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+            
+            cursor.execute("""
+                SELECT u.id, u.username, u.email, u.role, u.is_active,
+                       STRING_AGG(us.scope, ',') as scopes
+                FROM users u
+                LEFT JOIN user_scopes us ON u.id = us.user_id
+                GROUP BY u.id, u.username, u.email, u.role, u.is_active
+                ORDER BY u.id
+            """)
+            
+            users = cursor.fetchall()
         
         # Convert to the expected format
         result = []
@@ -260,16 +305,15 @@ class PostgreSQLDatabase:
     
     def get_user_by_id(self, user_id: int) -> Optional[dict]:
         """Get user by ID"""
-        conn = self.get_connection()
-        cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
-        
-        cursor.execute("""
-            SELECT id, username, email, is_active, role, created_at
-            FROM users WHERE id = %s
-        """, (user_id,))
-        
-        user = cursor.fetchone()
-        conn.close()
+        with self.connection() as conn:
+            cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+            
+            cursor.execute("""
+                SELECT id, username, email, is_active, role, created_at
+                FROM users WHERE id = %s
+            """, (user_id,))
+            
+            user = cursor.fetchone()
         
         if user:
             return dict(user)
@@ -278,39 +322,39 @@ class PostgreSQLDatabase:
     # Environment Variables methods
     def get_user_env_vars(self, user_id: int) -> list:
         """Get all environment variables for a user"""
-        conn = self.get_connection()
-        cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
-        
-        cursor.execute("""
-            SELECT name, value, created_at, updated_at 
-            FROM user_environment_variables 
-            WHERE user_id = %s
-            ORDER BY name
-        """, (user_id,))
+        with self.connection() as conn:
+            cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+            
+            cursor.execute("""
+                SELECT name, value, created_at, updated_at 
+                FROM user_environment_variables 
+                WHERE user_id = %s
+                ORDER BY name
+            """, (user_id,))
+            
+            rows = cursor.fetchall()
         
         env_vars = []
-        for row in cursor.fetchall():
+        for row in rows:
             env_var = dict(row)
             env_var["created_at"] = row["created_at"].strftime('%Y-%m-%d %H:%M:%S')
             env_var["updated_at"] = row["updated_at"].strftime('%Y-%m-%d %H:%M:%S')
             env_vars.append(env_var)
         
-        conn.close()
         return env_vars
     
     def get_user_env_var(self, user_id: int, name: str) -> Optional[dict]:
         """Get a specific environment variable for a user"""
-        conn = self.get_connection()
-        cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
-        
-        cursor.execute("""
-            SELECT name, value, created_at, updated_at 
-            FROM user_environment_variables 
-            WHERE user_id = %s AND name = %s
-        """, (user_id, name))
-        
-        row = cursor.fetchone()
-        conn.close()
+        with self.connection() as conn:
+            cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+            
+            cursor.execute("""
+                SELECT name, value, created_at, updated_at 
+                FROM user_environment_variables 
+                WHERE user_id = %s AND name = %s
+            """, (user_id, name))
+            
+            row = cursor.fetchone()
         
         if row:
             env_var = dict(row)
@@ -322,88 +366,284 @@ class PostgreSQLDatabase:
     def set_user_env_var(self, user_id: int, name: str, value: str) -> bool:
         """Set an environment variable for a user"""
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
-            
-            cursor.execute("""
-                INSERT INTO user_environment_variables (user_id, name, value)
-                VALUES (%s, %s, %s)
-                ON CONFLICT (user_id, name) DO UPDATE SET
-                value = EXCLUDED.value,
-                updated_at = CURRENT_TIMESTAMP
-            """, (user_id, name, value))
-            
-            conn.commit()
-            conn.close()
+            with self.connection() as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute("""
+                    INSERT INTO user_environment_variables (user_id, name, value)
+                    VALUES (%s, %s, %s)
+                    ON CONFLICT (user_id, name) DO UPDATE SET
+                    value = EXCLUDED.value,
+                    updated_at = CURRENT_TIMESTAMP
+                """, (user_id, name, value))
+                self._notify(cursor, "env", user_id=user_id, name=name)
+                
+                conn.commit()
             return True
         except psycopg2.Error as e:
-            if conn:
-                conn.rollback()
-                conn.close()
             return False
     
     def delete_user_env_var(self, user_id: int, name: str) -> bool:
         """Delete an environment variable for a user"""
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
-            
-            cursor.execute("""
-                DELETE FROM user_environment_variables 
-                WHERE user_id = %s AND name = %s
-            """, (user_id, name))
-            
-            affected_rows = cursor.rowcount
-            conn.commit()
-            conn.close()
+            with self.connection() as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute("""
+                    DELETE FROM user_environment_variables 
+                    WHERE user_id = %s AND name = %s
+                """, (user_id, name))
+                # Read before the notify, which is a statement of its own
+                affected_rows = cursor.rowcount
+                if affected_rows > 0:
+                    self._notify(cursor, "env", user_id=user_id, name=name)
+                conn.commit()
             return affected_rows > 0
         except psycopg2.Error as e:
-            if conn:
-                conn.rollback()
-                conn.close()
             return False
 
     def list_all_users_with_scopes(self) -> list:
         """List all users with their scopes (admin only)"""
-        conn = self.get_connection()
-        cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
-        
-        cursor.execute("""
-            SELECT u.id, u.username, u.email, u.role, u.is_active,
-                   COALESCE(array_agg(us.scope) FILTER (WHERE us.scope IS NOT NULL), ARRAY[]::text[]) as available_scopes
-            FROM users u
-            LEFT JOIN user_scopes us ON u.id = us.user_id
-            GROUP BY u.id, u.username, u.email, u.role, u.is_active
-            ORDER BY u.id
-        """)
+        with self.connection() as conn:
+            cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+            
+            cursor.execute("""
+                SELECT u.id, u.username, u.email, u.role, u.is_active,
+                       COALESCE(array_agg(us.scope) FILTER (WHERE us.scope IS NOT NULL), ARRAY[]::text[]) as available_scopes
+                FROM users u
+                LEFT JOIN user_scopes us ON u.id = us.user_id
+                GROUP BY u.id, u.username, u.email, u.role, u.is_active
+                ORDER BY u.id
+            """)
+            
+            rows = cursor.fetchall()
         
         users = []
-        for row in cursor.fetchall():
+        for row in rows:
             user = dict(row)
             users.append(user)
         
-        conn.close()
         return users
 
     def get_user_by_id(self, user_id: int) -> Optional[dict]:
         """Get user by ID"""
-        conn = self.get_connection()
-        cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
-        
-        cursor.execute("""
-            SELECT u.id, u.username, u.email, u.hashed_password, u.is_active, u.role, u.created_at,
-                   COALESCE(array_agg(us.scope) FILTER (WHERE us.scope IS NOT NULL), ARRAY[]::text[]) as available_scopes
-            FROM users u
-            LEFT JOIN user_scopes us ON u.id = us.user_id
-            WHERE u.id = %s
-            GROUP BY u.id, u.username, u.email, u.hashed_password, u.is_active, u.role, u.created_at
-        """, (user_id,))
-        
-        row = cursor.fetchone()
-        conn.close()
+        with self.connection() as conn:
+            cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+            
+            cursor.execute("""
+                SELECT u.id, u.username, u.email, u.hashed_password, u.is_active, u.role, u.created_at, u.auth_epoch,
+                       COALESCE(array_agg(us.scope) FILTER (WHERE us.scope IS NOT NULL), ARRAY[]::text[]) as available_scopes
+                FROM users u
+                LEFT JOIN user_scopes us ON u.id = us.user_id
+                WHERE u.id = %s
+                GROUP BY u.id, u.username, u.email, u.hashed_password, u.is_active, u.role, u.created_at, u.auth_epoch
+            """, (user_id,))
+            
+            row = cursor.fetchone()
         
         if row:
             user_dict = dict(row)
             user_dict["created_at"] = row["created_at"].strftime('%Y-%m-%d %H:%M:%S')
             return user_dict
         return None
+
+    # Refresh token methods
+    def create_refresh_token(self, user_id: int, token_hash: str, family_id: str, scopes: list, expires_at: int) -> bool:
+        """Store a refresh token by its digest"""
+        try:
+            with self.connection() as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute("""
+                    INSERT INTO refresh_tokens (user_id, token_hash, family_id, scopes, expires_at)
+                    VALUES (%s, %s, %s, %s, %s)
+                """, (user_id, token_hash, family_id, " ".join(scopes), expires_at))
+                
+                conn.commit()
+            return True
+        except psycopg2.Error:
+            return False
+    
+    def get_refresh_token(self, token_hash: str) -> Optional[dict]:
+        """Get a refresh token by its digest, with the owner's username"""
+        with self.connection() as conn:
+            cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+            
+            cursor.execute("""
+                SELECT rt.user_id, u.username, rt.family_id, rt.scopes, rt.expires_at, rt.revoked
+                FROM refresh_tokens rt
+                JOIN users u ON u.id = rt.user_id
+                WHERE rt.token_hash = %s
+            """, (token_hash,))
+            
+            row = cursor.fetchone()
+        
+        if row:
+            token = dict(row)
+            token["scopes"] = row["scopes"].split()
+            return token
+        return None
+    
+    def rotate_refresh_token(self, token_hash: str, new_token_hash: str, expires_at: int) -> bool:
+        """Retire a refresh token and store its successor in the same family, atomically"""
+        try:
+            with self.connection() as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute("""
+                    UPDATE refresh_tokens SET revoked = TRUE
+                    WHERE token_hash = %s AND revoked = FALSE
+                """, (token_hash,))
+                if cursor.rowcount != 1:
+                    # Already rotated (possibly by a concurrent request)
+                    conn.rollback()
+                    return False
+                
+                cursor.execute("""
+                    INSERT INTO refresh_tokens (user_id, token_hash, family_id, scopes, expires_at)
+                    SELECT user_id, %s, family_id, scopes, %s
+                    FROM refresh_tokens WHERE token_hash = %s
+                """, (new_token_hash, expires_at, token_hash))
+                
+                conn.commit()
+            return True
+        except psycopg2.Error:
+            return False
+    
+    def revoke_refresh_token_family(self, family_id: str) -> int:
+        """Revoke every refresh token descended from one login"""
+        try:
+            with self.connection() as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute("""
+                    UPDATE refresh_tokens SET revoked = TRUE
+                    WHERE family_id = %s AND revoked = FALSE
+                """, (family_id,))
+                
+                affected_rows = cursor.rowcount
+                conn.commit()
+            return affected_rows
+        except psycopg2.Error:
+            return 0
+    
+    # API key methods
+    def create_api_key(self, user_id: int, key_hash: str, prefix: str, name: str, scopes: list, created_by: str) -> Optional[int]:
+        """Store an API key by its digest and return its id"""
+        try:
+            with self.connection() as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute("""
+                    INSERT INTO api_keys (user_id, key_hash, prefix, name, scopes, created_by)
+                    VALUES (%s, %s, %s, %s, %s, %s)
+                    RETURNING id
+                """, (user_id, key_hash, prefix, name, " ".join(scopes), created_by))
+                
+                key_id = cursor.fetchone()[0]
+                conn.commit()
+            return key_id
+        except psycopg2.Error:
+            return None
+    
+    def get_api_key(self, key_hash: str) -> Optional[dict]:
+        """Get an active API key by its digest, with the owner's username"""
+        with self.connection() as conn:
+            cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+            
+            cursor.execute("""
+                SELECT k.id, k.user_id, u.username, k.name, k.scopes
+                FROM api_keys k
+                JOIN users u ON u.id = k.user_id
+                WHERE k.key_hash = %s AND k.revoked = FALSE
+            """, (key_hash,))
+            
+            row = cursor.fetchone()
+        
+        if row:
+            api_key = dict(row)
+            api_key["scopes"] = row["scopes"].split()
+            return api_key
+        return None
+    
+    def revoke_api_key(self, key_id: int) -> bool:
+        """Revoke an API key"""
+        try:
+            with self.connection() as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute("""
+                    UPDATE api_keys SET revoked = TRUE
+                    WHERE id = %s AND revoked = FALSE
+                """, (key_id,))
+                
+                affected_rows = cursor.rowcount
+                if affected_rows > 0:
+                    self._notify(cursor, "api_key", key_id=key_id)
+                conn.commit()
+            return affected_rows > 0
+        except psycopg2.Error:
+            return False
+    
+    # Auth epoch methods
+    def get_auth_epoch(self, user_id: int) -> Optional[int]:
+        """Get a user's auth epoch, or None if the user is missing or inactive"""
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute("""
+                SELECT auth_epoch FROM users WHERE id = %s AND is_active = TRUE
+            """, (user_id,))
+            
+            row = cursor.fetchone()
+        return row[0] if row else None
+    
+    def set_user_active(self, user_id: int, is_active: bool) -> bool:
+        """Activate or deactivate a user, invalidating their outstanding tokens"""
+        try:
+            with self.connection() as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute("""
+                    UPDATE users SET is_active = %s, auth_epoch = auth_epoch + 1 WHERE id = %s
+                """, (is_active, user_id))
+                # Read before the notify, which is a statement of its own
+                rows_affected = cursor.rowcount
+                if rows_affected > 0:
+                    self._notify(cursor, "user", user_id=user_id)
+                conn.commit()
+            return rows_affected > 0
+        except psycopg2.Error:
+            return False
+    
+    # Token denylist methods
+    def revoke_token(self, jti: str, user_id: Optional[int], expires_at: int, revoked_at: float) -> bool:
+        """Deny an access token id until it expires, purging entries that already have"""
+        try:
+            with self.connection() as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute("""
+                    INSERT INTO revoked_tokens (jti, user_id, expires_at, revoked_at)
+                    VALUES (%s, %s, %s, %s)
+                    ON CONFLICT (jti) DO NOTHING
+                """, (jti, user_id, expires_at, revoked_at))
+                self._notify(cursor, "token", jti=jti, exp=expires_at)
+                cursor.execute("DELETE FROM revoked_tokens WHERE expires_at <= %s", (int(revoked_at),))
+                
+                conn.commit()
+            return True
+        except psycopg2.Error:
+            return False
+    
+    def get_revoked_tokens(self, since: float) -> list:
+        """Get unexpired denied token ids revoked at or after ``since`` as (jti, expires_at, revoked_at)"""
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute("""
+                SELECT jti, expires_at, revoked_at FROM revoked_tokens
+                WHERE revoked_at >= %s AND expires_at > %s
+            """, (since, int(time.time())))
+            
+            return [tuple(row) for row in cursor.fetchall()]
@@ -0,0 +1,215 @@
+import collections
+import cProfile
+import glob
+import io
+import itertools
+import marshal
+import os
+import pstats
+import re
+import threading
+import time
+from typing import Callable, Optional
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+from .security import check_scope_access
+
+# Requests carrying this header (any value) from an admin are profiled
+PROFILE_HEADER = b"x-profile"
+PROFILE_ID = re.compile(r"\d+-\d+")
+
+
+class _Snapshot:
+    # pstats.Stats loads anything with create_stats() and stats; a Profile re-snapshots (empty) each time
+    def __init__(self, stats: dict):
+        self.stats = stats
+
+    def create_stats(self):
+        pass
+
+
+class ProfileStore:
+    """Bounded ring buffer of request profiles; the oldest is dropped when full.
+
+    With a ``directory`` (REQUEST_PROFILE_DIR, set per host by the launcher),
+    profiles are kept there as files, so whichever worker serves the admin
+    endpoints can list and fetch profiles taken by any other. Without one
+    they are kept in memory by the worker that took them. Ids are
+    ``<pid>-<n>``.
+    """
+
+    def __init__(self, maxlen: int = 20, directory: Optional[str] = None):
+        self._profiles = collections.OrderedDict()
+        self.maxlen = maxlen
+        self.directory = directory
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "ProfileStore":
+        return cls(
+            maxlen=int(os.getenv("REQUEST_PROFILE_BUFFER", "20")),
+            directory=os.getenv("REQUEST_PROFILE_DIR") or None,
+        )
+
+    def new_id(self) -> str:
+        return f"{os.getpid()}-{next(self._ids)}"
+
+    def add(self, profile_id: str, profile: cProfile.Profile, **info):
+        """Keep a finished profile with a description of the request it covers"""
+        profile.create_stats()
+        entry = ({"id": profile_id, **info}, profile.stats)
+        if self.directory is not None:
+            self._write(profile_id, entry)
+            return
+        with self._lock:
+            self._profiles[profile_id] = entry
+            while len(self._profiles) > self.maxlen:
+                self._profiles.popitem(last=False)
+
+    def list(self) -> list:
+        """Descriptions of the kept profiles, newest first"""
+        if self.directory is not None:
+            entries = (self._read(path) for path in self._files())
+            return [entry[0] for entry in entries if entry is not None]
+        with self._lock:
+            return [info for info, _ in reversed(self._profiles.values())]
+
+    def get(self, profile_id: str) -> Optional[tuple]:
+        if self.directory is not None:
+            # Ids come from URLs: anything else could name a file outside the directory
+            if not PROFILE_ID.fullmatch(profile_id):
+                return None
+            paths = glob.glob(os.path.join(self.directory, f"*_{profile_id}.prof"))
+            return self._read(paths[0]) if paths else None
+        with self._lock:
+            return self._profiles.get(profile_id)
+
+    def _files(self) -> list:
+        # Named <time_ns>_<id>.prof, so newest first is reverse name order
+        return sorted(glob.glob(os.path.join(self.directory, "*_*.prof")), reverse=True)
+
+    def _write(self, profile_id: str, entry: tuple):
+        path = os.path.join(self.directory, f"{time.time_ns():020d}_{profile_id}.prof")
+        with open(path + ".tmp", "wb") as f:
+            f.write(marshal.dumps(entry))
+        os.replace(path + ".tmp", path)
+        for stale in self._files()[self.maxlen:]:
+            try:
+                os.unlink(stale)
+            except OSError:
+                pass  # another worker dropped it first
+
+    @staticmethod
+    def _read(path: str) -> Optional[tuple]:
+        try:
+            with open(path, "rb") as f:
+                return marshal.loads(f.read())
+        except OSError:
+            return None
+
+    def report(self, profile_id: str, limit: int = 50, sort: str = "cumulative") -> Optional[str]:
+        """pstats text report of a profile, top ``limit`` functions by ``sort``"""
+        entry = self.get(profile_id)
+        if entry is None:
+            return None
+        stream = io.StringIO()
+        pstats.Stats(_Snapshot(entry[1]), stream=stream).sort_stats(sort).print_stats(limit)
+        return stream.getvalue()
+
+    def dump(self, profile_id: str) -> Optional[bytes]:
+        """A profile in the ``.prof`` format read by pstats, snakeviz, etc."""
+        entry = self.get(profile_id)
+        return marshal.dumps(entry[1]) if entry is not None else None
+
+
+profile_store = ProfileStore.from_env()
+
+
+class ProfilingMiddleware:
+    """ASGI middleware running cProfile over single requests on demand.
+
+    A request is profiled when it carries ``X-Profile`` and its bearer token
+    or API key has the admin scope; its response then gets ``X-Profile-Id``,
+    under which the profile is kept in ``store`` for /api/v1/admin/profiles.
+    Requests without the header pass straight through.
+
+    cProfile watches every thread of the process, so one request is profiled
+    at a time (others get ``X-Profile-Status: busy``) and the profile also
+    contains whatever else the worker ran meanwhile: profile on a quiet worker.
+    """
+
+    def __init__(self, app, auth_service_dependency: Callable, store: Optional[ProfileStore] = None):
+        self.app = app
+        self.auth_service_dependency = auth_service_dependency
+        self.store = store if store is not None else profile_store
+        self._active = False
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not any(name == PROFILE_HEADER for name, _ in scope["headers"]):
+            await self.app(scope, receive, send)
+            return
+
+        user = await self._admin(scope)
+        if user is None:
+            await self.app(scope, receive, send)
+            return
+
+        profile = None
+        if not self._active:
+            profile = cProfile.Profile()
+            try:
+                profile.enable()
+            except ValueError:
+                # Another profiler (e.g. a coverage tool) owns the process
+                profile = None
+        if profile is None:
+            await self.app(scope, receive, self._with_header(send, b"x-profile-status", b"busy"))
+            return
+
+        self._active = True
+        profile_id = self.store.new_id()
+        status = 500
+        started_at = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message = {**message, "headers": [*message.get("headers", []), (b"x-profile-id", profile_id.encode())]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            profile.disable()
+            self._active = False
+            self.store.add(
+                profile_id, profile,
+                method=scope["method"], path=scope["path"], status=status,
+                duration_ms=round((time.perf_counter() - started_at) * 1000, 1),
+                username=user["username"], at=time.time(),
+            )
+
+    async def _admin(self, scope) -> Optional[dict]:
+        authorization = dict(scope["headers"]).get(b"authorization", b"").decode("latin-1")
+        scheme, _, token = authorization.partition(" ")
+        if scheme.lower() != "bearer" or not token:
+            return None
+        # Resolve the service as the routes do, so dependency overrides apply
+        dependency = scope["app"].dependency_overrides.get(self.auth_service_dependency, self.auth_service_dependency)
+        try:
+            user = await dependency().get_current_user_from_token(
+                HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+            )
+        except HTTPException:
+            return None
+        return user if check_scope_access(user, "admin") else None
+
+    @staticmethod
+    def _with_header(send, name: bytes, value: bytes):
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                message = {**message, "headers": [*message.get("headers", []), (name, value)]}
+            await send(message)
+        return send_wrapper
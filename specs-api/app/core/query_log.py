@@ -0,0 +1,238 @@
+import logging
+import os
+import sqlite3
+import sys
+import threading
+import time
+from typing import Callable, Optional
+import psycopg2
+import psycopg2.extensions
+import psycopg2.extras
+from .metrics import DB_SLOW_STATEMENTS, DB_STATEMENT_LATENCY, DB_STATEMENT_ROWS
+
+logger = logging.getLogger(__name__)
+
+# Statements whose plan EXPLAIN can show without running them
+EXPLAINABLE = ("SELECT", "WITH")
+
+
+def _redact(params) -> str:
+    """Describe parameters by type only, so secrets and personal data never reach the log"""
+    if params is None:
+        return "()"
+    if isinstance(params, dict):
+        return "{" + ", ".join(f"{name}: {type(value).__name__}" for name, value in params.items()) + "}"
+    return "(" + ", ".join(type(value).__name__ for value in params) + ")"
+
+
+class QueryRecorder:
+    """Times every statement run by the synchronous backends and logs the slow ones.
+
+    Each statement is observed in ``db_statement_duration_seconds`` and
+    ``db_statement_rows_total``, labelled by backend and by the backend
+    method that ran it. Statements slower than ``slow_threshold`` seconds
+    (0 disables) are logged with their parameters redacted to types; with
+    ``explain`` set, slow SELECTs also get their query plan logged, at most
+    once per statement per ``explain_interval`` seconds.
+    """
+
+    def __init__(self, slow_threshold: float = 0.1, explain: bool = False, explain_interval: float = 60.0):
+        self.slow_threshold = slow_threshold
+        self.explain = explain
+        self.explain_interval = explain_interval
+        self._children = {}
+        self._explained = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "QueryRecorder":
+        return cls(
+            slow_threshold=float(os.getenv("SLOW_QUERY_THRESHOLD_MS", "100")) / 1000,
+            explain=os.getenv("SLOW_QUERY_EXPLAIN", "false").lower() in ("1", "true", "yes"),
+            explain_interval=float(os.getenv("SLOW_QUERY_EXPLAIN_INTERVAL", "60")),
+        )
+
+    def record(
+        self,
+        backend: str,
+        method: str,
+        sql: str,
+        params,
+        duration: float,
+        rows: int,
+        explain: Optional[Callable[[], list]] = None,
+    ):
+        """Observe one statement; ``explain`` returns its plan lines if asked for"""
+        children = self._children.get((backend, method))
+        if children is None:
+            children = self._children[(backend, method)] = (
+                DB_STATEMENT_LATENCY.labels(backend, method),
+                DB_STATEMENT_ROWS.labels(backend, method),
+                DB_SLOW_STATEMENTS.labels(backend, method),
+            )
+        children[0].observe(duration)
+        if rows > 0:
+            children[1].inc(rows)
+        if self.slow_threshold <= 0 or duration < self.slow_threshold:
+            return
+
+        children[2].inc()
+        statement = " ".join(sql.split())
+        logger.warning(
+            "Slow query in %s (%s): %.1f ms, %s row(s): %s params=%s",
+            method, backend, duration * 1000, rows, statement, _redact(params),
+        )
+        if explain is not None and self.explain and self._should_explain(statement):
+            try:
+                plan = explain()
+            except Exception as e:
+                logger.warning("Could not EXPLAIN slow query in %s: %s", method, e)
+                return
+            logger.warning("Plan for slow query in %s:\n  %s", method, "\n  ".join(plan))
+
+    def _should_explain(self, statement: str) -> bool:
+        if not statement.upper().startswith(EXPLAINABLE):
+            return False
+        now = time.monotonic()
+        with self._lock:
+            last = self._explained.get(statement)
+            if last is not None and now - last < self.explain_interval:
+                return False
+            self._explained[statement] = now
+        return True
+
+
+query_recorder = QueryRecorder.from_env()
+
+
+def _caller() -> str:
+    # Frame 0 is this function, 1 the cursor's execute, 2 the backend method that called it
+    return sys._getframe(2).f_code.co_name
+
+
+class TimedSQLiteCursor(sqlite3.Cursor):
+    """sqlite3 cursor that reports each statement to ``query_recorder``.
+
+    SQLite computes result rows as they are fetched, so a SELECT is timed
+    from ``execute`` through the first ``fetchone``/``fetchall``/``fetchmany``
+    and reported then; other statements are reported when ``execute`` returns.
+    """
+
+    _pending = None
+
+    def execute(self, sql, parameters=()):
+        self._flush()
+        method = _caller()
+        started_at = time.perf_counter()
+        try:
+            result = super().execute(sql, parameters)
+        except sqlite3.Error:
+            query_recorder.record("sqlite", method, sql, parameters, time.perf_counter() - started_at, 0)
+            raise
+        elapsed = time.perf_counter() - started_at
+        if self.description is None:
+            self._report(method, sql, parameters, elapsed, max(self.rowcount, 0))
+        else:
+            self._pending = (method, sql, parameters, elapsed)
+        return result
+
+    def _timed_fetch(self, fetch, *args):
+        started_at = time.perf_counter()
+        rows = fetch(*args)
+        if self._pending is not None:
+            method, sql, parameters, elapsed = self._pending
+            self._pending = None
+            count = len(rows) if isinstance(rows, list) else int(rows is not None)
+            self._report(method, sql, parameters, elapsed + time.perf_counter() - started_at, count)
+        return rows
+
+    def fetchone(self):
+        return self._timed_fetch(super().fetchone)
+
+    def fetchall(self):
+        return self._timed_fetch(super().fetchall)
+
+    def fetchmany(self, size=None):
+        return self._timed_fetch(super().fetchmany, size if size is not None else self.arraysize)
+
+    def close(self):
+        self._flush()
+        super().close()
+
+    def _flush(self):
+        # A SELECT whose rows were never fetched is reported with what it cost so far
+        if self._pending is not None:
+            method, sql, parameters, elapsed = self._pending
+            self._pending = None
+            self._report(method, sql, parameters, elapsed, 0)
+
+    def _report(self, method, sql, parameters, elapsed, rows):
+        def explain():
+            # Rows are (id, parent, notused, detail); the detail reads like "SEARCH users USING INDEX ..."
+            return [row[-1] for row in self.connection.execute("EXPLAIN QUERY PLAN " + sql, parameters).fetchall()]
+
+        query_recorder.record("sqlite", method, sql, parameters, elapsed, rows, explain)
+
+
+class TimedSQLiteConnection(sqlite3.Connection):
+    """sqlite3 connection whose cursors are ``TimedSQLiteCursor`` (pass as ``factory=``)"""
+
+    def cursor(self, factory=TimedSQLiteCursor):
+        return super().cursor(factory)
+
+
+class _TimedPsycopgMixin:
+    """execute() timing for psycopg2 cursors, which fetch the whole result before returning"""
+
+    def execute(self, query, vars=None):
+        method = _caller()
+        started_at = time.perf_counter()
+        try:
+            result = super().execute(query, vars)
+        except psycopg2.Error:
+            query_recorder.record("postgresql", method, query, vars, time.perf_counter() - started_at, 0)
+            raise
+        query_recorder.record(
+            "postgresql", method, query, vars, time.perf_counter() - started_at, max(self.rowcount, 0),
+            lambda: self._explain(query, vars),
+        )
+        return result
+
+    def _explain(self, query, vars) -> list:
+        # A savepoint keeps a failing EXPLAIN from aborting the caller's transaction
+        cursor = psycopg2.extensions.cursor(self.connection)
+        in_transaction = self.connection.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE
+        try:
+            if in_transaction:
+                cursor.execute("SAVEPOINT explain_slow_query")
+            try:
+                cursor.execute("EXPLAIN " + query, vars)
+                return [row[0] for row in cursor.fetchall()]
+            except psycopg2.Error:
+                if in_transaction:
+                    cursor.execute("ROLLBACK TO SAVEPOINT explain_slow_query")
+                raise
+            finally:
+                if in_transaction:
+                    cursor.execute("RELEASE SAVEPOINT explain_slow_query")
+        finally:
+            cursor.close()
+
+
+class TimedPsycopgCursor(_TimedPsycopgMixin, psycopg2.extensions.cursor):
+    pass
+
+
+class TimedRealDictCursor(_TimedPsycopgMixin, psycopg2.extras.RealDictCursor):
+    pass
+
+
+class TimedPsycopgConnection(psycopg2.extensions.connection):
+    """psycopg2 connection whose default and RealDict cursors are timed (pass as ``connection_factory=``)"""
+
+    def cursor(self, *args, cursor_factory=None, **kwargs):
+        if cursor_factory is None:
+            cursor_factory = TimedPsycopgCursor
+        elif cursor_factory is psycopg2.extras.RealDictCursor:
+            cursor_factory = TimedRealDictCursor
+        return super().cursor(*args, cursor_factory=cursor_factory, **kwargs)
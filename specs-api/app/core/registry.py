@@ -0,0 +1,91 @@
+import inspect
+import threading
+from typing import Callable, Optional
+from .database_factory import get_async_database
+from .notifications import listens_for_invalidations
+
+
+class DatabaseRegistry:
+    """Process-wide owner of the database backend and the services built on it.
+
+    The FastAPI lifespan calls ``startup``/``shutdown`` so the backend is
+    created, schema-checked and connected exactly once per process. ``get``
+    also creates it lazily, for callers that run without the lifespan
+    (scripts, a TestClient used outside a ``with`` block). On PostgreSQL,
+    ``startup`` also starts a listener that passes cache invalidation events
+    from every worker to the services' ``handle_invalidation``.
+    """
+
+    def __init__(self, factory: Callable = get_async_database):
+        self._factory = factory
+        self._database = None
+        self._services = {}
+        self._lock = threading.Lock()
+        self.listener = None
+
+    def get(self):
+        """Get the shared database instance, creating it on first use"""
+        if self._database is None:
+            with self._lock:
+                if self._database is None:
+                    self._database = self._factory()
+        return self._database
+
+    @property
+    def database(self):
+        """The database instance if it has been created, without creating it"""
+        return self._database
+
+    def services(self) -> list:
+        """The service instances created so far"""
+        return list(self._services.values())
+
+    def service(self, service_class):
+        """Get the shared instance of a service class, constructed with the database"""
+        service = self._services.get(service_class)
+        if service is None:
+            db = self.get()
+            with self._lock:
+                service = self._services.get(service_class)
+                if service is None:
+                    service = self._services[service_class] = service_class(db)
+        return service
+
+    async def startup(self):
+        """Create the database and open its connections"""
+        db = self.get()
+        connect: Optional[Callable] = getattr(db, "connect", None)
+        if connect is not None and inspect.iscoroutinefunction(connect):
+            await connect()
+        if listens_for_invalidations(db):
+            self.listener = db.invalidation_listener(self.dispatch_invalidation)
+            await self.listener.start()
+
+    def dispatch_invalidation(self, event: dict):
+        """Pass an invalidation event to every service that caches"""
+        for service in list(self._services.values()):
+            handle = getattr(service, "handle_invalidation", None)
+            if handle is not None:
+                handle(event)
+
+    async def shutdown(self):
+        """Stop listening, close services, drain connection pools and forget the database"""
+        if self.listener is not None:
+            await self.listener.stop()
+            self.listener = None
+        with self._lock:
+            db, self._database = self._database, None
+            services = list(self._services.values())
+            self._services.clear()
+        for service in services:
+            close = getattr(service, "close", None)
+            if close is not None:
+                close()
+        if db is None:
+            return
+        result = db.close()
+        if inspect.isawaitable(result):
+            await result
+
+
+database_registry = DatabaseRegistry()
@@ -0,0 +1,30 @@
+import os
+from typing import Any
+from fastapi.datastructures import Default
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # optional: uv sync --extra fast-json
+    orjson = None
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson when it is installed, otherwise with the stdlib encoder"""
+
+    def render(self, content: Any) -> bytes:
+        if orjson is None:
+            return super().render(content)
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+
+def default_response_class():
+    """App-wide response class: FastJSONResponse if FAST_JSON_RESPONSES is set, FastAPI's default otherwise.
+
+    An explicit class turns off FastAPI's own fast path for routes with a
+    response model (Pydantic writes their JSON bytes directly), so this only
+    pays off when most traffic goes to untyped routes and orjson is installed.
+    """
+    if os.getenv("FAST_JSON_RESPONSES", "false").lower() in ("1", "true", "yes"):
+        return FastJSONResponse
+    return Default(JSONResponse)
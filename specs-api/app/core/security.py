@@ -1,10 +1,6 @@
 from fastapi import HTTPException, status, Depends
 from functools import wraps
 from typing import List
-from ..services.auth_service import AuthService
-
-# Initialize auth service
-auth_service = AuthService()
 
 def require_scopes(required_scopes: List[str]):
     """Decorator to require specific scopes for an endpoint"""
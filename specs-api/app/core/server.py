@@ -0,0 +1,251 @@
+import importlib.util
+import logging
+import logging.config
+import multiprocessing
+import os
+import random
+import shutil
+import signal
+import socket
+import tempfile
+import time
+from multiprocessing.connection import wait
+from typing import Dict, Optional
+import uvicorn
+from prometheus_client.multiprocess import mark_process_dead
+from uvicorn.config import LOGGING_CONFIG
+
+logger = logging.getLogger("uvicorn.error")
+
+APP = "main:app"
+
+# A worker that dies this soon after starting is counted towards a crash loop
+MIN_WORKER_UPTIME = 5.0
+MAX_FAST_FAILURES = 5
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    return os.getenv(name, "true" if default else "false").lower() in ("1", "true", "yes")
+
+
+def cpu_count() -> int:
+    """CPUs this process may run on (respects affinity and container CPU sets)"""
+    return os.process_cpu_count() or 1
+
+
+class ServerSettings:
+    """Launcher settings, read from SERVER_* environment variables by ``from_env``"""
+
+    def __init__(
+        self,
+        host: str = "0.0.0.0",
+        port: int = 8000,
+        workers: int = 1,
+        loop: str = "auto",
+        http: str = "auto",
+        reuse_port: bool = hasattr(socket, "SO_REUSEPORT"),
+        backlog: int = 2048,
+        keepalive_timeout: float = 5.0,
+        graceful_timeout: float = 30.0,
+        max_requests: int = 0,
+        max_requests_jitter: int = 0,
+        limit_concurrency: Optional[int] = None,
+        access_log: bool = True,
+    ):
+        self.host = host
+        self.port = port
+        self.workers = workers
+        self.loop = loop
+        self.http = http
+        # A recycled worker's own SO_REUSEPORT socket takes the connections queued on it down with
+        # it, so with max_requests every worker accepts from the one socket the supervisor keeps open
+        self.reuse_port = reuse_port and hasattr(socket, "SO_REUSEPORT") and max_requests <= 0
+        self.backlog = backlog
+        self.keepalive_timeout = keepalive_timeout
+        self.graceful_timeout = graceful_timeout
+        self.max_requests = max_requests
+        self.max_requests_jitter = max_requests_jitter
+        self.limit_concurrency = limit_concurrency
+        self.access_log = access_log
+
+    @classmethod
+    def from_env(cls) -> "ServerSettings":
+        return cls(
+            host=os.getenv("SERVER_HOST", "0.0.0.0"),
+            port=int(os.getenv("SERVER_PORT", "8000")),
+            workers=int(os.getenv("SERVER_WORKERS", "0")) or cpu_count(),
+            loop=os.getenv("SERVER_LOOP", "auto"),
+            http=os.getenv("SERVER_HTTP", "auto"),
+            reuse_port=_env_bool("SERVER_REUSE_PORT", True),
+            backlog=int(os.getenv("SERVER_BACKLOG", "2048")),
+            keepalive_timeout=float(os.getenv("SERVER_KEEPALIVE_TIMEOUT", "5")),
+            graceful_timeout=float(os.getenv("SERVER_GRACEFUL_TIMEOUT", "30")),
+            max_requests=int(os.getenv("SERVER_MAX_REQUESTS", "0")),
+            max_requests_jitter=int(os.getenv("SERVER_MAX_REQUESTS_JITTER", "0")),
+            limit_concurrency=int(os.getenv("SERVER_LIMIT_CONCURRENCY", "0")) or None,
+            access_log=_env_bool("SERVER_ACCESS_LOG", True),
+        )
+
+    def worker_max_requests(self) -> Optional[int]:
+        """Requests before a worker restarts, jittered so workers don't all restart at once"""
+        if self.max_requests <= 0:
+            return None
+        return self.max_requests + random.randint(0, max(0, self.max_requests_jitter))
+
+    def describe(self) -> str:
+        # "auto" means uvloop/httptools when installed (uv sync --extra server)
+        loop = self.loop if self.loop != "auto" else ("uvloop" if importlib.util.find_spec("uvloop") else "asyncio")
+        http = self.http if self.http != "auto" else ("httptools" if importlib.util.find_spec("httptools") else "h11")
+        return (
+            f"{self.workers} worker(s) on {self.host}:{self.port} "
+            f"(loop={loop}, http={http}, reuse_port={self.reuse_port}, backlog={self.backlog})"
+        )
+
+
+def bind_socket(settings: ServerSettings) -> socket.socket:
+    """Create the listening socket; with reuse_port, every worker binds its own and the kernel balances them"""
+    family = socket.AF_INET6 if ":" in settings.host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    if settings.reuse_port:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.bind((settings.host, settings.port))
+    sock.listen(settings.backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def serve(settings: ServerSettings, sock: Optional[socket.socket] = None):
+    """Run one uvicorn server process until it is signalled or reaches its request limit"""
+    if sock is None:
+        sock = bind_socket(settings)
+    config = uvicorn.Config(
+        APP,
+        loop=settings.loop,
+        http=settings.http,
+        backlog=settings.backlog,
+        timeout_keep_alive=settings.keepalive_timeout,
+        timeout_graceful_shutdown=settings.graceful_timeout,
+        limit_max_requests=settings.worker_max_requests(),
+        limit_concurrency=settings.limit_concurrency,
+        access_log=settings.access_log,
+    )
+    # SIGTERM stops accepting, lets in-flight requests finish (up to graceful_timeout) and runs lifespan shutdown
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+class Supervisor:
+    """Start ``settings.workers`` server processes and keep that many running.
+
+    Workers that exit (request limit reached, crash) are replaced. SIGTERM or
+    SIGINT is forwarded to every worker so each drains gracefully, and any
+    still running after the graceful timeout are killed. A worker that keeps
+    dying right after start stops the launcher instead of looping.
+    """
+
+    def __init__(self, settings: ServerSettings):
+        self.settings = settings
+        self.context = multiprocessing.get_context("spawn")
+        self.processes: Dict[int, multiprocessing.Process] = {}
+        self.started_at: Dict[int, float] = {}
+        self.shared_socket: Optional[socket.socket] = None
+        self.should_exit = False
+        self.fast_failures = 0
+        self.metrics_dir: Optional[str] = None
+        self.shared_cache_dir: Optional[str] = None
+        self.profile_dir: Optional[str] = None
+
+    def _start(self, slot: int):
+        process = self.context.Process(
+            target=serve, args=(self.settings, self.shared_socket), name=f"specs-api-worker-{slot}"
+        )
+        process.start()
+        self.processes[slot] = process
+        self.started_at[slot] = time.monotonic()
+        logger.info("Started worker %s [%s]", slot, process.pid)
+
+    def _handle_exit(self, signum, frame):
+        self.should_exit = True
+
+    def run(self) -> int:
+        """Supervise workers until signalled; returns the process exit code"""
+        # One bcrypt pool per CPU in every worker would oversubscribe the host
+        os.environ.setdefault("PASSWORD_HASH_WORKERS", str(max(1, cpu_count() // self.settings.workers)))
+        # Workers write metrics to files here so /metrics on any worker reports all of them
+        if not os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+            self.metrics_dir = tempfile.mkdtemp(prefix="specs-metrics-")
+            os.environ["PROMETHEUS_MULTIPROC_DIR"] = self.metrics_dir
+        # Request profiles go here so any worker can serve the ones another worker took
+        if not os.getenv("REQUEST_PROFILE_DIR"):
+            self.profile_dir = tempfile.mkdtemp(prefix="specs-profiles-")
+            os.environ["REQUEST_PROFILE_DIR"] = self.profile_dir
+        # Shared cache files go in a directory only this user can enter; removed when we exit
+        if os.getenv("SHARED_CACHE", "false").lower() in ("1", "true", "yes"):
+            from .shared_cache import CACHE_DIR_ENV, make_cache_directory
+            self.shared_cache_dir = os.environ[CACHE_DIR_ENV] = make_cache_directory()
+        if not self.settings.reuse_port:
+            self.shared_socket = bind_socket(self.settings)
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(signum, self._handle_exit)
+
+        logger.info("Starting %s", self.settings.describe())
+        for slot in range(self.settings.workers):
+            self._start(slot)
+
+        exit_code = 0
+        while not self.should_exit:
+            wait([process.sentinel for process in self.processes.values()], timeout=0.5)
+            for slot, process in list(self.processes.items()):
+                if process.is_alive() or self.should_exit:
+                    continue
+                uptime = time.monotonic() - self.started_at[slot]
+                logger.info("Worker %s [%s] exited with %s after %.0fs", slot, process.pid, process.exitcode, uptime)
+                self._forget_metrics(process.pid)
+                self.fast_failures = self.fast_failures + 1 if uptime < MIN_WORKER_UPTIME and process.exitcode else 0
+                if self.fast_failures >= MAX_FAST_FAILURES:
+                    logger.error("Workers keep failing at startup, stopping")
+                    self.should_exit, exit_code = True, 1
+                    break
+                self._start(slot)
+
+        self.shutdown()
+        return exit_code
+
+    def shutdown(self):
+        """Ask every worker to drain, then kill stragglers"""
+        logger.info("Draining %s worker(s)", len(self.processes))
+        for process in self.processes.values():
+            if process.is_alive():
+                process.terminate()
+        deadline = time.monotonic() + self.settings.graceful_timeout + 5
+        for process in self.processes.values():
+            process.join(max(0.0, deadline - time.monotonic()))
+            if process.is_alive():
+                logger.warning("Worker [%s] did not drain in time, killing it", process.pid)
+                process.kill()
+                process.join()
+        if self.shared_socket is not None:
+            self.shared_socket.close()
+        if self.metrics_dir is not None:
+            shutil.rmtree(self.metrics_dir, ignore_errors=True)
+        if self.profile_dir is not None:
+            shutil.rmtree(self.profile_dir, ignore_errors=True)
+        if self.shared_cache_dir is not None:
+            shutil.rmtree(self.shared_cache_dir, ignore_errors=True)
+
+    def _forget_metrics(self, pid: int):
+        # Drop a dead worker's in-flight gauge; its counters and histograms stay in the totals
+        if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+            mark_process_dead(pid)
+
+
+def run(settings: Optional[ServerSettings] = None) -> int:
+    """Production entry point: one in-process server, or a supervised pool of workers"""
+    settings = settings or ServerSettings.from_env()
+    # Same log format for the supervisor as for the workers (uvicorn only configures it in Config)
+    logging.config.dictConfig(LOGGING_CONFIG)
+    if settings.workers == 1:
+        logger.info("Starting %s", settings.describe())
+        serve(settings)
+        return 0
+    return Supervisor(settings).run()
@@ -0,0 +1,309 @@
+import fcntl
+import hashlib
+import json
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from typing import Any, Callable, Hashable, Optional
+
+MAGIC = b"SPCACHE1"
+HEADER = struct.Struct("<8sII")
+HEADER_SIZE = 64
+# seq, key hash, expires_at, key length, value length
+SLOT_HEADER = struct.Struct("<IQdHI")
+SLOT_HEADER_SIZE = 32
+# Slots per bucket; a key can only live in its own bucket, so a bucket is the unit of locking
+WAYS = 4
+READ_RETRIES = 4
+# Private (0700) directory created by the launcher for its workers and removed when it exits
+CACHE_DIR_ENV = "SHARED_CACHE_DIR"
+
+
+def default_directory() -> str:
+    """/dev/shm where available, so the table lives in RAM; otherwise the temp directory"""
+    return "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+
+
+def make_cache_directory() -> str:
+    """Create a directory only this user can enter, for one launcher's cache files"""
+    return tempfile.mkdtemp(prefix=f"specs-cache-{os.getpid()}-", dir=default_directory())
+
+
+def cache_path(directory: str, name: str, slots: int, slot_size: int, scope: str = "") -> str:
+    """File for cache ``name``; its geometry and a hash of ``scope`` (e.g. key and database) are in the name"""
+    digest = hashlib.sha256(scope.encode()).hexdigest()[:16]
+    return os.path.join(directory, f"specs-{name}-{digest}-{slots}x{slot_size}.cache")
+
+
+def _open_private(path: str) -> int:
+    # A hit skips token verification, so the table must be writable by nobody else
+    fd = os.open(path, os.O_RDWR | os.O_CREAT | os.O_NOFOLLOW, 0o600)
+    info = os.fstat(fd)
+    if info.st_uid != os.getuid() or info.st_mode & 0o077:
+        os.close(fd)
+        raise PermissionError(f"Refusing shared cache file {path}: it must be owned by this user with mode 0600")
+    return fd
+
+
+def _encode_key(key: Hashable) -> bytes:
+    if isinstance(key, bytes):
+        return b"b" + key
+    if isinstance(key, int):
+        return b"i" + str(key).encode()
+    return b"s" + str(key).encode()
+
+
+def _decode_key(data: bytes) -> Hashable:
+    tag, body = data[:1], data[1:]
+    if tag == b"b":
+        return body
+    if tag == b"i":
+        return int(body)
+    return body.decode()
+
+
+class SharedMemoryCache:
+    """TTL cache in a memory-mapped file shared by every worker process on a host.
+
+    Drop-in for ``TTLCache`` on the token path: N workers warm one cache
+    instead of N. The table is a fixed array of ``slot_size``-byte slots in
+    buckets of ``WAYS``; a full bucket evicts the entry closest to expiry.
+    Values are stored as JSON and must fit in a slot, otherwise they are
+    simply not cached. Reads take no lock: each slot has a sequence number
+    that writers make odd while writing, and a reader retries if it changed.
+    Writers hold a per-bucket-stripe ``fcntl`` lock (plus a thread lock,
+    since ``fcntl`` locks are per process). Expiry uses the wall clock,
+    which all processes share.
+
+    Entries from processes that used different settings are never mixed:
+    by default the file lives in the launcher's private ``SHARED_CACHE_DIR``
+    and its name holds the table geometry and a hash of ``scope``, so workers
+    of another server, signing key or database never share it. A file must
+    belong to this user with mode 0600, and one with another geometry is
+    refused rather than resized under the workers mapping it. The launcher
+    removes the directory when it exits.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        maxsize: int = 1024,
+        ttl: float = 60.0,
+        slot_size: int = 1024,
+        path: Optional[str] = None,
+        directory: Optional[str] = None,
+        scope: str = "",
+        stripes: int = 64,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.slot_size = slot_size
+        self.buckets = max(1, -(-maxsize // WAYS))
+        self.slots = self.buckets * WAYS
+        self.stripes = min(stripes, self.buckets)
+        self._clock = clock
+        self._thread_locks = [threading.Lock() for _ in range(self.stripes)]
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self.oversize = 0
+
+        if path is None:
+            directory = directory or os.getenv(CACHE_DIR_ENV)
+            if not directory:
+                raise ValueError(f"SharedMemoryCache needs a path or {CACHE_DIR_ENV} from the launcher")
+            path = cache_path(directory, name, self.slots, slot_size, scope)
+        self.path = path
+        self._fd = _open_private(path)
+        self._size = HEADER_SIZE + self.slots * slot_size
+        try:
+            self._initialize()
+        except BaseException:
+            os.close(self._fd)
+            raise
+        self._buf = mmap.mmap(self._fd, self._size)
+
+    def _initialize(self):
+        # Byte ranges past the stripes serialize creation between workers starting together
+        fcntl.lockf(self._fd, fcntl.LOCK_EX, 1, self.stripes)
+        try:
+            header = HEADER.pack(MAGIC, self.slots, self.slot_size)
+            size = os.fstat(self._fd).st_size
+            if size == 0:
+                os.ftruncate(self._fd, self._size)
+                os.pwrite(self._fd, header, 0)
+            elif size != self._size or os.pread(self._fd, HEADER.size, 0) != header:
+                # Other workers may have it mapped: truncating it would crash them with SIGBUS
+                raise ValueError(f"Shared cache file {self.path} has another geometry; remove it first")
+        finally:
+            fcntl.lockf(self._fd, fcntl.LOCK_UN, 1, self.stripes)
+
+    @property
+    def enabled(self) -> bool:
+        return self.maxsize > 0 and self.ttl > 0
+
+    def _locate(self, key: Hashable):
+        key_bytes = _encode_key(key)
+        # The low bit is forced on so 0 can mean "empty"; buckets come from the other bits
+        key_hash = int.from_bytes(hashlib.blake2b(key_bytes, digest_size=8).digest(), "little") | 1
+        return key_bytes, key_hash, (key_hash >> 1) % self.buckets
+
+    def _offset(self, bucket: int, way: int) -> int:
+        return HEADER_SIZE + (bucket * WAYS + way) * self.slot_size
+
+    def _lock(self, bucket: int):
+        return _StripeLock(self, bucket % self.stripes)
+
+    def _read_slot(self, offset: int):
+        """Consistent snapshot of a slot as (key_hash, expires_at, key, value), or None if empty"""
+        for _ in range(READ_RETRIES):
+            seq, key_hash, expires_at, key_len, value_len = SLOT_HEADER.unpack_from(self._buf, offset)
+            if seq & 1:
+                continue
+            if key_hash == 0:
+                return None
+            start = offset + SLOT_HEADER_SIZE
+            payload = self._buf[start:start + key_len + value_len]
+            if SLOT_HEADER.unpack_from(self._buf, offset)[0] != seq:
+                continue
+            return key_hash, expires_at, payload[:key_len], payload[key_len:]
+        # Kept changing under us; treat as a miss rather than spin
+        return None
+
+    def _write_slot(self, offset: int, key_hash: int = 0, expires_at: float = 0.0, payload: bytes = b"", key_len: int = 0):
+        seq = SLOT_HEADER.unpack_from(self._buf, offset)[0]
+        struct.pack_into("<I", self._buf, offset, seq + 1)
+        SLOT_HEADER.pack_into(self._buf, offset, seq + 1, key_hash, expires_at, key_len, len(payload) - key_len)
+        start = offset + SLOT_HEADER_SIZE
+        self._buf[start:start + len(payload)] = payload
+        struct.pack_into("<I", self._buf, offset, (seq + 2) & 0xFFFFFFFF)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Get a live entry, or None"""
+        key_bytes, key_hash, bucket = self._locate(key)
+        for way in range(WAYS):
+            slot = self._read_slot(self._offset(bucket, way))
+            if slot is None or slot[0] != key_hash or slot[2] != key_bytes:
+                continue
+            if slot[1] <= self._clock():
+                self.expirations += 1
+                break
+            self.hits += 1
+            return json.loads(slot[3])
+        self.misses += 1
+        return None
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        """Store an entry, replacing the one closest to expiry if its bucket is full"""
+        if not self.enabled:
+            return
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0:
+            return
+        key_bytes, key_hash, bucket = self._locate(key)
+        payload = key_bytes + json.dumps(value, separators=(",", ":"), default=str).encode()
+        if len(payload) > self.slot_size - SLOT_HEADER_SIZE:
+            self.oversize += 1
+            return
+        now = self._clock()
+        with self._lock(bucket):
+            target, target_expiry = None, None
+            for way in range(WAYS):
+                offset = self._offset(bucket, way)
+                _, slot_hash, expires_at, key_len, _ = SLOT_HEADER.unpack_from(self._buf, offset)
+                if slot_hash == key_hash and self._buf[offset + SLOT_HEADER_SIZE:offset + SLOT_HEADER_SIZE + key_len] == key_bytes:
+                    target, target_expiry = offset, now
+                    break
+                if slot_hash == 0 or expires_at <= now:
+                    expires_at = now
+                if target is None or expires_at < target_expiry:
+                    target, target_expiry = offset, expires_at
+            if target_expiry > now:
+                self.evictions += 1
+            self._write_slot(target, key_hash, now + ttl, payload, len(key_bytes))
+
+    def invalidate(self, key: Hashable) -> bool:
+        """Drop one entry; returns whether it was present"""
+        key_bytes, key_hash, bucket = self._locate(key)
+        with self._lock(bucket):
+            for way in range(WAYS):
+                offset = self._offset(bucket, way)
+                slot = self._read_slot(offset)
+                if slot is not None and slot[0] == key_hash and slot[2] == key_bytes:
+                    self._write_slot(offset)
+                    self.invalidations += 1
+                    return True
+        return False
+
+    def invalidate_where(self, predicate: Callable[[Hashable, Any], bool]) -> int:
+        """Drop every entry for which ``predicate(key, value)`` is true; scans the whole table"""
+        removed = 0
+        for bucket in range(self.buckets):
+            with self._lock(bucket):
+                for way in range(WAYS):
+                    offset = self._offset(bucket, way)
+                    slot = self._read_slot(offset)
+                    if slot is not None and predicate(_decode_key(slot[2]), json.loads(slot[3])):
+                        self._write_slot(offset)
+                        removed += 1
+        self.invalidations += removed
+        return removed
+
+    def clear(self):
+        """Drop all entries"""
+        self.invalidate_where(lambda key, value: True)
+
+    def __len__(self) -> int:
+        now = self._clock()
+        count = 0
+        for slot in range(self.slots):
+            _, key_hash, expires_at, _, _ = SLOT_HEADER.unpack_from(self._buf, HEADER_SIZE + slot * self.slot_size)
+            count += key_hash != 0 and expires_at > now
+        return count
+
+    def stats(self) -> dict:
+        """Get size (shared by all workers) and this process's hit/miss counters"""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self),
+            "maxsize": self.slots,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+            "oversize": self.oversize,
+            "shared": True,
+            "path": self.path,
+        }
+
+    def close(self):
+        """Unmap the table; the file stays for the other workers until the launcher removes its directory"""
+        self._buf.close()
+        os.close(self._fd)
+
+
+class _StripeLock:
+    """Exclusive lock on one stripe, held against other threads and other processes"""
+
+    __slots__ = ("cache", "stripe")
+
+    def __init__(self, cache: SharedMemoryCache, stripe: int):
+        self.cache = cache
+        self.stripe = stripe
+
+    def __enter__(self):
+        self.cache._thread_locks[self.stripe].acquire()
+        fcntl.lockf(self.cache._fd, fcntl.LOCK_EX, 1, self.stripe)
+
+    def __exit__(self, exc_type, exc, tb):
+        fcntl.lockf(self.cache._fd, fcntl.LOCK_UN, 1, self.stripe)
+        self.cache._thread_locks[self.stripe].release()
@@ -0,0 +1,154 @@
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from .query_log import TimedSQLiteConnection
+
+JOURNAL_MODES = {"DELETE", "TRUNCATE", "PERSIST", "MEMORY", "WAL", "OFF"}
+SYNCHRONOUS_MODES = {"OFF", "NORMAL", "FULL", "EXTRA"}
+
+
+class SQLiteConnectionManager:
+    """Long-lived SQLite connections: one reader per thread plus a single shared writer.
+
+    In WAL mode readers never block the writer (or each other), so each thread
+    keeps its own autocommit, query-only connection. All writes go through one
+    connection serialised by a lock, which avoids SQLITE_BUSY between writers
+    in the same process; ``busy_timeout`` covers writers in other processes.
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        journal_mode: str = "WAL",
+        synchronous: str = "NORMAL",
+        mmap_size: int = 268435456,
+        cache_size: int = -64000,
+        busy_timeout: int = 5000,
+    ):
+        journal_mode = journal_mode.upper()
+        synchronous = synchronous.upper()
+        if journal_mode not in JOURNAL_MODES:
+            raise ValueError(f"Unsupported SQLite journal mode: {journal_mode}")
+        if synchronous not in SYNCHRONOUS_MODES:
+            raise ValueError(f"Unsupported SQLite synchronous mode: {synchronous}")
+
+        self.db_path = db_path
+        self.journal_mode = journal_mode
+        self.synchronous = synchronous
+        self.mmap_size = int(mmap_size)
+        self.cache_size = int(cache_size)
+        self.busy_timeout = int(busy_timeout)
+
+        self._local = threading.local()
+        self._readers = {}
+        self._readers_lock = threading.Lock()
+        self._writer = None
+        self._write_lock = threading.Lock()
+        self._closed = False
+
+        # Statistics
+        self._writes = 0
+        self._write_wait_total = 0.0
+        self._write_wait_max = 0.0
+
+    def _configure(self, conn: sqlite3.Connection):
+        conn.row_factory = sqlite3.Row
+        conn.execute(f"PRAGMA busy_timeout = {self.busy_timeout}")
+        conn.execute(f"PRAGMA synchronous = {self.synchronous}")
+        conn.execute(f"PRAGMA cache_size = {self.cache_size}")
+        conn.execute(f"PRAGMA mmap_size = {self.mmap_size}")
+
+    def open_connection(self, isolation_level=""):
+        """Open a new connection with the configured pragmas applied"""
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=self.busy_timeout / 1000,
+            isolation_level=isolation_level,
+            check_same_thread=False,
+            # Cursors time their statements for metrics and the slow-query log
+            factory=TimedSQLiteConnection,
+        )
+        self._configure(conn)
+        return conn
+
+    def _open_writer(self) -> sqlite3.Connection:
+        # BEGIN IMMEDIATE takes the write lock up front instead of failing on lock upgrade
+        conn = self.open_connection(isolation_level="IMMEDIATE")
+        # journal_mode is persistent in the database file, so the writer sets it once
+        self.journal_mode = conn.execute(f"PRAGMA journal_mode = {self.journal_mode}").fetchone()[0].upper()
+        return conn
+
+    def _open_reader(self) -> sqlite3.Connection:
+        conn = self.open_connection(isolation_level=None)
+        conn.execute("PRAGMA query_only = ON")
+        thread = threading.current_thread()
+        with self._readers_lock:
+            # Drop connections owned by threads that have exited
+            for owner in [t for t in self._readers if not t.is_alive()]:
+                self._readers.pop(owner).close()
+            self._readers[thread] = conn
+        return conn
+
+    @contextmanager
+    def read_connection(self):
+        """Yield this thread's read-only connection"""
+        if self._closed:
+            raise sqlite3.ProgrammingError("Connection manager is closed")
+        conn = getattr(self._local, "reader", None)
+        if conn is None:
+            conn = self._local.reader = self._open_reader()
+        yield conn
+
+    @contextmanager
+    def write_connection(self):
+        """Yield the shared writer connection while holding the write lock.
+
+        The caller commits; anything left uncommitted, including after an
+        exception, is rolled back before the lock is released.
+        """
+        start = time.monotonic()
+        with self._write_lock:
+            waited = time.monotonic() - start
+            self._writes += 1
+            self._write_wait_total += waited
+            if waited > self._write_wait_max:
+                self._write_wait_max = waited
+
+            if self._closed:
+                raise sqlite3.ProgrammingError("Connection manager is closed")
+            if self._writer is None:
+                self._writer = self._open_writer()
+            conn = self._writer
+            try:
+                yield conn
+            finally:
+                if conn.in_transaction:
+                    conn.rollback()
+
+    def close(self):
+        """Close the writer and every reader connection"""
+        with self._write_lock:
+            self._closed = True
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+        with self._readers_lock:
+            for conn in self._readers.values():
+                conn.close()
+            self._readers.clear()
+
+    def stats(self) -> dict:
+        """Snapshot of connection usage counters"""
+        with self._readers_lock:
+            readers = len(self._readers)
+        return {
+            "journal_mode": self.journal_mode,
+            "synchronous": self.synchronous,
+            "readers": readers,
+            "writer_open": self._writer is not None,
+            "writes": self._writes,
+            "write_wait_total": round(self._write_wait_total, 6),
+            "write_wait_avg": round(self._write_wait_total / self._writes, 6) if self._writes else 0.0,
+            "write_wait_max": round(self._write_wait_max, 6),
+        }
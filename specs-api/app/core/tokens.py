@@ -0,0 +1,130 @@
+import base64
+import hashlib
+import json
+import os
+from typing import Dict, Iterable, Optional
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jose import JWTError, jwk, jwt
+
+# JWT settings
+SECRET_KEY = "your-secret-key-change-this-in-production"
+ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
+ACCESS_TOKEN_EXPIRE_MINUTES = 30
+
+ALGORITHMS = ("HS256", "RS256")
+
+
+def _b64url(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def generate_private_key() -> bytes:
+    """Generate a 2048-bit RSA signing key as unencrypted PKCS#8 PEM"""
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    return key.private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+    )
+
+
+class RSAKey:
+    """An RS256 key: the private half if we sign with it, always the public half and its JWK"""
+
+    def __init__(self, pem: bytes):
+        loaded = serialization.load_pem_private_key(pem, password=None) if b"PRIVATE" in pem else None
+        public_key = loaded.public_key() if loaded is not None else serialization.load_pem_public_key(pem)
+        self.private_pem = pem if loaded is not None else None
+        self.public_pem = public_key.public_bytes(
+            serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+        )
+        public_jwk = jwk.construct(self.public_pem, "RS256").to_dict()
+        # RFC 7638 thumbprint, so the kid is stable for a key wherever it is loaded
+        thumbprint_input = json.dumps(
+            {"e": public_jwk["e"], "kty": public_jwk["kty"], "n": public_jwk["n"]},
+            separators=(",", ":"), sort_keys=True,
+        )
+        self.kid = _b64url(hashlib.sha256(thumbprint_input.encode()).digest())
+        self.jwk = {**public_jwk, "kid": self.kid, "use": "sig"}
+
+
+class TokenSigner:
+    """Sign and verify access tokens.
+
+    HS256 uses the shared ``SECRET_KEY``. RS256 signs with one active private
+    key and verifies against it plus any retired public keys, chosen by the
+    ``kid`` header; the public keys are published as a JWKS so other services
+    can verify tokens locally. To rotate, start signing with a new key and
+    keep the previous one as a verification key until its tokens expire.
+    """
+
+    def __init__(
+        self,
+        algorithm: str = "HS256",
+        secret_key: str = SECRET_KEY,
+        signing_key: Optional[bytes] = None,
+        verification_keys: Iterable[bytes] = (),
+    ):
+        if algorithm not in ALGORITHMS:
+            raise ValueError(f"Unsupported JWT algorithm: {algorithm}")
+        self.algorithm = algorithm
+        self.secret_key = secret_key
+        self.signing_key: Optional[RSAKey] = None
+        self.keys: Dict[str, RSAKey] = {}
+
+        if algorithm == "RS256":
+            if signing_key is None:
+                # A key per process would make each worker reject the others' tokens
+                raise ValueError("RS256 needs a signing key shared by every worker; set JWT_SIGNING_KEY_FILE")
+            self.signing_key = RSAKey(signing_key)
+            for key in [self.signing_key, *(RSAKey(pem) for pem in verification_keys)]:
+                self.keys[key.kid] = key
+
+        # Serialized once; served as-is by /.well-known/jwks.json
+        self.jwks_json = json.dumps({"keys": [key.jwk for key in self.keys.values()]}).encode()
+
+    @classmethod
+    def from_env(cls) -> "TokenSigner":
+        """Build the signer from JWT_ALGORITHM, JWT_SIGNING_KEY_FILE and JWT_VERIFICATION_KEY_FILES"""
+        signing_key_file = os.getenv("JWT_SIGNING_KEY_FILE")
+        verification_key_files = [path for path in os.getenv("JWT_VERIFICATION_KEY_FILES", "").split(",") if path]
+        return cls(
+            algorithm=ALGORITHM,
+            signing_key=_read(signing_key_file) if signing_key_file else None,
+            verification_keys=[_read(path) for path in verification_key_files],
+        )
+
+    def encode(self, claims: dict) -> str:
+        """Sign a claims set"""
+        if self.signing_key is None:
+            return jwt.encode(claims, self.secret_key, algorithm=self.algorithm)
+        return jwt.encode(
+            claims, self.signing_key.private_pem, algorithm=self.algorithm, headers={"kid": self.signing_key.kid}
+        )
+
+    def decode(self, token: str) -> dict:
+        """Verify a token's signature and claims; raises JWTError"""
+        if self.signing_key is None:
+            return jwt.decode(token, self.secret_key, algorithms=[self.algorithm])
+        key = self.keys.get(jwt.get_unverified_header(token).get("kid"))
+        if key is None:
+            raise JWTError("Unknown signing key")
+        return jwt.decode(token, key.public_pem, algorithms=[self.algorithm])
+
+    @property
+    def fingerprint(self) -> str:
+        """Identifies the signing key without revealing it: the kid, or a hash of the HS256 secret"""
+        if self.signing_key is not None:
+            return self.signing_key.kid
+        return hashlib.sha256(self.secret_key.encode()).hexdigest()
+
+    def jwks(self) -> dict:
+        """Public keys in JWK Set format (empty for HS256)"""
+        return json.loads(self.jwks_json)
+
+
+def _read(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+token_signer = TokenSigner.from_env()
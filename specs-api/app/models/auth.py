@@ -15,10 +15,32 @@ class UserResponse(BaseModel):
     available_scopes: List[str] = []
     created_at: str
 
+class UserScopesSummary(BaseModel):
+    """A user and their scopes, as listed by GET /users/scopes"""
+    id: int
+    username: str
+    email: str
+    role: str
+    is_active: bool
+    available_scopes: List[str] = []
+
 class Token(BaseModel):
     access_token: str
     token_type: str
     scopes: List[str] = []
+    refresh_token: Optional[str] = None
+
+class RefreshRequest(BaseModel):
+    """Request to exchange a refresh token for a new access token"""
+    refresh_token: str
+
+class LogoutRequest(BaseModel):
+    """Optional refresh token to end along with the access token"""
+    refresh_token: Optional[str] = None
+
+class RevokeTokenRequest(BaseModel):
+    """Access token to deny until it expires"""
+    token: str
 
 class TokenData(BaseModel):
     username: Optional[str] = None
@@ -29,6 +51,27 @@ class UserLogin(BaseModel):
     password: str
     scopes: List[str] = []  # Requested scopes
 
+class TokenExchangeRequest(BaseModel):
+    """Request to trade a valid token for one with different scopes"""
+    scopes: List[str] = []
+    # False: only a subset of the presented token's scopes
+    # True: any of the user's currently available scopes
+    from_available_scopes: bool = False
+
+class ApiKeyCreate(BaseModel):
+    """Request to mint an API key for a user"""
+    name: str
+    scopes: List[str] = []
+
+class ApiKeyResponse(BaseModel):
+    """A newly minted API key; the key itself is only ever returned here"""
+    id: int
+    user_id: int
+    name: str
+    prefix: str
+    scopes: List[str] = []
+    api_key: str
+
 class ScopeRequest(BaseModel):
     """Request to grant/revoke scopes"""
     user_id: int
@@ -19,3 +19,17 @@ class EnvVarListResponse(BaseModel):
     """Response for listing environment variables"""
     variables: List[EnvVarResponse]
     total_count: int
+    username: str
+
+class EnvVarSetResponse(BaseModel):
+    """Response after creating/updating an environment variable"""
+    message: str
+    name: str
+    value: str
+    username: str
+
+class EnvVarDeleteResponse(BaseModel):
+    """Response after deleting an environment variable"""
+    message: str
+    name: str
+    username: str
@@ -1,22 +1,133 @@
 from fastapi import HTTPException, status
 from fastapi.security import HTTPAuthorizationCredentials
+import hashlib
+import logging
+import os
+import secrets
+import time
 from datetime import timedelta
 from typing import Optional
-from ..core.database_factory import get_database
-from ..models.auth import UserCreate, UserResponse, Token, UserLogin, UserScopesResponse
+from ..core.cache import TTLCache
+from ..core.database_factory import database_identity
+from ..core.denylist import TokenDenylist
+from ..core.notifications import listens_for_invalidations
+from ..core.passwords import PasswordHasher, PasswordHasherBusy
+from ..core.server_timing import timing_phase
+from ..core.tokens import token_signer
+from ..models.auth import UserCreate, UserResponse, Token, UserLogin, UserScopesResponse, ApiKeyResponse
+
+logger = logging.getLogger(__name__)
+
+# API keys are told apart from JWTs (which never start with this) in the Bearer header
+API_KEY_PREFIX = "sk_"
+
+
+def _digest(token: str) -> str:
+    # Refresh tokens and API keys are 256-bit random strings, so a fast digest is enough to store them
+    return hashlib.sha256(token.encode()).hexdigest()
 
 
 class AuthService:
-    def __init__(self):
-        self.db = get_database()
+    def __init__(
+        self,
+        db,
+        user_cache: Optional[TTLCache] = None,
+        token_cache: Optional[TTLCache] = None,
+        password_hasher: Optional[PasswordHasher] = None,
+    ):
+        self.db = db
+        # Users looked up on the token path, keyed by username. A per-process cache that no invalidation
+        # events reach would let a deactivated user through on other workers, so it only lives briefly
+        user_cache_ttl = float(os.getenv("USER_CACHE_TTL", "30"))
+        self.user_cache = user_cache if user_cache is not None else self._token_path_cache(
+            "users",
+            maxsize=int(os.getenv("USER_CACHE_SIZE", "10000")),
+            ttl=user_cache_ttl,
+            local_ttl=user_cache_ttl if listens_for_invalidations(db) else min(
+                user_cache_ttl, float(os.getenv("USER_CACHE_UNLISTENED_TTL", "1"))
+            ),
+        )
+        # Verified token claims keyed by SHA-256 of the token; entries expire at the token's exp
+        self.token_cache = token_cache if token_cache is not None else self._token_path_cache(
+            "tokens",
+            maxsize=int(os.getenv("TOKEN_CACHE_SIZE", "10000")),
+            ttl=float(os.getenv("TOKEN_CACHE_MAX_TTL", "3600")),
+        )
+        # Active API keys keyed by digest; revocation on another worker is seen within the TTL
+        self.api_key_cache = TTLCache(
+            maxsize=int(os.getenv("API_KEY_CACHE_SIZE", "10000")),
+            ttl=float(os.getenv("API_KEY_CACHE_TTL", "60")),
+        )
+        self.refresh_token_ttl = float(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "30")) * 86400
+        # Revoked access token ids, refreshed incrementally from the revoked_tokens table
+        self.denylist = TokenDenylist(
+            capacity=int(os.getenv("TOKEN_DENYLIST_CAPACITY", "100000")),
+            refresh_interval=float(os.getenv("TOKEN_DENYLIST_REFRESH_INTERVAL", "5")),
+        )
+        # Stateless tokens carry id, role and auth epoch, so authenticating them only compares epochs
+        self.stateless_tokens = os.getenv("STATELESS_TOKENS", "false").lower() in ("1", "true", "yes")
+        # Current auth epoch per user id; the TTL bounds how long a revocation on another worker goes unseen
+        self.auth_epoch_cache = TTLCache(
+            maxsize=int(os.getenv("AUTH_EPOCH_CACHE_SIZE", "10000")),
+            ttl=float(os.getenv("AUTH_EPOCH_CACHE_TTL", "5")),
+        )
+        # bcrypt runs on its own bounded pool so logins never block the event loop
+        self.password_hasher = password_hasher if password_hasher is not None else PasswordHasher(
+            max_workers=int(os.getenv("PASSWORD_HASH_WORKERS", "0")) or None,
+            max_pending=int(os.getenv("PASSWORD_HASH_MAX_PENDING", "64")),
+            executor=os.getenv("PASSWORD_HASH_EXECUTOR", "process"),
+        )
+    
+    @staticmethod
+    def _token_path_cache(name: str, maxsize: int, ttl: float, local_ttl: Optional[float] = None):
+        # With SHARED_CACHE, every worker process of the launcher shares one warm cache (and its invalidations)
+        if os.getenv("SHARED_CACHE", "false").lower() in ("1", "true", "yes"):
+            from ..core.shared_cache import CACHE_DIR_ENV, SharedMemoryCache
+            if os.getenv(CACHE_DIR_ENV):
+                return SharedMemoryCache(
+                    name, maxsize=maxsize, ttl=ttl, slot_size=int(os.getenv("SHARED_CACHE_SLOT_SIZE", "1024")),
+                    scope=f"{token_signer.fingerprint}|{database_identity()}",
+                )
+            logger.info("SHARED_CACHE needs the multi-worker launcher; using a per-process %s cache", name)
+        return TTLCache(maxsize=maxsize, ttl=ttl if local_ttl is None else local_ttl)
+    
+    def close(self):
+        """Stop the password hashing workers and unmap shared caches"""
+        self.password_hasher.shutdown(wait=False)
+        for cache in (self.user_cache, self.token_cache):
+            close = getattr(cache, "close", None)
+            if close is not None:
+                close()
+    
+    def cache_stats(self) -> dict:
+        """Get the stats of each cache on the token path, by name"""
+        return {
+            "user": self.user_cache.stats(),
+            "token": self.token_cache.stats(),
+            "api_key": self.api_key_cache.stats(),
+            "auth_epoch": self.auth_epoch_cache.stats(),
+        }
     
-    def register_user(self, user_data: UserCreate) -> UserResponse:
+    async def _offload_password_hashing(self, operation, *args):
+        try:
+            with timing_phase("bcrypt"):
+                return await operation(*args)
+        except PasswordHasherBusy:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many concurrent login attempts, please retry",
+                headers={"Retry-After": "1"},
+            )
+    
+    async def register_user(self, user_data: UserCreate) -> UserResponse:
         """Register a new user"""
-        if self.db.create_user(user_data.username, user_data.email, user_data.password):
-            created_user = self.db.get_user(user_data.username)
+        hashed_password = await self._offload_password_hashing(self.password_hasher.hash, user_data.password)
+        if await self.db.insert_user(user_data.username, user_data.email, hashed_password):
+            self.invalidate_user(username=user_data.username)
+            created_user = await self.db.get_user(user_data.username)
             if created_user:
                 # Get user scopes (will be empty for new user)
-                user_scopes = self.get_user_scopes_by_id(created_user["id"])
+                user_scopes = await self.get_user_scopes_by_id(created_user["id"])
                 
                 return UserResponse(
                     id=created_user["id"],
@@ -32,10 +143,20 @@ class AuthService:
             detail="Username or email already registered"
         )
     
-    def login_user(self, user_credentials: UserLogin) -> Token:
+    async def login_user(self, user_credentials: UserLogin) -> Token:
         """Login user and return JWT token with requested scopes"""
-        user = self.db.authenticate_user(user_credentials.username, user_credentials.password)
-        if not user:
+        user = await self.db.get_user(user_credentials.username)
+        if user:
+            verified, new_hash = await self._offload_password_hashing(
+                self.password_hasher.verify_and_update, user_credentials.password, user["hashed_password"]
+            )
+            if not verified:
+                user = None
+            elif new_hash is not None:
+                # Stored hash uses an outdated cost; upgrade it now that we know the password
+                await self.db.update_password_hash(user["id"], new_hash)
+                self.invalidate_user(username=user["username"])
+        if not user or not user["is_active"]:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Incorrect username or password",
@@ -45,40 +166,267 @@ class AuthService:
         # Validate and filter requested scopes
         valid_scopes = self.db.validate_scopes(user_credentials.scopes, user)
         
-        access_token_expires = timedelta(minutes=30)
-        access_token = self.db.create_access_token(
-            data={"sub": user["username"], "scopes": valid_scopes}, 
-            expires_delta=access_token_expires
+        access_token = self._create_access_token(user, valid_scopes)
+        
+        # Each login starts a new refresh token family
+        refresh_token = secrets.token_urlsafe(32)
+        if not await self.db.create_refresh_token(
+            user["id"], _digest(refresh_token), secrets.token_hex(16), valid_scopes, self._refresh_token_expiry()
+        ):
+            refresh_token = None
+        return Token(access_token=access_token, token_type="bearer", scopes=valid_scopes, refresh_token=refresh_token)
+    
+    async def refresh_access_token(self, refresh_token: str) -> Token:
+        """Exchange a refresh token for a new access token and a rotated refresh token"""
+        invalid = HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid refresh token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+        token_hash = _digest(refresh_token)
+        stored = await self.db.get_refresh_token(token_hash)
+        if stored is None or stored["expires_at"] <= time.time():
+            raise invalid
+        
+        new_refresh_token = secrets.token_urlsafe(32)
+        if stored["revoked"] or not await self.db.rotate_refresh_token(
+            token_hash, _digest(new_refresh_token), self._refresh_token_expiry()
+        ):
+            # A retired token was presented again, so it may have leaked: end the whole session
+            await self.db.revoke_refresh_token_family(stored["family_id"])
+            raise invalid
+        
+        # Read through the cache: the new token must carry the current scopes and auth epoch
+        user = await self.db.get_user(stored["username"])
+        if user is None or not user["is_active"]:
+            raise invalid
+        self._cache_user(user)
+        
+        # Drop any scope revoked since the original login
+        valid_scopes = self.db.validate_scopes(stored["scopes"], user)
+        access_token = self._create_access_token(user, valid_scopes)
+        return Token(
+            access_token=access_token, token_type="bearer", scopes=valid_scopes, refresh_token=new_refresh_token
         )
+    
+    async def exchange_token(
+        self, credentials: HTTPAuthorizationCredentials, requested_scopes: list, from_available_scopes: bool = False
+    ) -> Token:
+        """Trade a valid token for one with other scopes, without re-verifying the password"""
+        if credentials.credentials.startswith(API_KEY_PREFIX):
+            # A JWT minted from a key would outlive the key's revocation, and could carry scopes it lacks
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="API keys cannot be exchanged for access tokens",
+            )
+        user = await self.get_current_user_from_token(credentials)
+        if from_available_scopes:
+            if "available_scopes" not in user:
+                # Stateless tokens don't carry the user's record
+                user = {**await self.get_cached_user(user["username"]), "scopes": user["scopes"]}
+            valid_scopes = self.db.validate_scopes(requested_scopes, user)
+        else:
+            valid_scopes = [scope for scope in requested_scopes if scope in user["scopes"]]
+        
+        # The new token never outlives the one it was derived from
+        exp = self.verify_token(credentials.credentials)["exp"]
+        expires_delta = min(timedelta(minutes=30), timedelta(seconds=max(0, exp - time.time())))
+        
+        access_token = self._create_access_token(user, valid_scopes, expires_delta)
         return Token(access_token=access_token, token_type="bearer", scopes=valid_scopes)
     
-    def get_current_user_from_token(self, credentials: HTTPAuthorizationCredentials) -> dict:
+    def _create_access_token(self, user: dict, scopes: list, expires_delta: Optional[timedelta] = None) -> str:
+        access_token_expires = expires_delta or timedelta(minutes=30)
+        # jti lets this one token be revoked before it expires
+        data = {"sub": user["username"], "scopes": scopes, "jti": secrets.token_hex(16)}
+        if self.stateless_tokens:
+            data.update(uid=user["id"], role=user.get("role", "user"), epoch=user["auth_epoch"])
+        with timing_phase("jwt"):
+            return self.db.create_access_token(data=data, expires_delta=access_token_expires)
+    
+    def _refresh_token_expiry(self) -> int:
+        return int(time.time() + self.refresh_token_ttl)
+    
+    async def get_current_user_from_token(self, credentials: HTTPAuthorizationCredentials) -> dict:
         """Get current user from JWT token with scopes"""
         token = credentials.credentials
-        token_data = self.db.verify_token(token)
-        if token_data is None:
+        if token.startswith(API_KEY_PREFIX):
+            return await self.get_current_user_from_api_key(token)
+        token_data = self.verify_token(token)
+        if token_data is None or await self.is_token_revoked(token_data):
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Could not validate credentials",
                 headers={"WWW-Authenticate": "Bearer"},
             )
         
-        user = self.db.get_user(token_data["username"])
-        if user is None:
+        if self.stateless_tokens and token_data["epoch"] is not None:
+            return await self.get_current_user_from_claims(token_data)
+        
+        user = await self.get_cached_user(token_data["username"])
+        if user is None or not user["is_active"]:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Could not validate credentials",
                 headers={"WWW-Authenticate": "Bearer"},
             )
         
-        # Add scopes to user data
+        # Add scopes to a copy of the user data; the cached entry is shared
+        user = dict(user)
         user["scopes"] = token_data["scopes"]
         return user
     
-    def get_user_profile(self, current_user: dict) -> UserResponse:
+    async def get_current_user_from_claims(self, token_data: dict) -> dict:
+        """Get current user from a stateless token, checking only that its auth epoch is current"""
+        if await self.get_auth_epoch(token_data["uid"]) != token_data["epoch"]:
+            # Scopes changed or the user was deactivated after this token was issued
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Could not validate credentials",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        return {
+            "id": token_data["uid"],
+            "username": token_data["username"],
+            "role": token_data["role"],
+            "is_active": True,
+            "auth_epoch": token_data["epoch"],
+            "scopes": token_data["scopes"],
+        }
+    
+    async def get_auth_epoch(self, user_id: int) -> Optional[int]:
+        """Get a user's auth epoch (None if missing or inactive), served from the epoch cache when possible"""
+        epoch = self.auth_epoch_cache.get(user_id)
+        if epoch is None:
+            epoch = await self.db.get_auth_epoch(user_id)
+            if epoch is not None:
+                self.auth_epoch_cache.set(user_id, epoch)
+        return epoch
+    
+    async def get_current_user_from_api_key(self, api_key: str) -> dict:
+        """Get the user an API key belongs to, with the key's scopes"""
+        key_hash = _digest(api_key)
+        record = self.api_key_cache.get(key_hash)
+        if record is None:
+            record = await self.db.get_api_key(key_hash)
+            if record is not None:
+                self.api_key_cache.set(key_hash, record)
+        
+        user = await self.get_cached_user(record["username"]) if record is not None else None
+        if user is None or not user["is_active"]:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Could not validate credentials",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        
+        # A key never grants more than its owner currently holds
+        user = dict(user)
+        user["scopes"] = self.db.validate_scopes(record["scopes"], user)
+        return user
+    
+    def verify_token(self, token: str) -> Optional[dict]:
+        """Verify a JWT, skipping the signature check for a token verified earlier"""
+        key = hashlib.sha256(token.encode()).digest()
+        token_data = self.token_cache.get(key)
+        if token_data is None:
+            with timing_phase("jwt"):
+                token_data = self.db.verify_token(token)
+            # Only valid tokens are cached, and never past their expiry
+            if token_data is not None and token_data.get("exp") is not None:
+                self.token_cache.set(key, token_data, ttl=token_data["exp"] - time.time())
+        return token_data
+    
+    async def is_token_revoked(self, token_data: dict) -> bool:
+        """Check the in-memory denylist, first pulling revocations made since the last refresh if due"""
+        since = self.denylist.claim_refresh()
+        if since is not None:
+            self.denylist.merge(await self.db.get_revoked_tokens(since))
+        return token_data.get("jti") is not None and token_data["jti"] in self.denylist
+    
+    async def _deny_token(self, token: str, token_data: dict, user_id: Optional[int]) -> bool:
+        if token_data.get("jti") is None or token_data.get("exp") is None:
+            # Issued before tokens carried an id; it can only expire
+            return False
+        if not await self.db.revoke_token(token_data["jti"], user_id, int(token_data["exp"]), time.time()):
+            return False
+        # Other workers pick this up on their next denylist refresh
+        self.denylist.add(token_data["jti"], token_data["exp"])
+        self.token_cache.invalidate(hashlib.sha256(token.encode()).digest())
+        return True
+    
+    async def logout(self, credentials: HTTPAuthorizationCredentials, refresh_token: Optional[str] = None):
+        """Revoke the presented access token and, if given, the session of the refresh token"""
+        token = credentials.credentials
+        if token.startswith(API_KEY_PREFIX):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="API keys are revoked by an administrator"
+            )
+        user = await self.get_current_user_from_token(credentials)
+        if not await self._deny_token(token, self.verify_token(token), user["id"]):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Token cannot be revoked"
+            )
+        if refresh_token is not None:
+            stored = await self.db.get_refresh_token(_digest(refresh_token))
+            if stored is not None and stored["username"] == user["username"]:
+                await self.db.revoke_refresh_token_family(stored["family_id"])
+    
+    async def revoke_token(self, token: str) -> bool:
+        """Revoke another user's access token until it expires (admin only)"""
+        token_data = self.verify_token(token)
+        if token_data is None:
+            return False
+        user = await self.get_cached_user(token_data["username"])
+        return await self._deny_token(token, token_data, user["id"] if user else None)
+    
+    async def get_cached_user(self, username: str) -> Optional[dict]:
+        """Get user by username, served from the user cache when possible"""
+        user = self.user_cache.get(username)
+        if user is None:
+            user = await self.db.get_user(username)
+            if user is not None:
+                user = self._cache_user(user)
+        return user
+    
+    def _cache_user(self, user: dict) -> dict:
+        # Login reads the hash from the database; it has no business in a (possibly shared) cache
+        user = {key: value for key, value in user.items() if key != "hashed_password"}
+        self.user_cache.set(user["username"], user)
+        return user
+    
+    def invalidate_user(self, username: Optional[str] = None, user_id: Optional[int] = None):
+        """Drop a user's cached entry after their record or scopes change"""
+        if username is not None:
+            self.user_cache.invalidate(username)
+        if user_id is not None:
+            self.user_cache.invalidate_where(lambda _, user: user["id"] == user_id)
+            self.auth_epoch_cache.invalidate(user_id)
+    
+    def handle_invalidation(self, event: dict):
+        """Apply a cache invalidation event published by any worker"""
+        kind = event.get("kind")
+        if kind == "user":
+            self.invalidate_user(user_id=event["user_id"])
+        elif kind == "token":
+            self.denylist.add(event["jti"], event["exp"])
+        elif kind == "api_key":
+            self.api_key_cache.invalidate_where(lambda _, record: record["id"] == event["key_id"])
+        elif kind == "resync":
+            # Events may have been missed; the denylist catches up on its own refresh
+            self.user_cache.clear()
+            self.auth_epoch_cache.clear()
+            self.api_key_cache.clear()
+    
+    async def get_user_profile(self, current_user: dict) -> UserResponse:
         """Get current user profile"""
+        if "email" not in current_user:
+            # Stateless tokens don't carry the full record
+            current_user = await self.get_cached_user(current_user["username"])
         # Get user scopes
-        user_scopes = self.get_user_scopes_by_id(current_user["id"])
+        user_scopes = await self.get_user_scopes_by_id(current_user["id"])
         
         return UserResponse(
             id=current_user["id"],
@@ -107,34 +455,85 @@ class AuthService:
         user_scopes = current_user.get("scopes", [])
         return required_scope in user_scopes
     
-    def get_user_scopes(self, current_user: dict) -> dict:
+    async def get_user_scopes(self, current_user: dict) -> dict:
         """Get current user's scope information"""
+        available_scopes = current_user.get("available_scopes")
+        if available_scopes is None:
+            # Stateless tokens don't carry the full record
+            available_scopes = (await self.get_cached_user(current_user["username"]))["available_scopes"]
         return {
             "username": current_user["username"],
-            "available_scopes": current_user.get("available_scopes", []),
+            "available_scopes": available_scopes,
             "current_token_scopes": current_user.get("scopes", [])
         }
     
-    def get_user_scopes_by_id(self, user_id: int) -> list:
+    async def get_user_scopes_by_id(self, user_id: int) -> list:
         """Get user scopes by user ID"""
         # Use the database's built-in method which handles different SQL dialects
-        return self.db.get_user_available_scopes(user_id)
+        return await self.db.get_user_available_scopes(user_id)
     
-    def get_user_by_id(self, user_id: int) -> Optional[dict]:
+    async def get_user_by_id(self, user_id: int) -> Optional[dict]:
         """Get user by ID"""
-        return self.db.get_user_by_id(user_id)
+        return await self.db.get_user_by_id(user_id)
     
-    def grant_scope_to_user(self, user_id: int, scope: str, granted_by: str) -> bool:
+    async def grant_scope_to_user(self, user_id: int, scope: str, granted_by: str) -> bool:
         """Grant a scope to a user (admin only)"""
         available_scopes = list(self.db.get_available_scopes().keys())
         if scope not in available_scopes:
             return False
-        return self.db.grant_scope_to_user(user_id, scope, granted_by)
+        granted = await self.db.grant_scope_to_user(user_id, scope, granted_by)
+        self.invalidate_user(user_id=user_id)
+        return granted
     
-    def revoke_scope_from_user(self, user_id: int, scope: str) -> bool:
+    async def revoke_scope_from_user(self, user_id: int, scope: str) -> bool:
         """Revoke a scope from a user (admin only)"""
-        return self.db.revoke_scope_from_user(user_id, scope)
+        revoked = await self.db.revoke_scope_from_user(user_id, scope)
+        self.invalidate_user(user_id=user_id)
+        return revoked
     
-    def list_all_users_with_scopes(self) -> list:
+    async def set_user_active(self, user_id: int, is_active: bool) -> bool:
+        """Activate or deactivate a user (admin only); a deactivated user's tokens stop working"""
+        updated = await self.db.set_user_active(user_id, is_active)
+        self.invalidate_user(user_id=user_id)
+        return updated
+    
+    async def list_all_users_with_scopes(self) -> list:
         """List all users with their scopes (admin only)"""
-        return self.db.list_all_users_with_scopes()
+        return await self.db.list_all_users_with_scopes()
+    
+    async def create_api_key(self, user_id: int, name: str, scopes: list, created_by: str) -> Optional[ApiKeyResponse]:
+        """Mint an API key for a user (admin only); returns None if the user doesn't exist"""
+        user = await self.db.get_user_by_id(user_id)
+        if not user:
+            return None
+        
+        available_scopes = await self.get_user_scopes_by_id(user_id)
+        valid_scopes = [scope for scope in scopes if scope in available_scopes]
+        api_key = API_KEY_PREFIX + secrets.token_urlsafe(32)
+        prefix = api_key[:len(API_KEY_PREFIX) + 6]
+        key_id = await self.db.create_api_key(user_id, _digest(api_key), prefix, name, valid_scopes, created_by)
+        if key_id is None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Failed to create API key"
+            )
+        return ApiKeyResponse(id=key_id, user_id=user_id, name=name, prefix=prefix, scopes=valid_scopes, api_key=api_key)
+    
+    async def revoke_api_key(self, key_id: int) -> bool:
+        """Revoke an API key (admin only)"""
+        revoked = await self.db.revoke_api_key(key_id)
+        self.api_key_cache.invalidate_where(lambda _, record: record["id"] == key_id)
+        return revoked
+    
+    def get_runtime_stats(self) -> dict:
+        """Get cache, password hashing and connection pool statistics (admin only)"""
+        return {
+            "user_cache": self.user_cache.stats(),
+            "token_cache": self.token_cache.stats(),
+            "api_key_cache": self.api_key_cache.stats(),
+            "auth_epoch_cache": self.auth_epoch_cache.stats(),
+            "token_denylist": self.denylist.stats(),
+            "password_hasher": self.password_hasher.stats(),
+            "database_pool": self.db.pool_stats(),
+            "database_executors": getattr(self.db, "executor_stats", dict)(),
+        }
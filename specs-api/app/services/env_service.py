@@ -1,23 +1,61 @@
 from fastapi import HTTPException, status
+import os
 from typing import List, Optional
-from ..core.database_factory import get_database
+from ..core.cache import TTLCache
+from ..core.notifications import listens_for_invalidations
 
 class EnvironmentService:
-    def __init__(self):
-        self.db = get_database()
+    def __init__(self, db, env_cache: Optional[TTLCache] = None):
+        self.db = db
+        # Each user's variables keyed by user id. Only kept where writes on other workers arrive as
+        # invalidation events; elsewhere a worker would serve another worker's stale values until the TTL
+        self.env_cache = env_cache
+        if env_cache is None and listens_for_invalidations(db):
+            self.env_cache = TTLCache(
+                maxsize=int(os.getenv("ENV_VAR_CACHE_SIZE", "10000")),
+                ttl=float(os.getenv("ENV_VAR_CACHE_TTL", "30")),
+            )
+    
+    async def _get_env_vars(self, user_id: int) -> list:
+        if self.env_cache is None:
+            return await self.db.get_user_env_vars(user_id)
+        env_vars = self.env_cache.get(user_id)
+        if env_vars is None:
+            env_vars = await self.db.get_user_env_vars(user_id)
+            self.env_cache.set(user_id, env_vars)
+        # Copies, so callers can't modify the cached entry
+        return [dict(env_var) for env_var in env_vars]
+    
+    def _invalidate(self, user_id: int):
+        if self.env_cache is not None:
+            self.env_cache.invalidate(user_id)
+    
+    def handle_invalidation(self, event: dict):
+        """Apply a cache invalidation event published by any worker"""
+        if self.env_cache is None:
+            return
+        if event.get("kind") == "env":
+            self.env_cache.invalidate(event["user_id"])
+        elif event.get("kind") == "resync":
+            self.env_cache.clear()
+    
+    def cache_stats(self) -> dict:
+        """Get the stats of the environment variable cache"""
+        return {"env": self.env_cache.stats()} if self.env_cache is not None else {}
     
-    def get_user_env_vars(self, current_user: dict) -> dict:
+    async def get_user_env_vars(self, current_user: dict) -> dict:
         """Get all environment variables for the current user"""
-        env_vars = self.db.get_user_env_vars(current_user["id"])
+        env_vars = await self._get_env_vars(current_user["id"])
         return {
             "variables": env_vars,
             "total_count": len(env_vars),
             "username": current_user["username"]
         }
     
-    def get_user_env_var(self, name: str, current_user: dict) -> dict:
+    async def get_user_env_var(self, name: str, current_user: dict) -> dict:
         """Get a specific environment variable for the current user"""
-        env_var = self.db.get_user_env_var(current_user["id"], name)
+        env_vars = await self._get_env_vars(current_user["id"])
+        env_var = next((env_var for env_var in env_vars if env_var["name"] == name), None)
         if not env_var:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -25,9 +63,10 @@ class EnvironmentService:
             )
         return env_var
     
-    def set_user_env_var(self, name: str, value: str, current_user: dict) -> dict:
+    async def set_user_env_var(self, name: str, value: str, current_user: dict) -> dict:
         """Set/update an environment variable for the current user"""
-        if self.db.set_user_env_var(current_user["id"], name, value):
+        if await self.db.set_user_env_var(current_user["id"], name, value):
+            self._invalidate(current_user["id"])
             return {
                 "message": f"Environment variable '{name}' set successfully",
                 "name": name,
@@ -40,9 +79,10 @@ class EnvironmentService:
                 detail="Failed to set environment variable"
             )
     
-    def delete_user_env_var(self, name: str, current_user: dict) -> dict:
+    async def delete_user_env_var(self, name: str, current_user: dict) -> dict:
         """Delete an environment variable for the current user"""
-        if self.db.delete_user_env_var(current_user["id"], name):
+        if await self.db.delete_user_env_var(current_user["id"], name):
+            self._invalidate(current_user["id"])
             return {
                 "message": f"Environment variable '{name}' deleted successfully",
                 "name": name,
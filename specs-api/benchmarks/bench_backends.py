@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Throughput benchmark for the database backends.
+
+Start the API once per backend and point this script at it, e.g.
+
+    DATABASE_TYPE=postgresql uv run uvicorn main:app --port 8000
+    uv run python benchmarks/bench_backends.py --label postgresql
+
+    DATABASE_TYPE=asyncpg uv run uvicorn main:app --port 8000
+    uv run python benchmarks/bench_backends.py --label asyncpg
+
+Each run logs in once as admin and then issues authenticated GET requests
+with a fixed number of concurrent clients, reporting requests per second and
+latency percentiles per endpoint.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+import httpx
+
+ENDPOINTS = [
+    "/api/v1/profile",
+    "/api/v1/environment-variables/",
+    "/api/v1/users/scopes",
+]
+
+
+def percentile(samples: list, pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def login(client: httpx.AsyncClient, username: str, password: str) -> str:
+    response = await client.post("/api/v1/login", json={
+        "username": username,
+        "password": password,
+        "scopes": ["admin", "read_profile", "read_users"],
+    })
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+
+async def run_endpoint(client: httpx.AsyncClient, path: str, headers: dict, requests: int, concurrency: int) -> dict:
+    latencies = []
+    errors = 0
+    remaining = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for _ in remaining:
+            start = time.perf_counter()
+            response = await client.get(path, headers=headers)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code != 200:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    return {
+        "path": path,
+        "rps": requests / elapsed,
+        "p50": percentile(latencies, 50) * 1000,
+        "p95": percentile(latencies, 95) * 1000,
+        "p99": percentile(latencies, 99) * 1000,
+        "mean": statistics.mean(latencies) * 1000,
+        "errors": errors,
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--label", default="server", help="Name to print for this run, e.g. the backend")
+    parser.add_argument("--requests", type=int, default=2000, help="Requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--username", default="admin")
+    parser.add_argument("--password", default="admin123")
+    args = parser.parse_args()
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=60) as client:
+        token = await login(client, args.username, args.password)
+        headers = {"Authorization": f"Bearer {token}"}
+
+        # Warm up connection pools and caches
+        for path in ENDPOINTS:
+            await run_endpoint(client, path, headers, min(100, args.requests), min(10, args.concurrency))
+
+        print(f"== {args.label}: {args.requests} requests/endpoint, concurrency {args.concurrency}")
+        print(f"{'endpoint':36} {'req/s':>9} {'mean ms':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7}")
+        for path in ENDPOINTS:
+            result = await run_endpoint(client, path, headers, args.requests, args.concurrency)
+            print(
+                f"{result['path']:36} {result['rps']:9.1f} {result['mean']:9.2f} {result['p50']:9.2f} "
+                f"{result['p95']:9.2f} {result['p99']:9.2f} {result['errors']:7d}"
+            )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Cost of encoding large listings: FastAPI's generic path versus the fast
+response class and typed response models.
+
+Serves the payloads of GET /environment-variables/ and GET /users/scopes
+from an in-process app, so no server or database is needed:
+
+    uv run python benchmarks/bench_json_responses.py --rows 5000
+    uv sync --extra fast-json   # then run again to include orjson
+
+Paths compared, per listing:
+
+    generic        dict -> jsonable_encoder -> json.dumps (the old routes)
+    fast class     dict -> jsonable_encoder -> FastJSONResponse
+    typed          response model, Pydantic validates and writes the bytes (the routes now)
+    typed + fast   response model -> FastJSONResponse (with FAST_JSON_RESPONSES=true)
+"""
+import argparse
+import os
+import sys
+import time
+from typing import List
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from fastapi import FastAPI  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+from app.core import responses  # noqa: E402
+from app.core.responses import FastJSONResponse  # noqa: E402
+from app.models.auth import UserScopesSummary  # noqa: E402
+from app.models.environment import EnvVarListResponse  # noqa: E402
+
+
+def env_vars_payload(rows: int) -> dict:
+    variables = [
+        {
+            "name": f"SERVICE_{i:05d}_URL",
+            "value": f"https://service-{i}.internal.example.com:8443/api/v1",
+            "created_at": "2025-01-01 12:00:00",
+            "updated_at": "2025-01-02 08:30:00",
+        }
+        for i in range(rows)
+    ]
+    return {"variables": variables, "total_count": rows, "username": "admin"}
+
+
+def users_payload(rows: int) -> list:
+    return [
+        {
+            "id": i,
+            "username": f"user{i}",
+            "email": f"user{i}@example.com",
+            "role": "user",
+            "is_active": True,
+            "available_scopes": ["read_profile", "read_users", "manage_env"],
+        }
+        for i in range(rows)
+    ]
+
+
+def fresh_copy(payload):
+    """New dicts per request, as the services return"""
+    if isinstance(payload, list):
+        return [dict(row) for row in payload]
+    return {**payload, "variables": [dict(row) for row in payload["variables"]]}
+
+
+def build_app(payload, model) -> FastAPI:
+    app = FastAPI()
+
+    def copy():
+        return fresh_copy(payload)
+
+    @app.get("/generic")
+    async def generic():
+        return copy()
+
+    @app.get("/fast-class", response_class=FastJSONResponse)
+    async def fast_class():
+        return copy()
+
+    @app.get("/typed", response_model=model)
+    async def typed():
+        return copy()
+
+    @app.get("/typed-fast", response_model=model, response_class=FastJSONResponse)
+    async def typed_fast():
+        return copy()
+
+    return app
+
+
+def measure(client: TestClient, path: str, requests: int) -> float:
+    """Return CPU milliseconds per request (best of three runs)"""
+    client.get(path)
+    runs = []
+    for _ in range(3):
+        start = time.process_time()
+        for _ in range(requests):
+            response = client.get(path)
+        runs.append((time.process_time() - start) / requests)
+        assert response.status_code == 200
+    return min(runs) * 1e3
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=5000, help="variables / users per listing")
+    parser.add_argument("--requests", type=int, default=20, help="requests per path and run")
+    args = parser.parse_args()
+
+    listings = [
+        ("GET /environment-variables/", env_vars_payload(args.rows), EnvVarListResponse),
+        ("GET /users/scopes", users_payload(args.rows), List[UserScopesSummary]),
+    ]
+    print(f"{args.rows} rows per listing, FastJSONResponse uses {'orjson' if responses.orjson else 'stdlib json'}")
+    for label, payload, model in listings:
+        client = TestClient(build_app(payload, model))
+        generic = measure(client, "/generic", args.requests)
+        print(f"  {label}")
+        print(f"    generic      : {generic:8.2f} ms CPU/request")
+        for name, path in (("fast class", "/fast-class"), ("typed", "/typed"), ("typed + fast", "/typed-fast")):
+            cost = measure(client, path, args.requests)
+            print(f"    {name:<13}: {cost:8.2f} ms CPU/request ({generic / cost:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+CPU cost of access-token verification with and without the token cache,
+in-process and in shared memory (SHARED_CACHE).
+
+Models service-to-service traffic: a handful of long-lived tokens, each
+presented many times. Runs in-process against a throwaway SQLite database,
+so no server is needed:
+
+    uv run python benchmarks/bench_token_cache.py --tokens 4 --requests 200000
+
+For end-to-end throughput, run bench_backends.py against a server started
+with TOKEN_CACHE_SIZE=0 and again with the default settings.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.core.cache import TTLCache  # noqa: E402
+from app.core.database import Database  # noqa: E402
+from app.core.shared_cache import SharedMemoryCache  # noqa: E402
+from app.services.auth_service import AuthService  # noqa: E402
+
+
+def measure(service: AuthService, tokens: list, requests: int) -> float:
+    """Return CPU seconds per verification"""
+    start = time.process_time()
+    for i in range(requests):
+        if service.verify_token(tokens[i % len(tokens)]) is None:
+            raise RuntimeError("token failed to verify")
+    return (time.process_time() - start) / requests
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tokens", type=int, default=4, help="distinct long-lived tokens")
+    parser.add_argument("--requests", type=int, default=100000, help="verifications per run")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, "bench.db"))
+        tokens = [
+            db.create_access_token(
+                {"sub": f"service-{i}", "scopes": ["read_profile"]},
+                expires_delta=timedelta(minutes=30),
+            )
+            for i in range(args.tokens)
+        ]
+
+        uncached = AuthService(db, token_cache=TTLCache(maxsize=0))
+        cached = AuthService(db)
+        shared = AuthService(db, token_cache=SharedMemoryCache("bench", path=os.path.join(tmp, "tokens.cache")))
+
+        cold = measure(uncached, tokens, args.requests)
+        warm = measure(cached, tokens, args.requests)
+        warm_shared = measure(shared, tokens, args.requests)
+        shared.close()
+        db.close()
+
+    print(f"{args.requests} verifications over {args.tokens} token(s)")
+    print(f"  jwt.decode every request : {cold * 1e6:8.2f} µs CPU/request")
+    print(f"  token cache              : {warm * 1e6:8.2f} µs CPU/request")
+    print(f"  shared memory token cache: {warm_shared * 1e6:8.2f} µs CPU/request")
+    print(f"  saved                    : {(cold - warm) * 1e6:8.2f} µs CPU/request ({cold / warm:.1f}x)")
+    print(f"  at 10k req/s that is {(cold - warm) * 10000:.2f} CPU-seconds per second")
+    print(f"  cache stats: {cached.token_cache.stats()}")
+
+
+if __name__ == "__main__":
+    main()
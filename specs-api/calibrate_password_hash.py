@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Measure bcrypt hash latency per cost factor on this machine
+Use it to choose PASSWORD_HASH_ROUNDS for an environment: the highest cost
+whose latency fits the login budget. Stored hashes are upgraded to the
+configured cost on each user's next successful login.
+"""
+import argparse
+import statistics
+import time
+from app.core.passwords import PASSWORD_HASH_ROUNDS, make_context
+
+def measure(rounds: int, samples: int) -> float:
+    """Median seconds to hash one password at the given cost"""
+    context = make_context(rounds)
+    timings = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        context.hash("calibration-password")
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+def main():
+    parser = argparse.ArgumentParser(description="Report bcrypt hash latency per cost factor")
+    parser.add_argument("--min-rounds", type=int, default=8)
+    parser.add_argument("--max-rounds", type=int, default=14)
+    parser.add_argument("--samples", type=int, default=3, help="hashes timed per cost factor")
+    parser.add_argument("--target-ms", type=float, default=250.0, help="latency budget for one hash")
+    args = parser.parse_args()
+
+    print(f"🔐 bcrypt cost calibration (currently PASSWORD_HASH_ROUNDS={PASSWORD_HASH_ROUNDS})")
+    print(f"{'rounds':>8} {'ms/hash':>10} {'hashes/s/core':>15}")
+
+    recommended = None
+    for rounds in range(args.min_rounds, args.max_rounds + 1):
+        seconds = measure(rounds, args.samples)
+        print(f"{rounds:>8} {seconds * 1000:>10.1f} {1 / seconds:>15.1f}")
+        if seconds * 1000 <= args.target_ms:
+            recommended = rounds
+        elif seconds * 1000 > args.target_ms * 4:
+            # Each further step doubles the cost; no point measuring it
+            break
+
+    if recommended is None:
+        print(f"\n⚠️  Even {args.min_rounds} rounds exceeds {args.target_ms:.0f} ms on this machine")
+    else:
+        print(f"\n✅ Recommended for a {args.target_ms:.0f} ms budget: PASSWORD_HASH_ROUNDS={recommended}")
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,7 @@
 """
 Script to clear all tables in the PostgreSQL database
 This is useful for resetting the database during development and testing.
+The upgrade command applies pending schema migrations to any configured backend.
 """
 import os
 import sys
@@ -12,7 +13,7 @@ def clear_postgres_tables():
     """Clear all tables in the PostgreSQL database"""
     try:
         # Get PostgreSQL database instance
-        db = get_database()
+        db = get_database(auto_migrate=False)
         
         if not isinstance(db, PostgreSQLDatabase):
             print("❌ This script only works with PostgreSQL database")
@@ -90,13 +91,13 @@ def clear_and_reinitialize():
     
     try:
         # Get database instance and reinitialize
-        db = get_database()
+        db = get_database(auto_migrate=False)
         
         print("🏗️  Reinitializing database with default data...")
         
-        # The database initialization should happen automatically
-        # when we create a new database instance, but let's make sure
-        # by creating a test connection
+        # Clearing also emptied schema_version, so every migration
+        # (including the admin seed) is applied again
+        db.migrate()
         conn = db.get_connection()
         cursor = conn.cursor()
         
@@ -132,7 +133,7 @@ def clear_and_reinitialize():
 def show_table_stats():
     """Show statistics about current table contents"""
     try:
-        db = get_database()
+        db = get_database(auto_migrate=False)
         
         if not isinstance(db, PostgreSQLDatabase):
             print("❌ This script only works with PostgreSQL database")
@@ -165,6 +166,32 @@ def show_table_stats():
         print(f"❌ Error getting table statistics: {e}")
         return False
 
+def upgrade_database(target=None):
+    """Apply pending schema migrations, optionally stopping at a target version"""
+    try:
+        db = get_database(auto_migrate=False)
+        runner = db.migration_runner()
+        
+        print(f"🗃️  Current schema version: {runner.current_version()}")
+        pending = runner.pending(target)
+        if not pending:
+            print("✅ Database schema is up to date")
+            return True
+        
+        print("📋 Pending migrations:")
+        for migration in pending:
+            print(f"   - {migration.version}: {migration.description}")
+        
+        applied = runner.upgrade(target)
+        print(f"🎉 Applied {len(applied)} migration(s): {', '.join(map(str, applied)) or 'none'}")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Error upgrading database: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
 def main():
     """Main function with command line options"""
     if len(sys.argv) > 1:
@@ -176,6 +203,9 @@ def main():
             clear_and_reinitialize()
         elif command == "stats":
             show_table_stats()
+        elif command == "upgrade":
+            target = int(sys.argv[2]) if len(sys.argv) > 2 else None
+            upgrade_database(target)
         elif command == "help":
             print_help()
         else:
@@ -193,11 +223,13 @@ def print_help():
     print("  clear  - Clear all data from tables (keeps structure)")
     print("  reset  - Clear all data and reinitialize with defaults")
     print("  stats  - Show current table statistics")
+    print("  upgrade [version] - Apply pending schema migrations (any backend)")
     print("  help   - Show this help message")
     print("\nExamples:")
     print("  python clear_database.py stats")
     print("  python clear_database.py clear")
     print("  python clear_database.py reset")
+    print("  python clear_database.py upgrade")
     print("\n⚠️  Warning: 'clear' and 'reset' commands will permanently delete all data!")
 
 if __name__ == "__main__":
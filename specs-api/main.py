@@ -1,15 +1,54 @@
+import os
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from app.api.api import api_router
-import uvicorn
+from app.api import metrics, well_known
+from app.core.registry import database_registry
+from app.core.server import run
+from app.core.responses import default_response_class
+from app.core.metrics import MetricsMiddleware, register_runtime_collector
+from app.core.server_timing import ServerTimingMiddleware
+from app.core.loop_monitor import loop_monitor
+from app.core.offload import CancelOnDisconnectMiddleware
+from app.core.profiling import ProfilingMiddleware
+from app.api.deps import get_auth_service
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Create the shared database once per process and drain its pools on shutdown
+    await database_registry.startup()
+    # Measure loop lag and catch blocking calls from a watchdog thread (LOOP_MONITOR)
+    loop_monitor.start()
+    yield
+    loop_monitor.stop()
+    await database_registry.shutdown()
+
 
 app = FastAPI(
     title="ECS Auth API",
     description="Simple Authentication API with SQLite - Clean Architecture",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+    # FAST_JSON_RESPONSES=true renders untyped responses with orjson (fast-json extra)
+    default_response_class=default_response_class()
 )
 
+# Latency, status and in-flight requests per route; pool and cache stats are read at scrape time
+app.add_middleware(MetricsMiddleware)
+register_runtime_collector(database_registry)
+# Per-phase Server-Timing header (db, bcrypt, jwt, encode) on a sample of responses; see SERVER_TIMING
+app.add_middleware(ServerTimingMiddleware)
+# Drop queued database calls of requests whose client has gone away
+app.add_middleware(CancelOnDisconnectMiddleware)
+# Admins can profile a single request by sending X-Profile; see /api/v1/admin/profiles
+if os.getenv("REQUEST_PROFILING", "true").lower() in ("1", "true", "yes"):
+    app.add_middleware(ProfilingMiddleware, auth_service_dependency=get_auth_service)
+
 # Include API routes
 app.include_router(api_router, prefix="/api/v1")
+app.include_router(well_known.router, prefix="/.well-known", tags=["well-known"])
+app.include_router(metrics.router, tags=["metrics"])
 
 # Add a root endpoint for health check
 @app.get("/")
@@ -23,7 +62,8 @@ async def root():
 
 def main():
     print("Starting ECS Auth API server...")
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    # Worker count, event loop, keep-alive, etc. come from SERVER_* environment variables
+    raise SystemExit(run())
 
 if __name__ == "__main__":
     main()
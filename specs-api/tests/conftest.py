@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Shared pytest fixtures: a fresh SQLite database, an AuthService over it and the app wired to that service
+"""
+import asyncio
+import pytest
+from fastapi.testclient import TestClient
+from app.core.async_database import AsyncDatabaseAdapter
+from app.core.database import Database
+from app.core.passwords import PasswordHasher
+from app.models.auth import UserLogin
+from app.services.auth_service import AuthService
+
+
+@pytest.fixture
+def db(tmp_path):
+    """A fresh SQLite database with the default admin user"""
+    db = Database(str(tmp_path / "auth.db"))
+    yield db
+    db.close()
+
+
+@pytest.fixture
+def async_db(db):
+    """The database behind the awaitable interface services use; override to wrap it differently"""
+    return AsyncDatabaseAdapter(db)
+
+
+@pytest.fixture
+def password_hasher():
+    """A single-threaded password hasher, so tests don't start a process pool"""
+    hasher = PasswordHasher(max_workers=1, executor="thread")
+    yield hasher
+    hasher.shutdown()
+
+
+@pytest.fixture
+def auth_service(async_db, password_hasher):
+    """An AuthService over ``async_db``"""
+    service = AuthService(async_db, password_hasher=password_hasher)
+    yield service
+    service.close()
+
+
+@pytest.fixture
+def login(auth_service):
+    """Log in as the default admin with the given scopes; returns the token pair"""
+    def login(scopes, username="admin", password="admin123"):
+        return asyncio.run(auth_service.login_user(UserLogin(username=username, password=password, scopes=scopes)))
+    return login
+
+
+@pytest.fixture
+def admin_token(login):
+    """Token pair for the default admin with the admin and read_profile scopes"""
+    return login(["admin", "read_profile"])
+
+
+@pytest.fixture
+def admin_headers(admin_token):
+    """Authorization header carrying ``admin_token``"""
+    return {"Authorization": f"Bearer {admin_token.access_token}"}
+
+
+@pytest.fixture
+def client(auth_service):
+    """TestClient for the app, with its routes using ``auth_service``"""
+    from app.api.deps import get_auth_service
+    from main import app
+    app.dependency_overrides[get_auth_service] = lambda: auth_service
+    yield TestClient(app)
+    app.dependency_overrides.pop(get_auth_service, None)
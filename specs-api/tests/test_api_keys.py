@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Pytest tests for API key authentication
+"""
+import asyncio
+import pytest
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+
+
+class TestApiKeys:
+    """Test class for minting, using and revoking API keys on SQLite"""
+
+    @pytest.fixture(autouse=True)
+    def setup(self, db, auth_service, client, admin_headers):
+        """Serve the app over a fresh database with an admin token"""
+        self.db, self.service, self.client = db, auth_service, client
+        self.admin = db.get_user("admin")
+        self.admin_headers = admin_headers
+
+    def run(self, coroutine):
+        return asyncio.run(coroutine)
+
+    def authenticate(self, api_key):
+        credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=api_key)
+        return self.run(self.service.get_current_user_from_token(credentials))
+
+    def mint(self, scopes):
+        response = self.client.post(
+            f"/api/v1/users/{self.admin['id']}/api-keys",
+            json={"name": "deploy-bot", "scopes": scopes},
+            headers=self.admin_headers,
+        )
+        assert response.status_code == 200
+        return response.json()
+
+    def test_mint_and_use_key(self):
+        """Test that a minted key authenticates requests with its own scopes"""
+        key = self.mint(["read_profile", "write_users"])
+        assert key["api_key"].startswith("sk_")
+        # write_users is not held by admin, so it is not granted
+        assert key["scopes"] == ["read_profile"]
+
+        response = self.client.get("/api/v1/profile", headers={"Authorization": f"Bearer {key['api_key']}"})
+        assert response.status_code == 200
+        assert response.json()["username"] == "admin"
+
+        response = self.client.get("/api/v1/admin", headers={"Authorization": f"Bearer {key['api_key']}"})
+        assert response.status_code == 403
+
+    def test_key_stored_as_digest_and_cached(self):
+        """Test that only the digest is stored and repeated use hits the cache"""
+        key = self.mint(["read_profile"])
+        with self.db.read_connection() as conn:
+            stored = conn.execute("SELECT key_hash, prefix FROM api_keys").fetchone()
+        assert key["api_key"] not in stored
+        assert key["api_key"].startswith(stored[1])
+
+        for _ in range(3):
+            self.authenticate(key["api_key"])
+        assert self.service.api_key_cache.stats()["hits"] == 2
+
+    def test_revoked_key_rejected(self):
+        """Test that revoking a key takes effect immediately on this worker"""
+        key = self.mint(["read_profile"])
+        self.authenticate(key["api_key"])
+
+        response = self.client.delete(f"/api/v1/api-keys/{key['id']}", headers=self.admin_headers)
+        assert response.status_code == 200
+        with pytest.raises(HTTPException):
+            self.authenticate(key["api_key"])
+
+        response = self.client.delete(f"/api/v1/api-keys/{key['id']}", headers=self.admin_headers)
+        assert response.status_code == 404
+
+    def test_unknown_key_rejected(self):
+        """Test that a well-formed but unknown key is refused"""
+        response = self.client.get("/api/v1/profile", headers={"Authorization": "Bearer sk_unknown"})
+        assert response.status_code == 401
+
+    def test_mint_requires_admin(self):
+        """Test that a key cannot mint another key"""
+        key = self.mint(["read_profile"])
+        response = self.client.post(
+            f"/api/v1/users/{self.admin['id']}/api-keys",
+            json={"name": "escalation"},
+            headers={"Authorization": f"Bearer {key['api_key']}"},
+        )
+        assert response.status_code == 403
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Pytest tests for the async database interface
+"""
+import asyncio
+import pytest
+from app.core.async_database import AsyncDatabaseAdapter
+
+
+class FakeBackend:
+    """Synchronous backend stand-in"""
+
+    def get_user(self, username):
+        return {"username": username}
+
+    def get_available_scopes(self):
+        return {"admin": "Administrative access"}
+
+
+class TestAsyncDatabaseAdapter:
+    """Test class for AsyncDatabaseAdapter"""
+
+    def test_io_methods_become_coroutines(self):
+        """Test that backend I/O methods are awaitable through the adapter"""
+        db = AsyncDatabaseAdapter(FakeBackend())
+        user = asyncio.run(db.get_user("alice"))
+        assert user == {"username": "alice"}
+
+    def test_other_methods_pass_through(self):
+        """Test that non-I/O helpers stay synchronous"""
+        db = AsyncDatabaseAdapter(FakeBackend())
+        assert db.get_available_scopes() == {"admin": "Administrative access"}
+
+
+class TestConnectKwargs:
+    """Test class for translating connection strings for asyncpg"""
+
+    def test_libpq_keyword_string(self):
+        """Test that a key/value connection string is translated"""
+        async_db = pytest.importorskip("app.core.async_postgres_database")
+        kwargs = async_db.connect_kwargs(
+            "host=localhost port=5432 dbname=specs_auth user=specs_user password=secret sslmode=require"
+        )
+        assert kwargs == {
+            "host": "localhost",
+            "port": 5432,
+            "user": "specs_user",
+            "password": "secret",
+            "database": "specs_auth",
+            "ssl": "require",
+        }
+
+    def test_uri(self):
+        """Test that a postgresql:// URI is translated"""
+        async_db = pytest.importorskip("app.core.async_postgres_database")
+        kwargs = async_db.connect_kwargs("postgresql://specs_user:secret@db:6432/specs_auth")
+        assert kwargs == {
+            "host": "db",
+            "port": 6432,
+            "user": "specs_user",
+            "password": "secret",
+            "database": "specs_auth",
+        }
+
+
+class FakePooledConnection:
+    """asyncpg connection stand-in, as handed out by the pool"""
+
+    def __init__(self):
+        self.closed = False
+        self.termination_listeners = []
+
+    def get_server_pid(self):
+        return 4242
+
+    def add_termination_listener(self, callback):
+        self.termination_listeners.append(callback)
+
+    async def close(self, timeout=None):
+        self.closed = True
+
+
+class FakePool:
+    """asyncpg pool stand-in handing out one connection"""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.released = 0
+
+    async def acquire(self, timeout=None):
+        return self.conn
+
+    async def release(self, conn):
+        self.released += 1
+
+
+class TestPoolMaxLifetime:
+    """Test class for retiring asyncpg connections past DATABASE_POOL_MAX_LIFETIME"""
+
+    def test_old_connection_closed_instead_of_released(self):
+        """Test that a connection is reused until it reaches the maximum age, then closed"""
+        async_db = pytest.importorskip("app.core.async_postgres_database")
+        db = async_db.AsyncPostgreSQLDatabase(pool_max_lifetime=60)
+        conn = FakePooledConnection()
+        db.pool = FakePool(conn)
+
+        async def scenario():
+            await db._track_connection(conn)
+            async with db.connection():
+                pass
+            assert (db.pool.released, conn.closed) == (1, False)
+            db._connected_at[conn.get_server_pid()] -= 61
+            async with db.connection():
+                pass
+            assert (db.pool.released, conn.closed) == (1, True)
+
+        asyncio.run(scenario())
+        conn.termination_listeners[0](conn)
+        assert db._connected_at == {}
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Pytest tests for the in-process TTL cache and the cached user lookup
+"""
+import asyncio
+import time
+import pytest
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+from app.core.cache import TTLCache
+from app.services.auth_service import AuthService
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestTTLCache:
+    """Test class for TTLCache"""
+
+    def test_hit_and_miss_counters(self):
+        """Test that lookups are counted as hits and misses"""
+        cache = TTLCache(maxsize=10, ttl=60)
+        assert cache.get("a") is None
+        cache.set("a", 1)
+        assert cache.get("a") == 1
+        stats = cache.stats()
+        assert (stats["hits"], stats["misses"], stats["hit_ratio"]) == (1, 1, 0.5)
+
+    def test_entries_expire(self):
+        """Test that entries are not served after their TTL"""
+        clock = FakeClock()
+        cache = TTLCache(maxsize=10, ttl=30, clock=clock)
+        cache.set("a", 1)
+        clock.now = 29.9
+        assert cache.get("a") == 1
+        clock.now = 30.0
+        assert cache.get("a") is None
+        assert cache.stats()["expirations"] == 1
+        assert len(cache) == 0
+
+    def test_per_entry_ttl_capped(self):
+        """Test that a per-entry TTL can shorten but not extend the default"""
+        clock = FakeClock()
+        cache = TTLCache(maxsize=10, ttl=30, clock=clock)
+        cache.set("short", 1, ttl=5)
+        cache.set("long", 2, ttl=300)
+        clock.now = 10
+        assert cache.get("short") is None
+        clock.now = 31
+        assert cache.get("long") is None
+
+    def test_lru_eviction(self):
+        """Test that the least recently used entry is evicted first"""
+        cache = TTLCache(maxsize=2, ttl=60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        assert cache.get("b") is None
+        assert cache.get("a") == 1
+        assert cache.get("c") == 3
+        assert cache.stats()["evictions"] == 1
+
+    def test_invalidation(self):
+        """Test invalidating by key and by predicate"""
+        cache = TTLCache(maxsize=10, ttl=60)
+        cache.set("a", {"id": 1})
+        cache.set("b", {"id": 2})
+        assert cache.invalidate("a")
+        assert not cache.invalidate("a")
+        assert cache.invalidate_where(lambda key, value: value["id"] == 2) == 1
+        assert len(cache) == 0
+
+    def test_disabled(self):
+        """Test that a zero TTL disables caching"""
+        cache = TTLCache(maxsize=10, ttl=0)
+        cache.set("a", 1)
+        assert cache.get("a") is None
+
+
+class FakeDatabase:
+    """Async database stand-in that counts user lookups"""
+
+    def __init__(self):
+        self.lookups = 0
+        self.users = {"alice": {"id": 7, "username": "alice", "is_active": True, "available_scopes": ["read_profile"]}}
+
+    def verify_token(self, token):
+        return {"username": token, "scopes": ["read_profile"]}
+
+    async def get_user(self, username):
+        self.lookups += 1
+        user = self.users.get(username)
+        return dict(user) if user else None
+
+    def get_available_scopes(self):
+        return {"read_profile": "", "admin": ""}
+
+    async def grant_scope_to_user(self, user_id, scope, granted_by):
+        self.users["alice"]["available_scopes"].append(scope)
+        return True
+
+    async def get_revoked_tokens(self, since):
+        return []
+
+
+class TestCachedUserLookup:
+    """Test class for AuthService's user cache"""
+
+    def setup_method(self):
+        self.db = FakeDatabase()
+        self.service = AuthService(self.db, user_cache=TTLCache(maxsize=10, ttl=60))
+
+    def current_user(self, token="alice"):
+        credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+        return asyncio.run(self.service.get_current_user_from_token(credentials))
+
+    def test_repeated_tokens_hit_cache(self):
+        """Test that the database is read once for repeated requests"""
+        first = self.current_user()
+        second = self.current_user()
+        assert first == second
+        assert first is not second
+        assert self.db.lookups == 1
+        assert self.service.user_cache.stats()["hits"] == 1
+
+    def test_unknown_user_not_cached(self):
+        """Test that missing users are looked up every time"""
+        for _ in range(2):
+            with pytest.raises(HTTPException):
+                self.current_user("nobody")
+        assert self.db.lookups == 2
+
+    def test_grant_invalidates(self):
+        """Test that granting a scope drops the user's cached entry"""
+        self.current_user()
+        asyncio.run(self.service.grant_scope_to_user(7, "admin", "admin"))
+        user = self.current_user()
+        assert "admin" in user["available_scopes"]
+        assert self.db.lookups == 2
+
+
+class CountingTokenDatabase:
+    """Database stand-in whose verify_token counts signature checks"""
+
+    def __init__(self, exp):
+        self.exp = exp
+        self.verifications = 0
+
+    def verify_token(self, token):
+        self.verifications += 1
+        if token == "invalid":
+            return None
+        return {"username": "alice", "scopes": ["read_profile"], "exp": self.exp}
+
+
+class TestTokenCache:
+    """Test class for AuthService's verified-token cache"""
+
+    def test_repeated_token_verified_once(self):
+        """Test that a token's signature is checked only on the first request"""
+        db = CountingTokenDatabase(exp=time.time() + 600)
+        service = AuthService(db)
+        for _ in range(3):
+            assert service.verify_token("token")["username"] == "alice"
+        assert db.verifications == 1
+
+    def test_entry_expires_at_token_exp(self):
+        """Test that the cached entry's lifetime is bounded by the token's exp"""
+        clock = FakeClock()
+        db = CountingTokenDatabase(exp=time.time() + 5)
+        service = AuthService(db, token_cache=TTLCache(maxsize=10, ttl=3600, clock=clock))
+        service.verify_token("token")
+        clock.now = 4
+        service.verify_token("token")
+        assert db.verifications == 1
+        clock.now = 6
+        service.verify_token("token")
+        assert db.verifications == 2
+
+    def test_invalid_and_expired_tokens_not_cached(self):
+        """Test that failed or already-expired verifications are not cached"""
+        db = CountingTokenDatabase(exp=time.time() - 1)
+        service = AuthService(db)
+        for token in ("invalid", "invalid", "expired", "expired"):
+            service.verify_token(token)
+        assert db.verifications == 4
+        assert len(service.token_cache) == 0
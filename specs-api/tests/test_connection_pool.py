@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Pytest tests for the database connection pool
+"""
+import threading
+import time
+import pytest
+from app.core.connection_pool import ConnectionPool, PoolClosed, PoolTimeout
+
+
+class FakeConnection:
+    """Minimal stand-in for a DB-API connection"""
+
+    def __init__(self):
+        self.closed = False
+        self.resets = 0
+
+    def close(self):
+        self.closed = True
+
+
+class TestConnectionPool:
+    """Test class for ConnectionPool"""
+
+    def make_pool(self, **kwargs):
+        self.opened = []
+
+        def connect():
+            conn = FakeConnection()
+            self.opened.append(conn)
+            return conn
+
+        return ConnectionPool(connect, **kwargs)
+
+    def test_min_size_connections_opened_up_front(self):
+        """Test that min_size connections are created eagerly"""
+        pool = self.make_pool(min_size=2, max_size=4)
+        assert len(self.opened) == 2
+        assert pool.stats()["idle"] == 2
+
+    def test_connections_are_reused(self):
+        """Test that a returned connection is handed out again"""
+        pool = self.make_pool(min_size=0, max_size=2)
+        with pool.connection() as first:
+            pass
+        with pool.connection() as second:
+            pass
+        assert first is second
+        assert len(self.opened) == 1
+        assert pool.stats()["checkouts"] == 2
+
+    def test_checkout_timeout_when_exhausted(self):
+        """Test that checkout fails after the timeout when the pool is at max_size"""
+        pool = self.make_pool(min_size=0, max_size=1, timeout=0.05)
+        conn = pool.getconn()
+        with pytest.raises(PoolTimeout):
+            pool.getconn()
+        pool.putconn(conn)
+
+        stats = pool.stats()
+        assert stats["checkout_failures"] == 1
+        assert stats["in_use"] == 0
+
+    def test_waiter_gets_returned_connection(self):
+        """Test that a blocked checkout is served when a connection is returned"""
+        pool = self.make_pool(min_size=0, max_size=1, timeout=2)
+        conn = pool.getconn()
+        result = {}
+
+        def worker():
+            result["conn"] = pool.getconn()
+
+        thread = threading.Thread(target=worker)
+        thread.start()
+        time.sleep(0.05)
+        pool.putconn(conn)
+        thread.join(timeout=2)
+
+        assert result["conn"] is conn
+        assert pool.stats()["wait_time_max"] > 0
+
+    def test_unhealthy_connection_replaced(self):
+        """Test that a connection failing the health check is discarded on checkout"""
+        pool = self.make_pool(min_size=1, max_size=1, check=lambda conn: not conn.closed)
+        self.opened[0].closed = True
+
+        with pool.connection() as conn:
+            assert conn is not self.opened[0]
+
+        stats = pool.stats()
+        assert stats["health_check_failures"] == 1
+        assert stats["connections_opened"] == 2
+
+    def test_expired_connection_recycled(self):
+        """Test that connections older than max_lifetime are replaced"""
+        pool = self.make_pool(min_size=1, max_size=1, max_lifetime=0.01)
+        time.sleep(0.02)
+
+        with pool.connection() as conn:
+            assert conn is not self.opened[0]
+        assert self.opened[0].closed
+
+    def test_reset_called_on_return(self):
+        """Test that the reset hook runs before a connection goes back to the pool"""
+
+        def reset(conn):
+            conn.resets += 1
+
+        pool = self.make_pool(min_size=0, max_size=1, reset=reset)
+        with pool.connection() as conn:
+            pass
+        assert conn.resets == 1
+
+    def test_close_refuses_checkouts(self):
+        """Test that a closed pool closes idle connections and rejects checkouts"""
+        pool = self.make_pool(min_size=2, max_size=2)
+        pool.close()
+
+        assert all(conn.closed for conn in self.opened)
+        with pytest.raises(PoolClosed):
+            pool.getconn()
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Pytest tests for the token denylist, logout and admin token revocation
+"""
+import asyncio
+import pytest
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+from app.core.async_database import AsyncDatabaseAdapter
+from app.core.denylist import BloomFilter, TokenDenylist
+from app.core.passwords import PasswordHasher
+from app.services.auth_service import AuthService
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class TestBloomFilter:
+    """Test class for BloomFilter"""
+
+    def test_no_false_negatives(self):
+        """Test that every added item is reported present"""
+        bloom = BloomFilter(capacity=1000, error_rate=0.01)
+        items = [f"jti-{i}" for i in range(1000)]
+        for item in items:
+            bloom.add(item)
+        assert all(item in bloom for item in items)
+
+    def test_false_positive_rate(self):
+        """Test that the false positive rate at capacity is near the configured one"""
+        bloom = BloomFilter(capacity=1000, error_rate=0.01)
+        for i in range(1000):
+            bloom.add(f"jti-{i}")
+        false_positives = sum(f"other-{i}" in bloom for i in range(10000))
+        assert false_positives < 300
+
+
+class TestTokenDenylist:
+    """Test class for TokenDenylist"""
+
+    def setup_method(self):
+        self.clock = FakeClock()
+        self.denylist = TokenDenylist(capacity=4, refresh_interval=5, clock=self.clock)
+
+    def test_add_and_expire(self):
+        """Test that a denied id is found until its token expires"""
+        self.denylist.add("a", 1010)
+        assert "a" in self.denylist
+        assert "b" not in self.denylist
+        self.clock.now = 1010
+        assert "a" not in self.denylist
+        assert len(self.denylist) == 0
+
+    def test_already_expired_ignored(self):
+        """Test that ids of expired tokens are never stored"""
+        self.denylist.add("a", 999)
+        assert len(self.denylist) == 0
+
+    def test_grows_past_capacity(self):
+        """Test that the filter is rebuilt larger instead of saturating"""
+        for i in range(20):
+            self.denylist.add(f"jti-{i}", 2000)
+        assert all(f"jti-{i}" in self.denylist for i in range(20))
+        assert self.denylist.stats()["bloom_capacity"] >= 20
+
+    def test_refresh_is_incremental(self):
+        """Test that refreshes are rate limited and read from just before the newest revocation seen"""
+        assert self.denylist.claim_refresh() == 0.0
+        assert self.denylist.claim_refresh() is None
+        self.denylist.merge([("a", 2000, 995.0), ("b", 2000, 998.0)])
+        assert "b" in self.denylist
+
+        self.clock.now += 5
+        assert self.denylist.claim_refresh() == 998.0 - TokenDenylist.REFRESH_OVERLAP
+
+
+class TestLogout:
+    """Test class for logout and revocation on SQLite"""
+
+    @pytest.fixture(autouse=True)
+    def setup(self, db, auth_service, client, login):
+        """Serve the app over a fresh database and log in as admin"""
+        self.db, self.service, self.client, self._login = db, auth_service, client, login
+        self.token = self.login()
+
+    def run(self, coroutine):
+        return asyncio.run(coroutine)
+
+    def login(self):
+        return self._login(["admin", "read_profile"])
+
+    def headers(self, token):
+        return {"Authorization": f"Bearer {token.access_token}"}
+
+    def test_logout_revokes_token_and_session(self):
+        """Test that logout rejects the access token and ends the refresh token's session"""
+        assert self.client.get("/api/v1/profile", headers=self.headers(self.token)).status_code == 200
+
+        response = self.client.post(
+            "/api/v1/logout", json={"refresh_token": self.token.refresh_token}, headers=self.headers(self.token)
+        )
+        assert response.status_code == 200
+        assert self.client.get("/api/v1/profile", headers=self.headers(self.token)).status_code == 401
+        assert self.client.post("/api/v1/refresh", json={"refresh_token": self.token.refresh_token}).status_code == 401
+
+        # Other sessions are unaffected
+        other = self.login()
+        assert self.client.get("/api/v1/profile", headers=self.headers(other)).status_code == 200
+
+    def test_admin_revoke(self):
+        """Test that an admin can revoke a token they were handed"""
+        victim = self.login()
+        response = self.client.post(
+            "/api/v1/tokens/revoke", json={"token": victim.access_token}, headers=self.headers(self.token)
+        )
+        assert response.status_code == 200
+        assert self.client.get("/api/v1/profile", headers=self.headers(victim)).status_code == 401
+
+        response = self.client.post(
+            "/api/v1/tokens/revoke", json={"token": "garbage"}, headers=self.headers(self.token)
+        )
+        assert response.status_code == 400
+
+    def test_revocation_reaches_other_workers(self):
+        """Test that a second service over the same database picks up the revocation on refresh"""
+        other_worker = AuthService(
+            AsyncDatabaseAdapter(self.db),
+            password_hasher=PasswordHasher(max_workers=1, executor="thread"),
+        )
+        credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=self.token.access_token)
+        self.run(other_worker.get_current_user_from_token(credentials))
+
+        self.run(self.service.logout(credentials))
+        # Refresh is not yet due on the other worker
+        self.run(other_worker.get_current_user_from_token(credentials))
+        other_worker.denylist.last_refresh = float("-inf")
+        with pytest.raises(HTTPException):
+            self.run(other_worker.get_current_user_from_token(credentials))
+        other_worker.close()
+
+    def test_expired_rows_purged(self):
+        """Test that revoking purges denylist rows whose tokens have expired"""
+        with self.db.write_connection() as conn:
+            conn.execute("INSERT INTO revoked_tokens VALUES ('old', 1, 1, 1.0)")
+            conn.commit()
+        credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=self.token.access_token)
+        self.run(self.service.logout(credentials))
+        with self.db.read_connection() as conn:
+            jtis = [row[0] for row in conn.execute("SELECT jti FROM revoked_tokens")]
+        assert jtis == [self.db.verify_token(self.token.access_token)["jti"]]
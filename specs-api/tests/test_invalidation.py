@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""
+Pytest tests for cross-worker cache invalidation over PostgreSQL LISTEN/NOTIFY
+"""
+import asyncio
+import os
+import socket
+import uuid
+import pytest
+import psycopg2
+from app.core.async_database import AsyncDatabaseAdapter
+from app.core.cache import TTLCache
+from app.core.database import Database
+from app.core.notifications import InvalidationListener, PsycopgInvalidationListener, event_payload
+from app.core.postgres_database import PostgreSQLDatabase
+from app.core.registry import DatabaseRegistry
+from app.services.auth_service import AuthService
+from app.services.env_service import EnvironmentService
+
+# A scratch database for the integration test, which creates and deletes users; never defaulted
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+
+
+class FlakyListener(InvalidationListener):
+    """Listener whose first connection delivers one event and then drops"""
+
+    def __init__(self, handler):
+        super().__init__(handler, reconnect_delay=0)
+        self.connections = 0
+
+    async def _listen(self):
+        self.connections += 1
+        self._on_listening()
+        if self.connections == 1:
+            self.dispatch(event_payload("user", user_id=1))
+            raise ConnectionError("dropped")
+        await asyncio.Event().wait()
+
+
+class FakeConnection:
+    """psycopg2-like connection whose statements all report ``rowcount`` affected rows"""
+
+    def __init__(self, rowcount):
+        self.rowcount = rowcount
+        self.statements = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def cursor(self):
+        return self
+
+    def execute(self, sql, params=None):
+        self.statements.append(sql)
+
+    def commit(self):
+        pass
+
+
+class DroppedConnection:
+    """psycopg2-like LISTEN connection that the server closes on first poll"""
+
+    def __init__(self, sock):
+        self.sock = sock
+        self.closed = 0
+        self.notifies = []
+
+    def set_isolation_level(self, level):
+        pass
+
+    def cursor(self):
+        return self
+
+    def execute(self, sql):
+        pass
+
+    def fileno(self):
+        if self.closed:
+            raise psycopg2.InterfaceError("connection already closed")
+        return self.sock.fileno()
+
+    def poll(self):
+        self.closed = 2
+        raise psycopg2.OperationalError("server closed the connection unexpectedly")
+
+    def close(self):
+        self.closed = 1
+
+
+class TestInvalidationHandling:
+    """Test class for applying invalidation events without a database server"""
+
+    def test_auth_service_events(self):
+        """Test that each event kind evicts the matching cached entries"""
+        service = AuthService(db=None)
+        service.user_cache.set("alice", {"id": 1, "username": "alice"})
+        service.user_cache.set("bob", {"id": 2, "username": "bob"})
+        service.auth_epoch_cache.set(1, 0)
+        service.api_key_cache.set(b"digest", {"id": 9, "username": "alice"})
+
+        service.handle_invalidation({"kind": "user", "user_id": 1})
+        assert service.user_cache.get("alice") is None
+        assert service.user_cache.get("bob") is not None
+        assert service.auth_epoch_cache.get(1) is None
+
+        service.handle_invalidation({"kind": "api_key", "key_id": 9})
+        assert service.api_key_cache.get(b"digest") is None
+
+        service.handle_invalidation({"kind": "token", "jti": "abc", "exp": 2**40})
+        assert "abc" in service.denylist
+
+        service.handle_invalidation({"kind": "resync"})
+        assert len(service.user_cache) == 0
+
+    def test_env_service_events(self):
+        """Test that env events evict only the affected user's variables"""
+        service = EnvironmentService(db=None, env_cache=TTLCache(maxsize=10, ttl=30))
+        service.env_cache.set(1, [])
+        service.env_cache.set(2, [])
+        service.handle_invalidation({"kind": "env", "user_id": 1, "name": "X"})
+        assert service.env_cache.get(1) is None
+        assert service.env_cache.get(2) == []
+
+    def test_env_cache_needs_invalidation_events(self, tmp_path, monkeypatch):
+        """Test that env vars are only cached on backends that deliver invalidation events"""
+        db = Database(str(tmp_path / "auth.db"))
+        assert EnvironmentService(AsyncDatabaseAdapter(db)).env_cache is None
+        assert EnvironmentService(PostgreSQLDatabase.__new__(PostgreSQLDatabase)).env_cache is not None
+        monkeypatch.setenv("CACHE_INVALIDATION_LISTEN", "false")
+        assert EnvironmentService(PostgreSQLDatabase.__new__(PostgreSQLDatabase)).env_cache is None
+        db.close()
+
+    def test_user_cache_short_lived_without_invalidation_events(self, tmp_path, monkeypatch):
+        """Test that users are only cached for USER_CACHE_TTL where other workers' deactivations arrive"""
+        monkeypatch.setenv("USER_CACHE_TTL", "30")
+        db = Database(str(tmp_path / "auth.db"))
+        assert AuthService(AsyncDatabaseAdapter(db)).user_cache.ttl == 1
+        assert AuthService(PostgreSQLDatabase.__new__(PostgreSQLDatabase)).user_cache.ttl == 30
+        monkeypatch.setenv("CACHE_INVALIDATION_LISTEN", "false")
+        monkeypatch.setenv("USER_CACHE_UNLISTENED_TTL", "0")
+        assert AuthService(PostgreSQLDatabase.__new__(PostgreSQLDatabase)).user_cache.ttl == 0
+        db.close()
+
+    def test_events_only_for_changed_rows(self):
+        """Test that writes which change nothing publish no event, and report the write's own row count"""
+        db = PostgreSQLDatabase.__new__(PostgreSQLDatabase)
+        for rowcount, expected in ((0, False), (1, True)):
+            conn = FakeConnection(rowcount)
+            db.connection = lambda: conn
+            results = [db.revoke_api_key(9), db.delete_user_env_var(1, "X"), db.set_user_active(1, False)]
+            assert results == [expected] * 3
+            assert sum("pg_notify" in sql for sql in conn.statements) == (3 if expected else 0)
+
+    def test_psycopg_listener_unregisters_dropped_socket(self, monkeypatch):
+        """Test that the socket leaves the event loop even when the server closed the connection"""
+        ours, theirs = socket.socketpair()
+        monkeypatch.setattr(psycopg2, "connect", lambda dsn: DroppedConnection(ours))
+
+        async def scenario():
+            listener = PsycopgInvalidationListener("dsn", lambda event: None)
+            theirs.send(b"x")
+            with pytest.raises(psycopg2.OperationalError):
+                await listener._listen()
+            # False: no reader was left registered for the socket
+            return asyncio.get_running_loop().remove_reader(ours.fileno())
+
+        try:
+            assert asyncio.run(scenario()) is False
+        finally:
+            ours.close()
+            theirs.close()
+
+    def test_registry_dispatches_to_services(self):
+        """Test that the registry passes events to every service that handles them"""
+        registry = DatabaseRegistry(factory=lambda: None)
+        registry._database = object()
+        env_service = EnvironmentService(db=None, env_cache=TTLCache(maxsize=10, ttl=30))
+        registry._services[EnvironmentService] = env_service
+        env_service.env_cache.set(1, [])
+        registry.dispatch_invalidation({"kind": "env", "user_id": 1})
+        assert env_service.env_cache.get(1) is None
+
+    def test_listener_resyncs_after_reconnect(self):
+        """Test that a dropped connection is re-established and followed by a resync event"""
+        events = []
+
+        async def scenario():
+            listener = FlakyListener(events.append)
+            await listener.start()
+            for _ in range(100):
+                if listener.connections == 2:
+                    break
+                await asyncio.sleep(0.01)
+            await listener.stop()
+            return listener
+
+        listener = asyncio.run(scenario())
+        assert events == [{"kind": "user", "user_id": 1}, {"kind": "resync"}]
+        assert listener.reconnects == 1
+
+
+def _postgres_available() -> bool:
+    if not TEST_DATABASE_URL:
+        return False
+    try:
+        psycopg2.connect(TEST_DATABASE_URL, connect_timeout=2).close()
+        return True
+    except psycopg2.Error:
+        return False
+
+
+@pytest.mark.skipif(not _postgres_available(), reason="TEST_DATABASE_URL not set or PostgreSQL not available")
+class TestTwoWorkers:
+    """Test class running two app instances against one PostgreSQL database"""
+
+    def make_registry(self):
+        return DatabaseRegistry(factory=lambda: AsyncDatabaseAdapter(PostgreSQLDatabase(TEST_DATABASE_URL)))
+
+    async def wait_for(self, condition, timeout=5.0):
+        for _ in range(int(timeout / 0.02)):
+            if condition():
+                return True
+            await asyncio.sleep(0.02)
+        return False
+
+    def test_writes_on_one_worker_evict_on_the_other(self):
+        """Test that scope and env var writes on worker A evict worker B's cached entries"""
+
+        async def scenario():
+            worker_a, worker_b = self.make_registry(), self.make_registry()
+            await worker_a.startup()
+            await worker_b.startup()
+            try:
+                username = f"notify_{uuid.uuid4().hex[:12]}"
+                db = worker_a.get()
+                await db.insert_user(username, f"{username}@example.com", "not-a-hash")
+                user = await db.get_user(username)
+                auth_a, auth_b = worker_a.service(AuthService), worker_b.service(AuthService)
+                env_a, env_b = worker_a.service(EnvironmentService), worker_b.service(EnvironmentService)
+
+                # Worker B caches the user and their (empty) variables
+                assert (await auth_b.get_cached_user(username))["available_scopes"] == []
+                assert (await env_b.get_user_env_vars(user))["total_count"] == 0
+
+                assert await auth_a.grant_scope_to_user(user["id"], "read_profile", "test")
+                assert await self.wait_for(lambda: auth_b.user_cache.get(username) is None)
+                assert (await auth_b.get_cached_user(username))["available_scopes"] == ["read_profile"]
+
+                await env_a.set_user_env_var("REGION", "eu", user)
+                assert await self.wait_for(lambda: env_b.env_cache.get(user["id"]) is None)
+                assert (await env_b.get_user_env_var("REGION", user))["value"] == "eu"
+
+                assert worker_b.listener.received >= 2
+            finally:
+                with worker_a.get().db.connection() as conn:
+                    conn.cursor().execute("DELETE FROM users WHERE username LIKE 'notify_%%'")
+                    conn.commit()
+                await worker_a.shutdown()
+                await worker_b.shutdown()
+
+        asyncio.run(scenario())
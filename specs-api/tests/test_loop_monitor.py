@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Pytest tests for the event loop lag monitor and blocking call detector
+"""
+import asyncio
+import time
+import traceback
+import pytest
+from app.core.loop_monitor import APP_DIR, LoopMonitor, _blocking_site
+from app.core.metrics import RuntimeCollector
+
+
+def block_the_loop(seconds: float):
+    time.sleep(seconds)
+
+
+async def run_blocking(monitor: LoopMonitor):
+    monitor.start()
+    try:
+        await asyncio.sleep(0.1)
+        block_the_loop(0.25)
+        await asyncio.sleep(0.1)
+    finally:
+        monitor.stop()
+
+
+class TestLoopMonitor:
+    """Test class for LoopMonitor"""
+
+    def test_blocking_callback_recorded_with_stack(self):
+        """Test that a stall past the threshold is recorded with the stack that caused it"""
+        monitor = LoopMonitor(interval=0.01, block_threshold=0.05)
+        asyncio.run(run_blocking(monitor))
+        report = monitor.report()
+        (site,) = report["blocking_sites"]
+        assert site["count"] == 1
+        assert 0.2 <= site["total_seconds"] < 1
+        assert any("block_the_loop" in line for line in site["stack"])
+        assert report["recent_blocks"][0]["duration_ms"] >= 200
+        assert report["lag_ms"]["max"] >= 200
+
+    def test_lag_sampled_without_stalls(self):
+        """Test that an idle loop is sampled and reports no blocking sites"""
+        monitor = LoopMonitor(interval=0.01, block_threshold=0.5)
+
+        async def idle():
+            monitor.start()
+            await asyncio.sleep(0.2)
+            monitor.stop()
+
+        asyncio.run(idle())
+        buckets, total = monitor.lag_histogram()
+        assert buckets[-1][1] >= 5
+        assert total < 0.5
+        assert monitor.report()["blocking_sites"] == []
+
+    def test_disabled_monitor_does_not_start(self):
+        """Test that LOOP_MONITOR=false leaves no watchdog thread"""
+        monitor = LoopMonitor(enabled=False)
+
+        async def start():
+            monitor.start()
+
+        asyncio.run(start())
+        assert monitor.report()["running"] is False
+
+    def test_site_is_innermost_app_frame(self):
+        """Test that a stall is attributed to the deepest application frame on the stack"""
+        stack = traceback.StackSummary.from_list([
+            (f"{APP_DIR}/services/auth_service.py", 133, "login_user", None),
+            (f"{APP_DIR}/core/database.py", 200, "get_user", None),
+            ("/usr/lib/python3/sqlite3/__init__.py", 10, "execute", None),
+        ])
+        assert _blocking_site(stack) == "app/core/database.py:get_user"
+        assert _blocking_site(traceback.StackSummary.from_list([("/usr/lib/x.py", 1, "f", None)])) == "<external>"
+
+    def test_runtime_collector_reports_loop(self, monkeypatch):
+        """Test that lag buckets and blocking sites are exported at scrape time"""
+        monitor = LoopMonitor(interval=0.01, block_threshold=0.05)
+        asyncio.run(run_blocking(monitor))
+        monkeypatch.setattr("app.core.metrics.loop_monitor", monitor)
+
+        class EmptyRegistry:
+            database = None
+
+            def services(self):
+                return []
+
+        samples = {s.name: s for family in RuntimeCollector(EmptyRegistry()).collect() for s in family.samples}
+        assert samples["event_loop_lag_seconds_count"].value >= 1
+        assert samples["event_loop_blocked_total"].labels["site"] == "<external>"
+
+
+class TestEventLoopEndpoint:
+    """Test class for GET /api/v1/admin/event-loop"""
+
+    @pytest.fixture(autouse=True)
+    def setup(self, client, login):
+        """Serve the app over a fresh database"""
+        self.client, self.login = client, login
+
+    def token(self, scopes):
+        return self.login(scopes).access_token
+
+    def test_admin_only(self):
+        """Test that the report needs the admin scope"""
+        response = self.client.get(
+            "/api/v1/admin/event-loop", headers={"Authorization": f"Bearer {self.token(['read_profile'])}"}
+        )
+        assert response.status_code == 403
+
+    def test_report(self):
+        """Test that admins get the monitor's report"""
+        response = self.client.get(
+            "/api/v1/admin/event-loop", headers={"Authorization": f"Bearer {self.token(['admin'])}"}
+        )
+        assert response.status_code == 200
+        assert {"lag_ms", "blocking_sites", "recent_blocks"} <= set(response.json())
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Pytest tests for the Prometheus metrics
+"""
+import pytest
+from prometheus_client import REGISTRY
+from app.core.async_database import AsyncDatabaseAdapter
+from app.core.cache import TTLCache
+from app.core.metrics import InstrumentedDatabase, RuntimeCollector
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+class TestRequestMetrics:
+    """Test class for the request middleware and the database method timings"""
+
+    @pytest.fixture
+    def async_db(self, db):
+        return InstrumentedDatabase(AsyncDatabaseAdapter(db), "sqlite")
+
+    @pytest.fixture(autouse=True)
+    def setup(self, db, auth_service, client, admin_headers):
+        """Serve the app over a fresh, instrumented database with an admin token"""
+        self.db, self.service, self.client, self.headers = db, auth_service, client, admin_headers
+
+    def test_requests_labelled_by_route_template(self):
+        """Test that requests are counted under their full path template, not the concrete path"""
+        route = "/api/v1/users/{user_id}/scopes"
+        before = sample("http_requests_total", method="GET", route=route, status="404")
+        for user_id in (998, 999):
+            assert self.client.get(f"/api/v1/users/{user_id}/scopes", headers=self.headers).status_code == 404
+        assert sample("http_requests_total", method="GET", route=route, status="404") - before == 2
+        assert sample("http_request_duration_seconds_count", method="GET", route=route) >= 2
+        assert sample("http_requests_in_progress", method="GET") == 0
+
+    def test_unmatched_paths_share_one_label(self):
+        """Test that unknown paths don't create a series each"""
+        before = sample("http_requests_total", method="GET", route="<unmatched>", status="404")
+        self.client.get("/no/such/path")
+        self.client.get("/another/one")
+        assert sample("http_requests_total", method="GET", route="<unmatched>", status="404") - before == 2
+
+    def test_db_methods_and_password_hashing_timed(self):
+        """Test that backend methods and bcrypt calls are observed by name"""
+        before = sample("db_query_duration_seconds_count", backend="sqlite", method="get_user")
+        hashes = sample("password_hash_duration_seconds_count", operation="verify_and_update")
+        self.client.post("/api/v1/login", json={"username": "admin", "password": "admin123"})
+        assert sample("db_query_duration_seconds_count", backend="sqlite", method="get_user") > before
+        assert sample("password_hash_duration_seconds_count", operation="verify_and_update") == hashes + 1
+
+    def test_metrics_endpoint(self):
+        """Test that /metrics serves the Prometheus text format"""
+        self.client.get("/")
+        response = self.client.get("/metrics")
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        assert 'http_requests_total{method="GET",route="/",status="200"}' in response.text
+
+
+class FakeRegistry:
+    def __init__(self, database, services):
+        self.database = database
+        self._services = services
+
+    def services(self):
+        return self._services
+
+
+class FakePool:
+    def pool_stats(self):
+        return {"size": 3, "in_use": 1, "idle": 2, "checkouts": 40}
+
+
+class CachingService:
+    def __init__(self):
+        self.cache = TTLCache(maxsize=10, ttl=60)
+
+    def cache_stats(self):
+        return {"env": self.cache.stats()}
+
+
+def test_runtime_collector_reads_pool_and_cache_stats():
+    """Test that pool usage and cache hit ratios are reported at scrape time"""
+    service = CachingService()
+    service.cache.set("a", 1)
+    service.cache.get("a")
+    service.cache.get("b")
+    samples = {
+        (s.name, tuple(sorted(s.labels.items()))): s.value
+        for family in RuntimeCollector(FakeRegistry(FakePool(), [service])).collect()
+        for s in family.samples
+    }
+    assert samples[("db_connections", (("state", "in_use"),))] == 1
+    assert samples[("db_connections", (("state", "idle"),))] == 2
+    assert samples[("db_pool_checkouts_total", ())] == 40
+    assert samples[("cache_hit_ratio", (("cache", "env"),))] == 0.5
+    assert samples[("cache_entries", (("cache", "env"),))] == 1
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Pytest tests for the schema migration runner
+"""
+import pytest
+from app.core.database import Database, pwd_context
+from app.core.migrations import MIGRATIONS, Migration, MigrationRunner
+from app.core.sqlite_connection import SQLiteConnectionManager
+
+
+class TestMigrationRunner:
+    """Test class for MigrationRunner on SQLite"""
+
+    @pytest.fixture(autouse=True)
+    def setup(self, tmp_path):
+        """Create a runner over an empty database file"""
+        self.manager = SQLiteConnectionManager(str(tmp_path / "test.db"))
+        self.runner = MigrationRunner("sqlite", self.manager.write_connection)
+        yield
+        self.manager.close()
+
+    def query(self, sql):
+        with self.manager.read_connection() as conn:
+            return conn.execute(sql).fetchall()
+
+    def test_empty_database_is_version_zero(self):
+        """Test that an empty database has every migration pending"""
+        assert self.runner.current_version() == 0
+        assert [m.version for m in self.runner.pending()] == [m.version for m in MIGRATIONS]
+
+    def test_upgrade_creates_schema_and_admin(self):
+        """Test that upgrading applies all migrations and seeds the admin user"""
+        applied = self.runner.upgrade()
+        assert applied == [m.version for m in MIGRATIONS]
+        assert self.runner.current_version() == MIGRATIONS[-1].version
+
+        (hashed_password,), = self.query("SELECT hashed_password FROM users WHERE username = 'admin'")
+        assert pwd_context.verify("admin123", hashed_password)
+        scopes = {row[0] for row in self.query("SELECT scope FROM user_scopes")}
+        assert scopes == {"read_profile", "write_profile", "read_users", "admin"}
+
+    def test_upgrade_is_idempotent(self):
+        """Test that a second upgrade applies nothing"""
+        self.runner.upgrade()
+        assert self.runner.upgrade() == []
+        assert len(self.query("SELECT * FROM schema_version")) == len(MIGRATIONS)
+
+    def test_upgrade_to_target(self):
+        """Test that upgrading stops at the requested version"""
+        assert self.runner.upgrade(target=1) == [1]
+        assert self.query("SELECT COUNT(*) FROM users")[0][0] == 0
+        assert [m.version for m in self.runner.pending()] == [m.version for m in MIGRATIONS[1:]]
+
+    def test_adopts_existing_schema(self):
+        """Test that a database created before migrations existed is upgraded in place"""
+        with self.manager.write_connection() as conn:
+            for statement in MIGRATIONS[0].statements["sqlite"]:
+                conn.execute(statement)
+            conn.execute("INSERT INTO users (username, email, hashed_password) VALUES ('bob', 'bob@example.com', 'x')")
+            conn.commit()
+
+        self.runner.upgrade()
+        usernames = {row[0] for row in self.query("SELECT username FROM users")}
+        assert usernames == {"bob", "admin"}
+
+    def test_failed_migration_rolled_back(self):
+        """Test that a failing migration leaves neither its changes nor its version behind"""
+        broken = MIGRATIONS + [
+            Migration(
+                99,
+                "broken",
+                sqlite=["CREATE TABLE extra (id INTEGER)", "INSERT INTO missing VALUES (1)"],
+                postgresql=[],
+            ),
+        ]
+        runner = MigrationRunner("sqlite", self.manager.write_connection, broken)
+        with pytest.raises(Exception):
+            runner.upgrade()
+
+        assert runner.current_version() == MIGRATIONS[-1].version
+        assert self.query("SELECT name FROM sqlite_master WHERE name = 'extra'") == []
+
+
+class TestDatabaseAutoMigrate:
+    """Test class for migrations applied by the SQLite backend"""
+
+    def test_auto_migrate_on_startup(self, tmp_path):
+        """Test that the backend migrates a new database when it is created"""
+        db = Database(str(tmp_path / "auth.db"))
+        assert db.migration_runner().current_version() == MIGRATIONS[-1].version
+        db.close()
+
+    def test_auto_migrate_disabled(self, tmp_path):
+        """Test that disabling auto-migration leaves the database untouched"""
+        db = Database(str(tmp_path / "auth.db"), auto_migrate=False)
+        assert db.migration_runner().current_version() == 0
+        assert db.migrate() == [m.version for m in MIGRATIONS]
+        db.close()
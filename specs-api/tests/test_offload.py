@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Pytest tests for the database offload executors and cancellation on disconnect
+"""
+import asyncio
+import contextvars
+import threading
+import time
+import pytest
+from app.core.async_database import AsyncDatabaseAdapter
+from app.core.database import Database
+from app.core.database_factory import get_async_database
+from app.core.offload import BoundedExecutor, CancelOnDisconnectMiddleware
+from starlette.background import BackgroundTask
+from starlette.responses import Response
+
+request_id = contextvars.ContextVar("request_id", default=None)
+
+
+class TestBoundedExecutor:
+    """Test class for BoundedExecutor"""
+
+    def test_runs_off_the_loop_with_caller_context(self):
+        """Test that calls run on the pool's threads and see the caller's context variables"""
+        executor = BoundedExecutor("test_read", 2)
+
+        def probe():
+            return threading.current_thread().name, request_id.get()
+
+        async def main():
+            request_id.set("abc")
+            return await executor.run(probe)
+
+        name, value = asyncio.run(main())
+        executor.shutdown()
+        assert name.startswith("test_read") and value == "abc"
+
+    def test_queue_wait_recorded(self):
+        """Test that a call waiting for the single thread reports its queue wait"""
+        executor = BoundedExecutor("test_queue", 1)
+
+        async def main():
+            await asyncio.gather(executor.run(time.sleep, 0.1), executor.run(time.sleep, 0.1))
+
+        asyncio.run(main())
+        executor.shutdown()
+        stats = executor.stats()
+        assert (stats["completed"], stats["pending"]) == (2, 0)
+        assert stats["queue_wait_max"] >= 0.08
+
+    def test_cancelled_call_never_runs(self):
+        """Test that cancelling a caller drops its call if no thread has picked it up"""
+        executor = BoundedExecutor("test_cancel", 1)
+        release, ran = threading.Event(), []
+
+        async def main():
+            busy = asyncio.ensure_future(executor.run(release.wait))
+            queued = asyncio.ensure_future(executor.run(ran.append, "queued"))
+            await asyncio.sleep(0.05)
+            queued.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await queued
+            release.set()
+            await busy
+
+        asyncio.run(main())
+        executor.shutdown()
+        assert ran == []
+        assert executor.stats()["cancelled"] == 1
+
+
+class TestOffloadedAdapter:
+    """Test class for AsyncDatabaseAdapter with read and write executors on SQLite"""
+
+    @pytest.fixture(autouse=True)
+    def setup(self, tmp_path):
+        """Wrap a fresh database with one read and one write executor"""
+        self.db = Database(str(tmp_path / "auth.db"))
+        self.adapter = AsyncDatabaseAdapter(self.db, BoundedExecutor("db_read", 4), BoundedExecutor("db_write", 1))
+        yield
+        self.adapter.close()
+
+    def test_reads_and_writes_use_their_executors(self):
+        """Test that write methods go to the write executor and the rest to the read executor"""
+        async def main():
+            user = await self.adapter.get_user("admin")
+            assert await self.adapter.set_user_env_var(user["id"], "API_URL", "https://x")
+            return await self.adapter.get_user_env_var(user["id"], "API_URL")
+
+        assert asyncio.run(main())["value"] == "https://x"
+        stats = self.adapter.executor_stats()
+        assert stats["db_read"]["completed"] == 2
+        assert stats["db_write"]["completed"] == 1
+
+    def test_concurrent_reads_keep_the_loop_free(self):
+        """Test that the event loop keeps running while offloaded calls execute"""
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0)
+
+        async def main():
+            task = asyncio.ensure_future(ticker())
+            await asyncio.gather(*(self.adapter.get_user("admin") for _ in range(50)))
+            task.cancel()
+
+        asyncio.run(main())
+        assert ticks > 1
+
+
+class TestExecutorSizing:
+    """Test class for the executor sizes chosen by the database factory"""
+
+    def test_sqlite_sizes(self, tmp_path, monkeypatch):
+        """Test that SQLite gets DATABASE_READ_THREADS readers, one writer, and honours the overrides"""
+        monkeypatch.setenv("DATABASE_TYPE", "sqlite")
+        monkeypatch.setenv("DATABASE_PATH", str(tmp_path / "auth.db"))
+        monkeypatch.setenv("DATABASE_READ_THREADS", "6")
+        db = get_async_database()
+        assert {name: stats["max_workers"] for name, stats in db.executor_stats().items()} == {"db_read": 6, "db_write": 1}
+        db.close()
+
+        monkeypatch.setenv("DB_READ_WORKERS", "3")
+        monkeypatch.setenv("DB_WRITE_WORKERS", "2")
+        db = get_async_database()
+        assert {name: stats["max_workers"] for name, stats in db.executor_stats().items()} == {"db_read": 3, "db_write": 2}
+        db.close()
+
+
+async def call_app(app, messages, delay=0.0):
+    """Drive an ASGI app with ``messages``, the last one sent after ``delay`` seconds"""
+    sent = []
+
+    async def receive():
+        if len(messages) == 1:
+            await asyncio.sleep(delay)
+        if not messages:
+            await asyncio.Event().wait()
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    await CancelOnDisconnectMiddleware(app)({"type": "http"}, receive, send)
+    return sent
+
+
+class TestCancelOnDisconnect:
+    """Test class for CancelOnDisconnectMiddleware"""
+
+    def test_disconnect_cancels_handler(self):
+        """Test that a disconnect mid-request cancels the handler and ends the request quietly"""
+        cancelled = []
+
+        async def app(scope, receive, send):
+            await receive()
+            try:
+                await asyncio.sleep(5)
+            except asyncio.CancelledError:
+                cancelled.append(True)
+                raise
+
+        messages = [{"type": "http.request", "body": b"", "more_body": False}, {"type": "http.disconnect"}]
+        started = time.monotonic()
+        assert asyncio.run(call_app(app, messages, delay=0.05)) == []
+        assert cancelled == [True]
+        assert time.monotonic() - started < 2
+
+    def test_completed_request_untouched(self):
+        """Test that a request that finishes first is neither cancelled nor delayed"""
+        async def app(scope, receive, send):
+            message = await receive()
+            await send({"type": "http.response.start", "status": 200, "headers": []})
+            await send({"type": "http.response.body", "body": message["body"]})
+
+        messages = [{"type": "http.request", "body": b"hi", "more_body": False}, {"type": "http.disconnect"}]
+        sent = asyncio.run(call_app(app, messages, delay=0.2))
+        assert [m["type"] for m in sent] == ["http.response.start", "http.response.body"]
+
+    def test_background_task_survives_disconnect(self):
+        """Test that a disconnect after the response is sent doesn't cancel its background task"""
+        finished = []
+
+        async def cleanup():
+            await asyncio.sleep(0.2)
+            finished.append(True)
+
+        async def app(scope, receive, send):
+            await receive()
+            await Response(b"ok", background=BackgroundTask(cleanup))(scope, receive, send)
+
+        messages = [{"type": "http.request", "body": b"", "more_body": False}, {"type": "http.disconnect"}]
+        sent = asyncio.run(call_app(app, messages, delay=0.05))
+        assert [m["type"] for m in sent] == ["http.response.start", "http.response.body"]
+        assert finished == [True]
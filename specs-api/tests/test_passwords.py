@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Pytest tests for the password hashing executor and rehash-on-login
+"""
+import asyncio
+import threading
+import pytest
+from fastapi import HTTPException
+from app.core.passwords import PasswordHasher, PasswordHasherBusy, make_context, pwd_context
+from app.models.auth import UserLogin
+from app.services.auth_service import AuthService
+
+
+class TestPasswordHasher:
+    """Test class for PasswordHasher"""
+
+    @pytest.mark.parametrize("executor", ["thread", "process"])
+    def test_hash_and_verify(self, executor):
+        """Test that hashes made on the pool verify, on the pool and inline"""
+        hasher = PasswordHasher(max_workers=2, executor=executor)
+        try:
+            hashed = asyncio.run(hasher.hash("s3cret"))
+            assert pwd_context.verify("s3cret", hashed)
+            assert asyncio.run(hasher.verify("s3cret", hashed))
+            assert not asyncio.run(hasher.verify("wrong", hashed))
+        finally:
+            hasher.shutdown()
+
+        stats = hasher.stats()
+        assert stats["completed"] == 3
+        assert stats["pending"] == 0
+        assert stats["run_time_avg"] > 0
+
+    def test_rejects_when_queue_full(self):
+        """Test that calls beyond max_pending fail fast instead of queueing"""
+        hasher = PasswordHasher(max_workers=1, max_pending=1, executor="thread")
+        release = threading.Event()
+
+        async def scenario():
+            blocked = asyncio.ensure_future(hasher._run(release.wait, 5))
+            await asyncio.sleep(0.05)
+            with pytest.raises(PasswordHasherBusy):
+                await hasher.hash("another")
+            release.set()
+            await blocked
+
+        try:
+            asyncio.run(scenario())
+        finally:
+            hasher.shutdown()
+        stats = hasher.stats()
+        assert (stats["rejected"], stats["completed"], stats["pending"]) == (1, 1, 0)
+
+    def test_event_loop_stays_responsive(self):
+        """Test that the loop keeps running other tasks while hashes are computed"""
+        hasher = PasswordHasher(max_workers=2, executor="thread")
+
+        async def scenario():
+            ticks = 0
+
+            async def ticker():
+                nonlocal ticks
+                while True:
+                    ticks += 1
+                    await asyncio.sleep(0.001)
+
+            task = asyncio.ensure_future(ticker())
+            await asyncio.gather(*(hasher.hash("pw") for _ in range(4)))
+            task.cancel()
+            return ticks
+
+        try:
+            assert asyncio.run(scenario()) > 10
+        finally:
+            hasher.shutdown()
+
+
+class FakeDatabase:
+    """Async database stand-in holding one user"""
+
+    def __init__(self, hashed_password):
+        self.user = {"id": 1, "username": "alice", "hashed_password": hashed_password, "is_active": True, "available_scopes": []}
+        self.updates = []
+
+    async def get_user(self, username):
+        return dict(self.user) if username == "alice" else None
+
+    async def update_password_hash(self, user_id, hashed_password):
+        self.updates.append(hashed_password)
+        self.user["hashed_password"] = hashed_password
+        return True
+
+    def validate_scopes(self, requested_scopes, user):
+        return []
+
+    def create_access_token(self, data, expires_delta=None):
+        return "token"
+
+    async def create_refresh_token(self, user_id, token_hash, family_id, scopes, expires_at):
+        return True
+
+
+class TestRehashOnLogin:
+    """Test class for upgrading password hashes at login"""
+
+    @pytest.fixture(autouse=True)
+    def setup(self, password_hasher):
+        self.password_hasher = password_hasher
+
+    def login(self, db, password="s3cret"):
+        service = AuthService(db, password_hasher=self.password_hasher)
+        try:
+            return asyncio.run(service.login_user(UserLogin(username="alice", password=password, scopes=[])))
+        finally:
+            service.close()
+
+    def test_outdated_cost_is_rehashed(self):
+        """Test that a hash made at another cost is replaced after a successful login"""
+        db = FakeDatabase(make_context(4).hash("s3cret"))
+        self.login(db)
+        assert len(db.updates) == 1
+        assert not pwd_context.needs_update(db.updates[0])
+        assert pwd_context.verify("s3cret", db.updates[0])
+
+        self.login(db)
+        assert len(db.updates) == 1
+
+    def test_failed_login_not_rehashed(self):
+        """Test that a wrong password never rewrites the stored hash"""
+        db = FakeDatabase(make_context(4).hash("s3cret"))
+        with pytest.raises(HTTPException):
+            self.login(db, password="wrong")
+        assert db.updates == []
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Pytest tests for on-demand request profiling
+"""
+import cProfile
+import pstats
+import pytest
+from app.core.profiling import ProfileStore, profile_store
+
+
+class TestRequestProfiling:
+    """Test class for the X-Profile header and the admin profile endpoints"""
+
+    @pytest.fixture(autouse=True)
+    def setup(self, client, login, admin_headers):
+        """Serve the app over a fresh database with admin and non-admin tokens"""
+        self.client, self.admin = client, admin_headers
+        self.user = {"Authorization": f"Bearer {login(['read_profile']).access_token}"}
+
+    def test_admin_request_profiled(self, tmp_path):
+        """Test that an admin's request with X-Profile is profiled and can be fetched both ways"""
+        response = self.client.get("/api/v1/profile", headers={**self.admin, "X-Profile": "1"})
+        assert response.status_code == 200
+        profile_id = response.headers["x-profile-id"]
+
+        listing = self.client.get("/api/v1/admin/profiles", headers=self.admin).json()
+        assert listing[0]["id"] == profile_id
+        assert (listing[0]["path"], listing[0]["status"], listing[0]["username"]) == ("/api/v1/profile", 200, "admin")
+
+        report = self.client.get(f"/api/v1/admin/profiles/{profile_id}?limit=1000", headers=self.admin)
+        assert "get_user_profile" in report.text
+
+        download = self.client.get(f"/api/v1/admin/profiles/{profile_id}?format=pstats", headers=self.admin)
+        assert "attachment" in download.headers["content-disposition"]
+        path = tmp_path / "request.prof"
+        path.write_bytes(download.content)
+        assert pstats.Stats(str(path)).total_calls > 0
+
+    def test_requests_without_header_or_admin_not_profiled(self):
+        """Test that only admins who ask get profiled"""
+        before = len(profile_store.list())
+        assert "x-profile-id" not in self.client.get("/api/v1/profile", headers=self.admin).headers
+        assert "x-profile-id" not in self.client.get("/api/v1/profile", headers={**self.user, "X-Profile": "1"}).headers
+        assert "x-profile-id" not in self.client.get("/", headers={"X-Profile": "1"}).headers
+        assert len(profile_store.list()) == before
+
+    def test_profile_endpoints_admin_only(self):
+        """Test that non-admins can't read profiles and unknown ids are 404"""
+        assert self.client.get("/api/v1/admin/profiles", headers=self.user).status_code == 403
+        assert self.client.get("/api/v1/admin/profiles/0-0", headers=self.admin).status_code == 404
+
+
+def test_store_keeps_newest():
+    """Test that the ring buffer drops the oldest profile when full"""
+    store = ProfileStore(maxlen=2)
+    ids = [store.new_id() for _ in range(3)]
+    for profile_id in ids:
+        store.add(profile_id, cProfile.Profile(), path="/")
+    assert [info["id"] for info in store.list()] == [ids[2], ids[1]]
+    assert store.report(ids[0]) is None
+
+
+def test_directory_store_shared_between_workers(tmp_path):
+    """Test that a profile taken by one worker can be listed and fetched by another"""
+    taker, server = ProfileStore(maxlen=2, directory=str(tmp_path)), ProfileStore(maxlen=2, directory=str(tmp_path))
+    ids = [taker.new_id() for _ in range(3)]
+    profile = cProfile.Profile()
+    profile.enable()
+    sorted(range(100))
+    profile.disable()
+    for profile_id in ids:
+        taker.add(profile_id, profile, path="/")
+    assert [info["id"] for info in server.list()] == [ids[2], ids[1]]
+    assert server.report(ids[0]) is None
+    assert "sorted" in server.report(ids[2])
+    assert server.get("../../etc/passwd") is None
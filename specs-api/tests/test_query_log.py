@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Pytest tests for per-statement timing and the slow-query log
+"""
+import logging
+import pytest
+from prometheus_client import REGISTRY
+from app.core import query_log
+from app.core.database import Database
+from app.core.query_log import QueryRecorder
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+class TestQueryLog:
+    """Test class for statement timing on the SQLite backend"""
+
+    @pytest.fixture(autouse=True)
+    def setup(self, tmp_path, monkeypatch):
+        """Use a fresh database and a recorder that treats every statement as slow"""
+        self.recorder = QueryRecorder(slow_threshold=1e-9, explain=True)
+        monkeypatch.setattr(query_log, "query_recorder", self.recorder)
+        self.db = Database(str(tmp_path / "auth.db"))
+        yield
+        self.db.close()
+
+    def test_statements_tagged_with_calling_method(self):
+        """Test that statements are counted under the backend method that ran them, with their rows"""
+        before = sample("db_statement_duration_seconds_count", backend="sqlite", method="get_user")
+        rows = sample("db_statement_rows_total", backend="sqlite", method="get_user")
+        assert self.db.get_user("admin")["username"] == "admin"
+        assert sample("db_statement_duration_seconds_count", backend="sqlite", method="get_user") > before
+        assert sample("db_statement_rows_total", backend="sqlite", method="get_user") > rows
+
+    def test_slow_log_redacts_parameters(self, caplog):
+        """Test that the slow-query log shows parameter types, never their values"""
+        with caplog.at_level(logging.WARNING, logger="app.core.query_log"):
+            self.db.get_user("admin")
+        slow = [r.getMessage() for r in caplog.records if r.getMessage().startswith("Slow query in get_user")]
+        assert slow and "params=(str)" in slow[0]
+        assert all("'admin'" not in message for message in slow)
+
+    def test_explain_logged_once_per_interval(self, caplog):
+        """Test that slow SELECTs get their plan logged, rate-limited per statement"""
+        with caplog.at_level(logging.WARNING, logger="app.core.query_log"):
+            self.db.get_user("admin")
+            self.db.get_user("admin")
+        plans = [r.getMessage() for r in caplog.records if r.getMessage().startswith("Plan for slow query in get_user")]
+        # get_user runs two SELECTs; a second call within the interval adds no plans
+        assert len(plans) == 2
+        assert any("SEARCH users" in plan for plan in plans)
+
+    def test_threshold_zero_disables_log(self, caplog):
+        """Test that a zero threshold keeps timing but logs nothing"""
+        self.recorder.slow_threshold = 0
+        with caplog.at_level(logging.WARNING, logger="app.core.query_log"):
+            self.db.get_user("admin")
+        assert not [r for r in caplog.records if r.name == "app.core.query_log"]
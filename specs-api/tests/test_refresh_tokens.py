@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Pytest tests for refresh token rotation and reuse detection
+"""
+import asyncio
+import pytest
+from fastapi import HTTPException
+
+
+class TestRefreshTokens:
+    """Test class for the refresh token flow on SQLite"""
+
+    @pytest.fixture(autouse=True)
+    def setup(self, db, auth_service, admin_token):
+        """Create a service over a fresh database and log in as admin"""
+        self.db, self.service, self.token = db, auth_service, admin_token
+
+    def run(self, coroutine):
+        return asyncio.run(coroutine)
+
+    def refresh(self, refresh_token):
+        return self.run(self.service.refresh_access_token(refresh_token))
+
+    def test_login_issues_refresh_token(self):
+        """Test that login returns a refresh token that is stored only as a digest"""
+        assert self.token.refresh_token
+        with self.db.read_connection() as conn:
+            stored = [row[0] for row in conn.execute("SELECT token_hash FROM refresh_tokens")]
+        assert len(stored) == 1
+        assert self.token.refresh_token not in stored
+
+    def test_refresh_rotates(self):
+        """Test that refreshing returns a usable access token and a new refresh token"""
+        renewed = self.refresh(self.token.refresh_token)
+        assert renewed.refresh_token != self.token.refresh_token
+        assert sorted(renewed.scopes) == ["admin", "read_profile"]
+        assert self.db.verify_token(renewed.access_token)["username"] == "admin"
+
+        again = self.refresh(renewed.refresh_token)
+        assert again.refresh_token not in (self.token.refresh_token, renewed.refresh_token)
+
+    def test_reuse_revokes_family(self):
+        """Test that presenting a rotated token again invalidates the whole session"""
+        renewed = self.refresh(self.token.refresh_token)
+        with pytest.raises(HTTPException) as excinfo:
+            self.refresh(self.token.refresh_token)
+        assert excinfo.value.status_code == 401
+
+        # The legitimate successor is revoked too
+        with pytest.raises(HTTPException):
+            self.refresh(renewed.refresh_token)
+
+    def test_unknown_and_expired_tokens_rejected(self):
+        """Test that unknown and expired refresh tokens are refused"""
+        with pytest.raises(HTTPException):
+            self.refresh("not-a-real-token")
+
+        with self.db.write_connection() as conn:
+            conn.execute("UPDATE refresh_tokens SET expires_at = 0")
+            conn.commit()
+        with pytest.raises(HTTPException):
+            self.refresh(self.token.refresh_token)
+
+    def test_revoked_scope_dropped(self):
+        """Test that scopes revoked after login are not carried into refreshed tokens"""
+        admin = self.db.get_user("admin")
+        self.run(self.service.revoke_scope_from_user(admin["id"], "read_profile"))
+        renewed = self.refresh(self.token.refresh_token)
+        assert renewed.scopes == ["admin"]
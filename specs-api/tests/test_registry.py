@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Pytest tests for the process-wide database registry
+"""
+import asyncio
+from app.core.registry import DatabaseRegistry
+
+
+class FakeDatabase:
+    """Backend stand-in that records its lifecycle"""
+
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class FakeAsyncDatabase(FakeDatabase):
+    """Async backend stand-in with connect/close coroutines"""
+
+    def __init__(self):
+        super().__init__()
+        self.connected = False
+
+    async def connect(self):
+        self.connected = True
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeService:
+    def __init__(self, db):
+        self.db = db
+
+
+class TestDatabaseRegistry:
+    """Test class for DatabaseRegistry"""
+
+    def make_registry(self, database_class=FakeDatabase):
+        self.created = []
+
+        def factory():
+            db = database_class()
+            self.created.append(db)
+            return db
+
+        return DatabaseRegistry(factory)
+
+    def test_database_created_once(self):
+        """Test that every caller shares one database instance"""
+        registry = self.make_registry()
+        assert registry.get() is registry.get()
+        assert len(self.created) == 1
+
+    def test_services_are_singletons_bound_to_database(self):
+        """Test that services are built once with the shared database"""
+        registry = self.make_registry()
+        service = registry.service(FakeService)
+        assert registry.service(FakeService) is service
+        assert service.db is registry.get()
+
+    def test_startup_and_shutdown_async_backend(self):
+        """Test that startup connects an async backend and shutdown closes it"""
+        registry = self.make_registry(FakeAsyncDatabase)
+        asyncio.run(registry.startup())
+        db = self.created[0]
+        assert db.connected
+
+        asyncio.run(registry.shutdown())
+        assert db.closed
+
+    def test_shutdown_resets_registry(self):
+        """Test that a sync backend is closed and a new one is created afterwards"""
+        registry = self.make_registry()
+        first = registry.get()
+        service = registry.service(FakeService)
+        asyncio.run(registry.shutdown())
+
+        assert first.closed
+        assert registry.get() is not first
+        assert registry.service(FakeService) is not service
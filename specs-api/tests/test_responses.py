@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Pytest tests for the fast JSON response class and the typed listing responses
+"""
+import json
+import pytest
+from fastapi.datastructures import DefaultPlaceholder
+from fastapi.responses import JSONResponse
+from app.api.deps import get_env_service
+from app.core.responses import FastJSONResponse, default_response_class
+from app.services.env_service import EnvironmentService
+from main import app
+
+
+class TestFastJSONResponse:
+    """Test class for FastJSONResponse"""
+
+    def test_renders_same_document_as_json_response(self):
+        """Test that the fast class produces the same JSON as the default one"""
+        content = {"name": "ÄPI_URL", "values": [1, 2.5, None, True], "nested": {"a": "b"}}
+        fast = FastJSONResponse(content)
+        assert json.loads(fast.body) == json.loads(JSONResponse(content).body)
+        assert fast.media_type == "application/json"
+
+    def test_app_default_is_opt_in(self, monkeypatch):
+        """Test that FastAPI's default stays in place unless FAST_JSON_RESPONSES is set"""
+        monkeypatch.delenv("FAST_JSON_RESPONSES", raising=False)
+        assert isinstance(default_response_class(), DefaultPlaceholder)
+        monkeypatch.setenv("FAST_JSON_RESPONSES", "true")
+        assert default_response_class() is FastJSONResponse
+
+
+class TestTypedListings:
+    """Test class for the typed environment variable and user listings on SQLite"""
+
+    @pytest.fixture(autouse=True)
+    def setup(self, db, async_db, auth_service, client, admin_headers):
+        """Serve the app over a fresh database with an admin token"""
+        self.db, self.service, self.client, self.headers = db, auth_service, client, admin_headers
+        env_service = EnvironmentService(async_db)
+        app.dependency_overrides[get_env_service] = lambda: env_service
+        yield
+        app.dependency_overrides.pop(get_env_service, None)
+
+    def test_env_var_round_trip(self):
+        """Test that each environment variable endpoint returns its documented shape"""
+        url = "/api/v1/environment-variables/"
+        response = self.client.post(url, json={"name": "API_URL", "value": "https://x"}, headers=self.headers)
+        assert response.status_code == 200
+        assert response.json() == {
+            "message": "Environment variable 'API_URL' set successfully",
+            "name": "API_URL",
+            "value": "https://x",
+            "username": "admin",
+        }
+
+        listing = self.client.get(url, headers=self.headers).json()
+        assert (listing["total_count"], listing["username"]) == (1, "admin")
+        assert set(listing["variables"][0]) == {"name", "value", "created_at", "updated_at"}
+        assert self.client.get(url + "API_URL", headers=self.headers).json()["value"] == "https://x"
+
+        deleted = self.client.delete(url + "API_URL", headers=self.headers).json()
+        assert deleted == {"message": "Environment variable 'API_URL' deleted successfully", "name": "API_URL", "username": "admin"}
+        assert self.client.get(url + "API_URL", headers=self.headers).status_code == 404
+
+    def test_users_with_scopes(self):
+        """Test that the user listing is typed and keeps each user's scopes"""
+        response = self.client.get("/api/v1/users/scopes", headers=self.headers)
+        assert response.status_code == 200
+        (admin,) = response.json()
+        assert admin["username"] == "admin" and admin["is_active"] is True
+        assert "admin" in admin["available_scopes"]
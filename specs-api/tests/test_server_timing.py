@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Pytest tests for the Server-Timing header
+"""
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.api.api import api_router
+from app.api.deps import get_auth_service, get_env_service
+from app.core.async_database import AsyncDatabaseAdapter
+from app.core.metrics import InstrumentedDatabase
+from app.core.server_timing import ServerTimingMiddleware
+from app.services.env_service import EnvironmentService
+
+
+def phases(response) -> dict:
+    header = response.headers["server-timing"]
+    return {name: float(dur.removeprefix("dur=")) for name, dur in (part.split(";") for part in header.split(", "))}
+
+
+class TestServerTiming:
+    """Test class for the Server-Timing middleware over the API routes on SQLite"""
+
+    @pytest.fixture
+    def async_db(self, db):
+        return InstrumentedDatabase(AsyncDatabaseAdapter(db), "sqlite")
+
+    @pytest.fixture(autouse=True)
+    def setup(self, async_db, auth_service, admin_headers):
+        """Serve the API routes over a fresh, instrumented database"""
+        self.headers = admin_headers
+        env_service = EnvironmentService(async_db)
+        self.overrides = {get_auth_service: lambda: auth_service, get_env_service: lambda: env_service}
+
+    def client(self, sample_rate: float) -> TestClient:
+        app = FastAPI()
+        app.include_router(api_router, prefix="/api/v1")
+        app.dependency_overrides.update(self.overrides)
+        app.add_middleware(ServerTimingMiddleware, sample_rate=sample_rate)
+        return TestClient(app)
+
+    def test_login_phases(self):
+        """Test that a login reports database, bcrypt, token signing and encoding time"""
+        response = self.client(1.0).post("/api/v1/login", json={"username": "admin", "password": "admin123"})
+        assert response.status_code == 200
+        timing = phases(response)
+        assert {"db", "bcrypt", "jwt", "encode", "total"} <= set(timing)
+        assert timing["bcrypt"] > 0
+        assert timing["total"] >= timing["bcrypt"]
+
+    def test_env_var_listing_phases(self):
+        """Test that a listing reports the token check and database time"""
+        response = self.client(1.0).get("/api/v1/environment-variables/", headers=self.headers)
+        assert response.status_code == 200
+        assert {"db", "jwt", "encode", "total"} <= set(phases(response))
+
+    def test_unsampled_requests_have_no_header(self):
+        """Test that the header is left out when the request isn't sampled"""
+        response = self.client(0.0).get("/api/v1/environment-variables/", headers=self.headers)
+        assert response.status_code == 200
+        assert "server-timing" not in response.headers
+
+    def test_disabled_by_default(self, monkeypatch):
+        """Test that the middleware samples nothing unless SERVER_TIMING is set"""
+        monkeypatch.delenv("SERVER_TIMING", raising=False)
+        assert ServerTimingMiddleware(None).sample_rate == 0
+        monkeypatch.setenv("SERVER_TIMING", "true")
+        monkeypatch.setenv("SERVER_TIMING_SAMPLE_RATE", "0.05")
+        assert ServerTimingMiddleware(None).sample_rate == 0.05
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Pytest tests for the cross-process shared memory cache
+"""
+import asyncio
+import multiprocessing
+import os
+import threading
+import pytest
+from app.core import shared_cache
+from app.core.cache import TTLCache
+from app.core.shared_cache import SharedMemoryCache
+from app.services.auth_service import AuthService
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def _write_from_child(path, key, value):
+    cache = SharedMemoryCache("test", maxsize=64, ttl=60, path=path)
+    cache.set(key, value)
+    cache.close()
+
+
+class TestSharedMemoryCache:
+    """Test class for SharedMemoryCache"""
+
+    @pytest.fixture(autouse=True)
+    def setup(self, tmp_path):
+        self.path = str(tmp_path / "test.cache")
+        self.clock = FakeClock()
+        self.cache = self.open()
+        yield
+        self.cache.close()
+
+    def open(self, **kwargs):
+        options = {"maxsize": 64, "ttl": 60, "path": self.path, "clock": self.clock, **kwargs}
+        return SharedMemoryCache("test", **options)
+
+    def test_round_trip_key_types(self):
+        """Test that str, bytes and int keys map back to their JSON values"""
+        self.cache.set("alice", {"id": 1, "scopes": ["read_profile"]})
+        self.cache.set(b"\x00digest", {"username": "alice"})
+        self.cache.set(7, 3)
+        assert self.cache.get("alice") == {"id": 1, "scopes": ["read_profile"]}
+        assert self.cache.get(b"\x00digest") == {"username": "alice"}
+        assert self.cache.get(7) == 3
+        assert self.cache.get("bob") is None
+
+    def test_shared_between_processes(self):
+        """Test that an entry written by another process is read here"""
+        context = multiprocessing.get_context("spawn")
+        child = context.Process(target=_write_from_child, args=(self.path, "alice", {"id": 1}))
+        child.start()
+        child.join(30)
+        assert child.exitcode == 0
+        assert self.cache.get("alice") == {"id": 1}
+
+    def test_expiry_and_ttl_cap(self):
+        """Test that entries expire at the shorter of their TTL and the cache TTL"""
+        self.cache.set("short", 1, ttl=5)
+        self.cache.set("long", 2, ttl=600)
+        self.clock.now += 6
+        assert self.cache.get("short") is None
+        assert self.cache.get("long") == 2
+        self.clock.now += 60
+        assert self.cache.get("long") is None
+        assert self.cache.stats()["expirations"] == 2
+
+    def test_bounded_with_eviction(self):
+        """Test that the table never holds more than its slots"""
+        for i in range(500):
+            self.cache.set(f"key-{i}", i)
+        assert len(self.cache) == 64
+        assert self.cache.stats()["evictions"] == 500 - 64
+        assert self.cache.get("key-499") == 499
+
+    def test_invalidate(self):
+        """Test single and predicate invalidation across handles"""
+        other = self.open()
+        self.cache.set("alice", {"id": 1})
+        self.cache.set("bob", {"id": 2})
+        assert other.invalidate("alice")
+        assert not other.invalidate("alice")
+        assert other.invalidate_where(lambda key, user: user["id"] == 2) == 1
+        assert self.cache.get("alice") is None
+        assert self.cache.get("bob") is None
+        other.close()
+
+    def test_oversize_not_cached(self):
+        """Test that values larger than a slot are skipped rather than truncated"""
+        self.cache.set("big", "x" * 2000)
+        assert self.cache.get("big") is None
+        assert self.cache.stats()["oversize"] == 1
+
+    def test_geometry_change_refused(self):
+        """Test that a table in use is never resized under its readers"""
+        self.cache.set("alice", 1)
+        with pytest.raises(ValueError):
+            self.open(maxsize=128)
+        assert self.cache.get("alice") == 1
+
+    def test_unsafe_files_refused(self, tmp_path):
+        """Test that a file others could write, or a symlink planted in its place, is refused"""
+        shared = tmp_path / "shared.cache"
+        shared.touch()
+        os.chmod(shared, 0o660)
+        with pytest.raises(PermissionError):
+            SharedMemoryCache("test", path=str(shared))
+
+        (tmp_path / "link.cache").symlink_to(self.path)
+        with pytest.raises(OSError):
+            SharedMemoryCache("test", path=str(tmp_path / "link.cache"))
+
+    @pytest.mark.skipif(os.getuid() != 0, reason="needs root to give a file away")
+    def test_foreign_file_refused(self, tmp_path):
+        """Test that a file owned by another user is refused even with mode 0600"""
+        foreign = tmp_path / "foreign.cache"
+        foreign.touch()
+        os.chmod(foreign, 0o600)
+        os.chown(foreign, 65534, 65534)
+        with pytest.raises(PermissionError):
+            SharedMemoryCache("test", path=str(foreign))
+
+    def test_concurrent_writers_never_tear(self):
+        """Test that readers see whole values while other threads overwrite them"""
+        stop = threading.Event()
+
+        def writer(n):
+            while not stop.is_set():
+                self.cache.set("hot", {"writer": n, "payload": [n] * 50})
+
+        threads = [threading.Thread(target=writer, args=(n,)) for n in range(3)]
+        for thread in threads:
+            thread.start()
+        try:
+            for _ in range(2000):
+                value = self.cache.get("hot")
+                if value is not None:
+                    assert value["payload"] == [value["writer"]] * 50
+        finally:
+            stop.set()
+            for thread in threads:
+                thread.join()
+
+
+def test_auth_service_shares_user_cache(tmp_path, monkeypatch):
+    """Test that two services in SHARED_CACHE mode see each other's cached users"""
+    monkeypatch.setenv("SHARED_CACHE", "true")
+    monkeypatch.setenv("SHARED_CACHE_DIR", str(tmp_path))
+
+    class FakeDatabase:
+        lookups = 0
+
+        async def get_user(self, username):
+            FakeDatabase.lookups += 1
+            return {"id": 1, "username": username, "hashed_password": "secret", "is_active": True}
+
+    first, second = AuthService(FakeDatabase()), AuthService(FakeDatabase())
+    asyncio.run(first.get_cached_user("alice"))
+    user = asyncio.run(second.get_cached_user("alice"))
+    assert FakeDatabase.lookups == 1
+    assert "hashed_password" not in user
+    assert isinstance(second.user_cache, SharedMemoryCache)
+    first.close()
+    second.close()
+
+
+def test_auth_service_without_launcher_keeps_own_cache(tmp_path, monkeypatch):
+    """Test that SHARED_CACHE without a launcher-provided directory falls back to a per-process cache"""
+    monkeypatch.setenv("SHARED_CACHE", "true")
+    monkeypatch.delenv("SHARED_CACHE_DIR", raising=False)
+    monkeypatch.setattr(shared_cache, "default_directory", lambda: str(tmp_path))
+    service = AuthService(object())
+    assert isinstance(service.user_cache, TTLCache)
+    assert os.listdir(tmp_path) == []
+
+
+def test_cache_files_scoped_by_key_database_and_geometry(tmp_path, monkeypatch):
+    """Test that the file name depends on the scope and the table geometry, in a private directory"""
+    monkeypatch.setattr(shared_cache, "default_directory", lambda: str(tmp_path))
+    directory = shared_cache.make_cache_directory()
+    assert os.stat(directory).st_mode & 0o777 == 0o700
+    caches = [
+        SharedMemoryCache("users", maxsize=8, directory=directory, scope="key-a|sqlite:/a.db"),
+        SharedMemoryCache("users", maxsize=8, directory=directory, scope="key-b|sqlite:/a.db"),
+        SharedMemoryCache("users", maxsize=64, directory=directory, scope="key-a|sqlite:/a.db"),
+    ]
+    assert len({cache.path for cache in caches}) == 3
+    for cache in caches:
+        assert os.stat(cache.path).st_mode & 0o777 == 0o600
+        cache.close()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Pytest tests for SQLite connection management
+"""
+import sqlite3
+import threading
+import pytest
+from app.core.sqlite_connection import SQLiteConnectionManager
+
+
+class TestSQLiteConnectionManager:
+    """Test class for SQLiteConnectionManager"""
+
+    @pytest.fixture(autouse=True)
+    def setup(self, tmp_path):
+        """Create a manager over a fresh database file"""
+        self.manager = SQLiteConnectionManager(str(tmp_path / "test.db"))
+        with self.manager.write_connection() as conn:
+            conn.execute("CREATE TABLE items (name TEXT UNIQUE NOT NULL)")
+            conn.commit()
+        yield
+        self.manager.close()
+
+    def test_wal_and_pragmas_applied(self):
+        """Test that the writer enables WAL and connections get the configured pragmas"""
+        assert self.manager.stats()["journal_mode"] == "WAL"
+        with self.manager.read_connection() as conn:
+            assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1  # NORMAL
+            assert conn.execute("PRAGMA busy_timeout").fetchone()[0] == 5000
+
+    def test_reader_reused_per_thread(self):
+        """Test that a thread keeps its reader and other threads get their own"""
+        with self.manager.read_connection() as first:
+            pass
+        with self.manager.read_connection() as second:
+            pass
+        assert first is second
+
+        other = {}
+
+        def worker():
+            with self.manager.read_connection() as conn:
+                other["conn"] = conn
+
+        thread = threading.Thread(target=worker)
+        thread.start()
+        thread.join()
+        assert other["conn"] is not first
+        assert self.manager.stats()["readers"] == 2
+
+    def test_reader_is_read_only(self):
+        """Test that reader connections refuse writes"""
+        with self.manager.read_connection() as conn:
+            with pytest.raises(sqlite3.OperationalError):
+                conn.execute("INSERT INTO items (name) VALUES ('x')")
+
+    def test_failed_write_rolled_back(self):
+        """Test that a failed write does not leave the writer holding a transaction"""
+        with self.manager.write_connection() as conn:
+            conn.execute("INSERT INTO items (name) VALUES ('a')")
+            conn.commit()
+
+        with pytest.raises(sqlite3.IntegrityError):
+            with self.manager.write_connection() as conn:
+                conn.execute("INSERT INTO items (name) VALUES ('b')")
+                conn.execute("INSERT INTO items (name) VALUES ('a')")
+
+        with self.manager.write_connection() as conn:
+            assert not conn.in_transaction
+        with self.manager.read_connection() as conn:
+            names = [row[0] for row in conn.execute("SELECT name FROM items ORDER BY name")]
+        assert names == ["a"]
+
+    def test_reader_sees_committed_writes(self):
+        """Test that an open reader observes data committed by the writer"""
+        with self.manager.read_connection() as reader:
+            assert reader.execute("SELECT COUNT(*) FROM items").fetchone()[0] == 0
+        with self.manager.write_connection() as conn:
+            conn.execute("INSERT INTO items (name) VALUES ('c')")
+            conn.commit()
+        with self.manager.read_connection() as reader:
+            assert reader.execute("SELECT COUNT(*) FROM items").fetchone()[0] == 1
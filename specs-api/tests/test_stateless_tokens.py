@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Pytest tests for stateless access tokens and the per-user auth epoch
+"""
+import asyncio
+import pytest
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+from app.core.async_database import AsyncDatabaseAdapter
+from app.models.auth import UserLogin
+
+
+class CountingDatabase(AsyncDatabaseAdapter):
+    """Adapter that counts full user loads"""
+
+    def __init__(self, db):
+        super().__init__(db)
+        self.get_user_calls = 0
+
+    async def get_user(self, username):
+        self.get_user_calls += 1
+        return self.db.get_user(username)
+
+
+class TestStatelessTokens:
+    """Test class for STATELESS_TOKENS mode on SQLite"""
+
+    @pytest.fixture(autouse=True)
+    def stateless(self, monkeypatch):
+        monkeypatch.setenv("STATELESS_TOKENS", "true")
+
+    @pytest.fixture
+    def async_db(self, db):
+        return CountingDatabase(db)
+
+    @pytest.fixture(autouse=True)
+    def setup(self, stateless, db, async_db, auth_service, admin_token):
+        """Create a stateless service over a fresh database and log in as admin"""
+        self.db, self.adapter, self.service = db, async_db, auth_service
+        self.admin = db.get_user("admin")
+        self.token = admin_token
+
+    def run(self, coroutine):
+        return asyncio.run(coroutine)
+
+    def authenticate(self, token=None):
+        credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token or self.token.access_token)
+        return self.run(self.service.get_current_user_from_token(credentials))
+
+    def test_claims_embedded(self):
+        """Test that the token carries id, role and the current epoch"""
+        claims = self.db.verify_token(self.token.access_token)
+        assert claims["uid"] == self.admin["id"]
+        assert claims["role"] == self.admin["role"]
+        assert claims["epoch"] == self.admin["auth_epoch"] == 0
+
+    def test_authenticates_without_loading_user(self):
+        """Test that repeated requests only consult the cached epoch"""
+        calls = self.adapter.get_user_calls
+        for _ in range(3):
+            user = self.authenticate()
+        assert user["username"] == "admin"
+        assert sorted(user["scopes"]) == ["admin", "read_profile"]
+        assert self.adapter.get_user_calls == calls
+        assert self.service.auth_epoch_cache.stats()["hits"] == 2
+
+    def test_scope_change_invalidates_token(self):
+        """Test that granting or revoking a scope bumps the epoch and rejects older tokens"""
+        self.authenticate()
+        self.run(self.service.revoke_scope_from_user(self.admin["id"], "read_profile"))
+        assert self.db.get_user("admin")["auth_epoch"] == 1
+        with pytest.raises(HTTPException) as excinfo:
+            self.authenticate()
+        assert excinfo.value.status_code == 401
+
+        # Refreshing issues a token at the new epoch, without the revoked scope
+        renewed = self.run(self.service.refresh_access_token(self.token.refresh_token))
+        assert renewed.scopes == ["admin"]
+        assert self.authenticate(renewed.access_token)["scopes"] == ["admin"]
+
+    def test_revocation_on_other_worker_seen_after_ttl(self):
+        """Test that an epoch bumped elsewhere is noticed once the cached epoch expires"""
+        self.authenticate()
+        self.db.grant_scope_to_user(self.admin["id"], "read_users")
+        # Still served from the epoch cache
+        self.authenticate()
+        self.service.auth_epoch_cache.clear()
+        with pytest.raises(HTTPException):
+            self.authenticate()
+
+    def test_deactivation(self):
+        """Test that a deactivated user can neither use, refresh nor obtain tokens"""
+        assert self.run(self.service.set_user_active(self.admin["id"], False))
+        with pytest.raises(HTTPException):
+            self.authenticate()
+        with pytest.raises(HTTPException):
+            self.run(self.service.refresh_access_token(self.token.refresh_token))
+        with pytest.raises(HTTPException):
+            self.run(self.service.login_user(UserLogin(username="admin", password="admin123")))
+
+        assert not self.run(self.service.set_user_active(9999, False))
+
+    def test_profile_loads_full_record(self):
+        """Test that endpoints needing the full user still get it"""
+        profile = self.run(self.service.get_user_profile(self.authenticate()))
+        assert profile.email
+        assert "read_profile" in profile.available_scopes
+
+    def test_scopes_load_available_scopes(self):
+        """Test that /me/scopes reports the user's available scopes, not just the token's"""
+        token = self.run(self.service.login_user(UserLogin(username="admin", password="admin123", scopes=["admin"])))
+        scopes = self.run(self.service.get_user_scopes(self.authenticate(token.access_token)))
+        assert scopes["current_token_scopes"] == ["admin"]
+        assert "read_profile" in scopes["available_scopes"]
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Pytest tests for token exchange (downscoping without a password)
+"""
+import asyncio
+import time
+import pytest
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+
+
+class TestTokenExchange:
+    """Test class for AuthService.exchange_token on SQLite"""
+
+    @pytest.fixture(autouse=True)
+    def setup(self, db, auth_service, admin_token):
+        """Create a service over a fresh database and log in as admin with two scopes"""
+        self.db, self.service = db, auth_service
+        self.access_token = admin_token.access_token
+
+    def exchange(self, scopes, from_available_scopes=False, token=None):
+        credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token or self.access_token)
+        return asyncio.run(self.service.exchange_token(credentials, scopes, from_available_scopes))
+
+    def test_downscope(self):
+        """Test that a token can be narrowed to a subset of its scopes"""
+        exchanged = self.exchange(["read_profile"])
+        assert exchanged.scopes == ["read_profile"]
+        assert exchanged.refresh_token is None
+        assert self.db.verify_token(exchanged.access_token)["scopes"] == ["read_profile"]
+
+    def test_cannot_widen_by_default(self):
+        """Test that scopes outside the presented token are dropped"""
+        exchanged = self.exchange(["read_profile", "read_users"])
+        assert exchanged.scopes == ["read_profile"]
+
+    def test_from_available_scopes(self):
+        """Test that the user's current scopes can be requested without a password"""
+        exchanged = self.exchange(["read_users", "write_users"], from_available_scopes=True)
+        assert exchanged.scopes == ["read_users"]
+
+    def test_does_not_outlive_original(self):
+        """Test that the exchanged token expires no later than the presented one"""
+        original_exp = self.db.verify_token(self.access_token)["exp"]
+        exchanged = self.exchange(["read_profile"])
+        assert self.db.verify_token(exchanged.access_token)["exp"] <= original_exp
+        assert original_exp > time.time()
+
+    def test_api_key_rejected(self):
+        """Test that an API key can't be exchanged, so it can't be widened into a JWT outliving it"""
+        user = asyncio.run(self.service.db.get_user("admin"))
+        key = asyncio.run(self.service.create_api_key(user["id"], "ci", ["read_profile"], "admin"))
+        for from_available_scopes in (True, False):
+            with pytest.raises(HTTPException) as exc_info:
+                self.exchange(["admin", "read_users"], from_available_scopes=from_available_scopes, token=key.api_key)
+            assert exc_info.value.status_code == 400
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Pytest tests for access token signing and the JWKS endpoint
+"""
+import pytest
+from fastapi.testclient import TestClient
+from jose import JWTError, jwt
+from app.core.tokens import TokenSigner, generate_private_key
+from main import app
+
+
+class TestTokenSigner:
+    """Test class for HS256 and RS256 signing with key rotation"""
+
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        """Create an old and a current RS256 key"""
+        self.old_key = generate_private_key()
+        self.new_key = generate_private_key()
+
+    def test_hs256_round_trip(self):
+        """Test that the default signer keeps the shared-secret behaviour"""
+        signer = TokenSigner()
+        token = signer.encode({"sub": "admin"})
+        assert jwt.get_unverified_header(token)["alg"] == "HS256"
+        assert signer.decode(token)["sub"] == "admin"
+        assert signer.jwks() == {"keys": []}
+
+    def test_rs256_kid_and_jwks(self):
+        """Test that RS256 tokens name their key and verify against the published JWK"""
+        signer = TokenSigner("RS256", signing_key=self.new_key)
+        token = signer.encode({"sub": "admin", "scopes": ["read_profile"]})
+        kid = jwt.get_unverified_header(token)["kid"]
+
+        [published] = signer.jwks()["keys"]
+        assert published["kid"] == kid
+        assert "d" not in published
+        # What a downstream service does: verify with the public JWK alone
+        assert jwt.decode(token, published, algorithms=["RS256"])["scopes"] == ["read_profile"]
+
+    def test_kid_is_stable(self):
+        """Test that the kid depends only on the key, not on the process loading it"""
+        assert TokenSigner("RS256", signing_key=self.new_key).signing_key.kid == \
+            TokenSigner("RS256", signing_key=self.new_key).signing_key.kid
+
+    def test_rotation(self):
+        """Test that tokens from a retired key verify until the key is dropped"""
+        old_signer = TokenSigner("RS256", signing_key=self.old_key)
+        old_token = old_signer.encode({"sub": "admin"})
+
+        rotated = TokenSigner("RS256", signing_key=self.new_key, verification_keys=[self.old_key])
+        assert rotated.decode(old_token)["sub"] == "admin"
+        assert len(rotated.jwks()["keys"]) == 2
+        assert jwt.get_unverified_header(rotated.encode({"sub": "admin"}))["kid"] == rotated.signing_key.kid
+
+        with pytest.raises(JWTError):
+            TokenSigner("RS256", signing_key=self.new_key).decode(old_token)
+
+    def test_rejects_hs256_token_when_rs256(self):
+        """Test that a token signed with the shared secret is refused by an RS256 signer"""
+        signer = TokenSigner("RS256", signing_key=self.new_key)
+        forged = TokenSigner().encode({"sub": "admin"})
+        with pytest.raises(JWTError):
+            signer.decode(forged)
+
+    def test_unsupported_algorithm(self):
+        """Test that an unknown algorithm is a configuration error"""
+        with pytest.raises(ValueError):
+            TokenSigner("none")
+
+    def test_rs256_requires_signing_key(self):
+        """Test that RS256 without a signing key fails instead of using a per-process key"""
+        with pytest.raises(ValueError):
+            TokenSigner("RS256")
+
+
+def test_jwks_endpoint():
+    """Test that the key set is served with cache headers"""
+    response = TestClient(app).get("/.well-known/jwks.json")
+    assert response.status_code == 200
+    assert "max-age" in response.headers["cache-control"]
+    assert "keys" in response.json()